@@ -0,0 +1,81 @@
+import datetime
+
+# Nieobecności, które się jeszcze nie skończyły (zakres ograniczony indeksem po end_date)
+PENDING_ABSENCES_SQL = "SELECT employee_id, start_date, end_date FROM {table} WHERE end_date >= ?"
+
+
+class AbsenceIndex:
+    """Indeks bieżących i nadchodzących nieobecności: id pracownika -> (od, do) dla urlopów i L4"""
+
+    # Tabele nieobecności: nazwa w indeksie -> tabela w bazie
+    TABLES = {'vacations': 'vacations', 'l4': 'l4_records'}
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self.entries = {name: {} for name in self.TABLES}
+        self.loaded_for = None  # dzień, dla którego zbudowano indeks
+
+    @staticmethod
+    def _pick(rows):
+        """Z niezakończonych wierszy (id, od, do) posortowanych po dacie początku wybiera pierwszy na pracownika.
+
+        Wszystkie wiersze kończą się dziś lub później, więc pierwszy jest trwający albo najbliższy nadchodzący.
+        """
+        result = {}
+        for emp_id, start, end in rows:
+            result.setdefault(emp_id, (start, end))
+        return result
+
+    def _query(self, table, today, emp_id=None):
+        query = PENDING_ABSENCES_SQL.format(table=table)
+        params = [today]
+        if emp_id is not None:
+            query += " AND employee_id = ?"
+            params.append(emp_id)
+        # Sortowanie w Pythonie – ORDER BY skłaniałby planistę do pełnego skanu indeksu po employee_id
+        return sorted(self.db.fetch_all(query, params), key=lambda row: (row[0], str(row[1])))
+
+    def reload(self):
+        """Buduje indeks od nowa dla bieżącego dnia"""
+        today = datetime.date.today().isoformat()
+        try:
+            for name, table in self.TABLES.items():
+                self.entries[name] = self._pick(self._query(table, today))
+            self.loaded_for = today
+        except Exception as e:
+            print(f"Błąd ładowania indeksu nieobecności: {e}")
+            self.entries = {name: {} for name in self.TABLES}
+            self.loaded_for = None
+
+    def ensure_current(self):
+        # Po zmianie daty zakończone nieobecności wypadają, a nadchodzące stają się aktywne
+        if self.loaded_for != datetime.date.today().isoformat():
+            self.reload()
+
+    def invalidate(self, emp_id):
+        """Odświeża wpisy jednego pracownika (po zapisie urlopu lub L4)"""
+        if self.loaded_for is None:
+            return
+        today = self.loaded_for
+        try:
+            for name, table in self.TABLES.items():
+                entry = self._pick(self._query(table, today, emp_id)).get(emp_id)
+                if entry:
+                    self.entries[name][emp_id] = entry
+                else:
+                    self.entries[name].pop(emp_id, None)
+        except Exception as e:
+            print(f"Błąd odświeżania nieobecności pracownika {emp_id}: {e}")
+            self.loaded_for = None
+
+    def get(self, name, emp_id):
+        self.ensure_current()
+        return self.entries[name].get(emp_id)
+
+    def display_maps(self):
+        """Zwraca (urlopy, L4) jako słowniki id -> tekst 'od - do' do wyświetlenia na liście"""
+        self.ensure_current()
+        return tuple(
+            {emp_id: f"{start} - {end}" for emp_id, (start, end) in self.entries[name].items()}
+            for name in self.TABLES
+        )
@@ -1,14 +1,310 @@
 import sqlite3
 import shutil
 import os
-from datetime import datetime
+import gzip
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from history_archive import HistoryArchive
+
+try:
+    import zstandard
+except ImportError:  # kompresja zstd jest opcjonalna
+    zstandard = None
+
+# Domyślne ustawienia połączenia SQLite (kolejność ma znaczenie – journal_mode na końcu).
+# Baza bywa plikiem współdzielonym przez kilka stanowisk w udziale sieciowym, a WAL wymaga pamięci
+# współdzielonej (-shm) spójnej między procesami – przez sieć może to uszkodzić bazę. Dlatego
+# domyślnie działa klasyczny dziennik wycofania; WAL włącza się jawnie tylko dla bazy na dysku lokalnym.
+# Z tego samego powodu wyłączone jest mapowanie pliku w pamięci (mmap) – przez sieć nie jest spójne.
+DEFAULT_PRAGMAS = {
+    'busy_timeout': '5000',
+    'synchronous': 'FULL',
+    'temp_store': 'MEMORY',
+    'cache_size': '-20000',
+    'mmap_size': '0',
+    'journal_mode': 'DELETE',
+}
+
+# Klucz w tabeli settings i zmienna środowiskowa nadpisujące ustawienia, np. dla bazy na dysku
+# lokalnym: "journal_mode=WAL,synchronous=NORMAL,mmap_size=268435456"
+PRAGMAS_SETTING_KEY = 'db_pragmas'
+PRAGMAS_ENV_VAR = 'HR_DB_PRAGMAS'
+
+# Czytelne nazwy wartości zwracanych przez SQLite jako liczby
+PRAGMA_VALUE_NAMES = {
+    'synchronous': {'0': 'OFF', '1': 'NORMAL', '2': 'FULL', '3': 'EXTRA'},
+    'temp_store': {'0': 'DEFAULT', '1': 'FILE', '2': 'MEMORY'},
+}
+# Ustawienia backupu w tabeli settings (kompresja: brak / gzip / zstd, rotacja: liczba kopii i wiek w dniach)
+BACKUP_SETTINGS_DEFAULTS = {
+    'backup_compression': '',
+    'backup_keep_count': '30',
+    'backup_max_age_days': '',
+}
+BACKUP_EXTENSIONS = {'': '.db', 'gzip': '.db.gz', 'zstd': '.db.zst'}
+# Kopia pliku archiwum historii zapisywana obok backupu bazy: hr_backup_<czas>_archive.db[.gz|.zst]
+ARCHIVE_BACKUP_SUFFIX = '_archive'
+
+# Indeks pełnotekstowy historii (FTS5, treść trzymana w tabeli history) i wyzwalacze synchronizujące
+HISTORY_FTS_TABLE = 'history_fts'
+HISTORY_FTS_STATEMENTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5("
+    "details, action, operator, content='history', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN "
+    "INSERT INTO history_fts (rowid, details, action, operator) "
+    "VALUES (new.id, new.details, new.action, new.operator); END",
+    "CREATE TRIGGER IF NOT EXISTS history_fts_delete AFTER DELETE ON history BEGIN "
+    "INSERT INTO history_fts (history_fts, rowid, details, action, operator) "
+    "VALUES ('delete', old.id, old.details, old.action, old.operator); END",
+    "CREATE TRIGGER IF NOT EXISTS history_fts_update AFTER UPDATE ON history BEGIN "
+    "INSERT INTO history_fts (history_fts, rowid, details, action, operator) "
+    "VALUES ('delete', old.id, old.details, old.action, old.operator); "
+    "INSERT INTO history_fts (rowid, details, action, operator) "
+    "VALUES (new.id, new.details, new.action, new.operator); END",
+]
+
+
+def create_history_fts(db):
+    """Tworzy indeks FTS5 historii i wypełnia go istniejącymi wpisami.
+
+    Gdy SQLite nie ma modułu FTS5, krok jest pomijany – wyszukiwanie korzysta wtedy z LIKE.
+    """
+    try:
+        db.cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        db.cursor.execute("DROP TABLE temp.fts5_probe")
+    except sqlite3.OperationalError as e:
+        print(f"FTS5 niedostępne, wyszukiwanie w historii bez indeksu pełnotekstowego: {e}")
+        return
+    for statement in HISTORY_FTS_STATEMENTS:
+        db.cursor.execute(statement)
+    db.cursor.execute("INSERT INTO history_fts (history_fts) VALUES ('rebuild')")
+
+
+# Tabele z licznikiem zmian (rewizją) podbijanym przez wyzwalacze – okna odświeżają się tylko po zmianie
+REVISION_TABLES = ['employees', 'vacations', 'l4_records', 'required_staff', 'shifts', 'statuses', 'settings']
+
+
+def create_data_revisions(db):
+    """Tworzy tabelę data_revisions i wyzwalacze podbijające rewizję po każdej zmianie w REVISION_TABLES"""
+    db.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_revisions (
+            table_name TEXT PRIMARY KEY,
+            revision INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    create_revision_triggers(db, REVISION_TABLES)
+
+
+def create_revision_triggers(db, tables):
+    """Wyzwalacze podbijające rewizję tabeli w data_revisions po każdym INSERT/UPDATE/DELETE"""
+    for table in tables:
+        db.cursor.execute("INSERT OR IGNORE INTO data_revisions (table_name, revision) VALUES (?, 0)", (table,))
+        for operation in ('INSERT', 'UPDATE', 'DELETE'):
+            db.cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS data_revision_{table}_{operation.lower()} "
+                f"AFTER {operation} ON {table} BEGIN "
+                f"UPDATE data_revisions SET revision = revision + 1 WHERE table_name = '{table}'; END"
+            )
+
+
+def create_local_revision_triggers(db, tables):
+    """Wyzwalacze TEMP liczące zmiany wykonane tym połączeniem (tabela temp.local_revisions).
+
+    Różnica między przyrostem data_revisions a przyrostem local_revisions to zmiany z innych połączeń.
+    """
+    db.cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS local_revisions (
+            table_name TEXT PRIMARY KEY,
+            revision INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    for table in tables:
+        db.cursor.execute("INSERT OR IGNORE INTO temp.local_revisions (table_name, revision) VALUES (?, 0)", (table,))
+        for operation in ('INSERT', 'UPDATE', 'DELETE'):
+            db.cursor.execute(
+                f"CREATE TEMP TRIGGER IF NOT EXISTS local_revision_{table}_{operation.lower()} "
+                f"AFTER {operation} ON main.{table} BEGIN "
+                f"UPDATE local_revisions SET revision = revision + 1 WHERE table_name = '{table}'; END"
+            )
+    db.conn.commit()
+
+
+# Słowniki: tabela -> (klucz dawnej listy w settings, kolumna tekstowa w employees).
+# Pracownicy zachowują nazwę w kolumnie tekstowej, a wyzwalacze utrzymują zgodny z nią klucz <kolumna>_id.
+DICTIONARY_TABLES = {
+    'departments': ('wydzialy', 'wydzial'),
+    'positions': ('stanowiska', 'stanowisko'),
+    'machines': ('maszyny', 'maszyna'),
+}
+
+
+def create_dictionary_tables(db):
+    """Przenosi listy wydziałów, stanowisk i maszyn z tekstu w settings do tabel słownikowych.
+
+    Wartości z listy są widoczne do wyboru (listed=1); wartości używane tylko przez pracowników
+    trafiają do słownika jako ukryte (listed=0), więc każdy pracownik ma klucz obcy.
+    """
+    for table, (setting_key, column) in DICTIONARY_TABLES.items():
+        db.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE,
+                listed INTEGER NOT NULL DEFAULT 1,
+                sort_order INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        row = db.cursor.execute("SELECT value FROM settings WHERE key=?", (setting_key,)).fetchone()
+        names = [name for name in (row[0].split(',') if row and row[0] else []) if name]
+        db.cursor.executemany(
+            f"INSERT OR IGNORE INTO {table} (name, listed, sort_order) VALUES (?, 1, ?)",
+            [(name, position) for position, name in enumerate(dict.fromkeys(names))]
+        )
+        db.cursor.execute(
+            f"INSERT OR IGNORE INTO {table} (name, listed) "
+            f"SELECT DISTINCT {column}, 0 FROM employees WHERE {column} IS NOT NULL"
+        )
+        db.cursor.execute(f"ALTER TABLE employees ADD COLUMN {column}_id INTEGER REFERENCES {table} (id)")
+        db.cursor.execute(f"UPDATE employees SET {column}_id = (SELECT id FROM {table} WHERE name = employees.{column})")
+        db.cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_employees_{column}_id ON employees ({column}_id)")
+
+        # Klucz obcy pracownika nadążający za nazwą (nowa nazwa trafia do słownika jako ukryta)
+        sync_key = (
+            f"INSERT OR IGNORE INTO {table} (name, listed) SELECT NEW.{column}, 0 WHERE NEW.{column} IS NOT NULL; "
+            f"UPDATE employees SET {column}_id = (SELECT id FROM {table} WHERE name = NEW.{column}) WHERE id = NEW.id;"
+        )
+        db.cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_employee_insert AFTER INSERT ON employees "
+                          f"BEGIN {sync_key} END")
+        db.cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_employee_update AFTER UPDATE OF {column} ON employees "
+                          f"BEGIN {sync_key} END")
+        # Zmiana nazwy w słowniku – jeden UPDATE, pracownicy dostają nową nazwę po kluczu
+        rename = f"UPDATE employees SET {column} = NEW.name WHERE {column}_id = NEW.id;"
+        if table == 'departments':
+            rename += " UPDATE required_staff SET wydzial = NEW.name WHERE wydzial = OLD.name;"
+        db.cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_rename AFTER UPDATE OF name ON {table} "
+                          f"BEGIN {rename} END")
+        db.cursor.execute("DELETE FROM settings WHERE key=?", (setting_key,))
+    create_revision_triggers(db, DICTIONARY_TABLES)
+
+
+# Migracje schematu: (wersja, opis, kroki). Krok to polecenie SQL albo funkcja przyjmująca DBManager.
+# Numer ostatniej zastosowanej migracji jest zapisywany w PRAGMA user_version.
+MIGRATIONS = [
+    (1, "Indeksy dla najczęstszych zapytań", [
+        "CREATE INDEX IF NOT EXISTS idx_employees_wydzial_zmiana_status ON employees (wydzial, zmiana, status)",
+        "CREATE INDEX IF NOT EXISTS idx_vacations_employee_dates ON vacations (employee_id, start_date, end_date)",
+        "CREATE INDEX IF NOT EXISTS idx_l4_records_employee_dates ON l4_records (employee_id, start_date, end_date)",
+        "CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history (timestamp)",
+    ]),
+    (2, "Indeksy dat zakończenia nieobecności", [
+        "CREATE INDEX IF NOT EXISTS idx_vacations_end_date ON vacations (end_date)",
+        "CREATE INDEX IF NOT EXISTS idx_l4_records_end_date ON l4_records (end_date)",
+    ]),
+    (3, "Indeksy filtrów historii (operator, akcja) z kolejnością czasu", [
+        "CREATE INDEX IF NOT EXISTS idx_history_operator_timestamp ON history (operator, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_history_action_timestamp ON history (action, timestamp)",
+    ]),
+    (4, "Indeks pełnotekstowy historii", [create_history_fts]),
+    (5, "Powiązanie historii z pracownikiem i zmienionym polem", [
+        "ALTER TABLE history ADD COLUMN employee_id INTEGER",
+        "ALTER TABLE history ADD COLUMN field TEXT",
+        "ALTER TABLE history ADD COLUMN old_value TEXT",
+        "ALTER TABLE history ADD COLUMN new_value TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_history_employee_timestamp ON history (employee_id, timestamp)",
+        # Dotychczasowe wpisy ze znacznikiem "[EMP:id] " na początku szczegółów
+        "UPDATE history SET employee_id = CAST(substr(details, 6, instr(details, ']') - 6) AS INTEGER), "
+        "details = ltrim(substr(details, instr(details, ']') + 1)) WHERE details LIKE '[EMP:%]%'",
+        # Edycje z formularza: "Zmieniono dane pracownika ID <id>: ..."
+        "UPDATE history SET employee_id = CAST(substr(details, 29, instr(details, ':') - 29) AS INTEGER) "
+        "WHERE employee_id IS NULL AND details LIKE 'Zmieniono dane pracownika ID %:%'",
+    ]),
+    (6, "Rewizje danych do wykrywania zmian", [create_data_revisions]),
+    (7, "Słowniki wydziałów, stanowisk i maszyn z kluczami w employees", [create_dictionary_tables]),
+]
+
+
+def parse_pragmas(text):
+    """Zamienia tekst "nazwa=wartość,nazwa=wartość" na słownik (tylko znane pragmy)"""
+    result = {}
+    for part in (text or '').split(','):
+        if '=' not in part:
+            continue
+        name, value = (x.strip() for x in part.split('=', 1))
+        name = name.lower()
+        if name not in DEFAULT_PRAGMAS:
+            print(f"Pominięto nieobsługiwaną pragmę: {name}")
+            continue
+        if not value.lstrip('-').isalnum():
+            print(f"Pominięto niepoprawną wartość pragmy {name}: {value}")
+            continue
+        result[name] = value
+    return result
+
 
 class DBManager:
-    def __init__(self, db_name="hr_system.db"):
+    def __init__(self, db_name="hr_system.db", setup=True):
         self.db_name = db_name
-        self.conn = sqlite3.connect(db_name)
+        # Stan transakcji: głębokość zagnieżdżenia i akcje wykonywane po COMMIT (stos per poziom)
+        self._tx_depth = 0
+        self._commit_callbacks = []
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        self.effective_pragmas = {}
+        self._connect()
+        if setup:
+            self.create_tables()
+            self.run_migrations()
+        self.has_history_fts = self._check_history_fts()
+        try:
+            create_local_revision_triggers(self, REVISION_TABLES)
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"Błąd tworzenia liczników zmian połączenia: {e}")
+        self.configure_pragmas()
+        if setup:
+            print("Ustawienia SQLite: " + ", ".join(f"{k}={v}" for k, v in self.effective_pragmas.items()))
+
+    def open_worker(self):
+        """Osobne połączenie z tą samą bazą dla wątku roboczego (bez tworzenia schematu i migracji).
+
+        Połączenia SQLite nie wolno współdzielić między wątkami – wywoływać w wątku, który go używa.
+        """
+        return DBManager(self.db_name, setup=False)
+
+    def _connect(self):
+        """Otwiera połączenie i stosuje bieżące ustawienia pragm"""
+        timeout = int(self.pragmas.get('busy_timeout', 5000)) / 1000
+        self.conn = sqlite3.connect(self.db_name, timeout=timeout)
         self.cursor = self.conn.cursor()
-        self.create_tables()
+        self._apply_pragmas()
+
+    def _apply_pragmas(self):
+        effective = {}
+        for name, value in self.pragmas.items():
+            try:
+                self.cursor.execute(f"PRAGMA {name}={value}").fetchall()
+            except sqlite3.Error as e:
+                print(f"Błąd ustawiania pragmy {name}={value}: {e}")
+            try:
+                rows = self.cursor.execute(f"PRAGMA {name}").fetchall()
+                actual = str(rows[0][0]) if rows else ''
+                effective[name] = PRAGMA_VALUE_NAMES.get(name, {}).get(actual, actual)
+            except sqlite3.Error as e:
+                print(f"Błąd odczytu pragmy {name}: {e}")
+        self.effective_pragmas = effective
+
+    def configure_pragmas(self):
+        """Wczytuje ustawienia pragm z tabeli settings i zmiennej środowiskowej, po czym je stosuje"""
+        pragmas = dict(DEFAULT_PRAGMAS)
+        try:
+            rows = self.fetch_all("SELECT value FROM settings WHERE key=?", (PRAGMAS_SETTING_KEY,))
+            if rows:
+                pragmas.update(parse_pragmas(rows[0][0]))
+        except sqlite3.Error as e:
+            print(f"Błąd odczytu ustawień pragm: {e}")
+        # Zmienna środowiskowa ma pierwszeństwo (np. włączenie WAL na stacji z bazą na dysku lokalnym)
+        pragmas.update(parse_pragmas(os.environ.get(PRAGMAS_ENV_VAR)))
+        self.pragmas = pragmas
+        self._apply_pragmas()
+        return self.effective_pragmas
 
     def create_tables(self):
         # Tabela Użytkowników
@@ -106,6 +402,65 @@ class DBManager:
         self.conn.commit()
         self.initialize_default_data()
 
+    def get_schema_version(self):
+        return self.fetch_all("PRAGMA user_version")[0][0]
+
+    def run_migrations(self):
+        """Aktualizuje schemat do najnowszej wersji – każda migracja w osobnej transakcji"""
+        current = self.get_schema_version()
+        latest = MIGRATIONS[-1][0] if MIGRATIONS else 0
+        if current > latest:
+            print(f"Uwaga: baza ma nowszy schemat ({current}) niż obsługiwany przez program ({latest})")
+            return current
+
+        for version, description, steps in MIGRATIONS:
+            if version <= current:
+                continue
+            try:
+                with self.transaction():
+                    for step in steps:
+                        if callable(step):
+                            step(self)
+                        else:
+                            self.cursor.execute(step)
+                    self.cursor.execute(f"PRAGMA user_version = {int(version)}")
+                current = version
+                print(f"Zaktualizowano schemat bazy do wersji {version}: {description}")
+            except Exception as e:
+                print(f"Błąd migracji schematu do wersji {version}: {e}")
+                break
+        return current
+
+    def _check_history_fts(self):
+        """Czy indeks pełnotekstowy historii istnieje i da się go odpytać"""
+        try:
+            self.cursor.execute(f"SELECT rowid FROM {HISTORY_FTS_TABLE} LIMIT 0").fetchall()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def get_data_revisions(self, tables=None):
+        """Zwraca {tabela: rewizja}; zmiana wartości oznacza zmianę danych (także z innego połączenia)"""
+        try:
+            rows = self.fetch_all("SELECT table_name, revision FROM data_revisions")
+        except sqlite3.Error as e:
+            print(f"Błąd odczytu rewizji danych: {e}")
+            return {}
+        return {name: revision for name, revision in rows if tables is None or name in tables}
+
+    def get_local_revisions(self, tables=None):
+        """Zwraca {tabela: liczba zmian wykonanych tym połączeniem} (por. get_data_revisions)"""
+        try:
+            rows = self.fetch_all("SELECT table_name, revision FROM temp.local_revisions")
+        except sqlite3.Error as e:
+            print(f"Błąd odczytu lokalnych rewizji danych: {e}")
+            return {}
+        return {name: revision for name, revision in rows if tables is None or name in tables}
+
+    def explain(self, query, params=()):
+        """Zwraca plan wykonania zapytania (kolumna 'detail' z EXPLAIN QUERY PLAN)"""
+        return [row[3] for row in self.fetch_all(f"EXPLAIN QUERY PLAN {query}", params)]
+
     def initialize_default_data(self):
         # Dodanie domyślnego admina
         self.cursor.execute("SELECT * FROM users WHERE username='admin'")
@@ -145,45 +500,261 @@ class DBManager:
         
         self.conn.commit()
 
-    def backup_database(self, backup_dir="backups"):
-        """Tworzy backup bazy danych"""
+    def get_backup_config(self):
+        """Zwraca ustawienia backupu z tabeli settings (z wartościami domyślnymi)"""
+        config = dict(BACKUP_SETTINGS_DEFAULTS)
         try:
-            if not os.path.exists(backup_dir):
-                os.makedirs(backup_dir)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = os.path.join(backup_dir, f"hr_backup_{timestamp}.db")
-            
-            # Zamknij połączenie przed kopiowaniem
-            self.conn.close()
-            
-            # Skopiuj plik bazy danych
-            shutil.copy2(self.db_name, backup_file)
-            
-            # Otwórz ponownie połączenie
-            self.conn = sqlite3.connect(self.db_name)
-            self.cursor = self.conn.cursor()
-            
-            # Zapisz w historii
-            self.execute_query(
-                "INSERT INTO history (operator, action, details) VALUES (?, ?, ?)",
-                ("SYSTEM", "Backup bazy", f"Utworzono backup: {backup_file}")
+            rows = self.fetch_all(
+                f"SELECT key, value FROM settings WHERE key IN ({','.join('?' * len(config))})",
+                tuple(config)
             )
-            
+            config.update({key: (value or '').strip() for key, value in rows})
+        except sqlite3.Error as e:
+            print(f"Błąd odczytu ustawień backupu: {e}")
+
+        def to_int(value):
+            try:
+                return int(value) if value else None
+            except ValueError:
+                return None
+
+        compression = config['backup_compression'].lower()
+        if compression not in BACKUP_EXTENSIONS:
+            print(f"Nieznany rodzaj kompresji backupu: {compression}")
+            compression = ''
+        if compression == 'zstd' and zstandard is None:
+            print("Brak modułu zstandard – backup zostanie skompresowany gzip")
+            compression = 'gzip'
+        # Plik archiwum historii (jeśli istnieje) jest kopiowany razem z bazą
+        _, archive_path = HistoryArchive(self).get_config()
+        return {
+            'compression': compression,
+            'keep_count': to_int(config['backup_keep_count']),
+            'max_age_days': to_int(config['backup_max_age_days']),
+            'archive_path': archive_path if os.path.exists(archive_path) else None,
+        }
+
+    def run_backup(self, backup_dir="backups", compression='', keep_count=None, max_age_days=None,
+                   progress=None, pages=256, archive_path=None):
+        """Backup online przez API SQLite (bez zamykania głównego połączenia).
+
+        Używa wyłącznie własnych połączeń, więc może działać w osobnym wątku.
+        progress(skopiowane_strony, wszystkie_strony) jest wywoływane po każdym kroku.
+        archive_path – plik archiwum historii kopiowany obok backupu (archive_backup_path),
+        z tą samą kompresją, weryfikacją i rotacją.
+        Zwraca ścieżkę zweryfikowanego pliku bazy; w razie błędu zgłasza wyjątek.
+        """
+        os.makedirs(backup_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        db_file = os.path.join(backup_dir, f"hr_backup_{timestamp}.db")
+        copies = [(self.db_name, db_file)]
+        if archive_path and os.path.exists(archive_path):
+            copies.append((archive_path, self.archive_backup_path(db_file)))
+
+        def on_progress(status, remaining, total):
+            if progress:
+                progress(total - remaining, total)
+
+        created = []
+        try:
+            for source_path, target_path in copies:
+                self._copy_database(source_path, target_path, pages, on_progress)
+                self.check_backup_integrity(target_path)
+                created.append(self._compress_backup(target_path, compression))
+        except Exception:
+            for path in [target for _, target in copies] + created:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+
+        backup_file = created[0]
+        self.rotate_backups(backup_dir, keep_count, max_age_days, keep=backup_file)
+        return backup_file
+
+    @staticmethod
+    def _copy_database(source_path, target_path, pages, progress):
+        source = sqlite3.connect(source_path, timeout=30)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target, pages=pages, progress=progress)
+            # Kopia ma być samodzielnym plikiem – bez dziennika WAL obok
+            target.execute("PRAGMA journal_mode=DELETE").fetchall()
+        finally:
+            target.close()
+            source.close()
+
+    @staticmethod
+    def archive_backup_path(backup_file):
+        """Ścieżka kopii archiwum historii należącej do danego pliku backupu"""
+        for extension in sorted(BACKUP_EXTENSIONS.values(), key=len, reverse=True):
+            if backup_file.endswith(extension):
+                return backup_file[:-len(extension)] + ARCHIVE_BACKUP_SUFFIX + extension
+        return backup_file + ARCHIVE_BACKUP_SUFFIX
+
+    @staticmethod
+    def check_backup_integrity(path):
+        """Sprawdza plik backupu (PRAGMA integrity_check); zgłasza wyjątek przy błędzie"""
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            result = [row[0] for row in conn.execute("PRAGMA integrity_check").fetchall()]
+        finally:
+            conn.close()
+        if result != ['ok']:
+            raise sqlite3.DatabaseError(f"Backup {path} jest uszkodzony: {'; '.join(result[:5])}")
+
+    @staticmethod
+    def _compress_backup(db_file, compression):
+        if not compression:
+            return db_file
+        target = db_file[:-len('.db')] + BACKUP_EXTENSIONS[compression]
+        with open(db_file, 'rb') as src:
+            if compression == 'gzip':
+                with gzip.open(target, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+            else:
+                with open(target, 'wb') as dst:
+                    zstandard.ZstdCompressor().copy_stream(src, dst)
+        os.remove(db_file)
+        return target
+
+    @staticmethod
+    def rotate_backups(backup_dir, keep_count=None, max_age_days=None, keep=None):
+        """Usuwa najstarsze backupy ponad limit liczby kopii lub starsze niż max_age_days"""
+        if not keep_count and not max_age_days:
+            return []
+        try:
+            # Kopie archiwum historii nie liczą się do limitu – są usuwane razem ze swoim backupem
+            files = [os.path.join(backup_dir, f) for f in os.listdir(backup_dir)
+                     if f.startswith("hr_backup_") and f.endswith(tuple(BACKUP_EXTENSIONS.values()))
+                     and ARCHIVE_BACKUP_SUFFIX + '.' not in f]
+        except OSError as e:
+            print(f"Błąd odczytu katalogu backupów: {e}")
+            return []
+        files.sort(key=os.path.getmtime, reverse=True)
+
+        to_remove = set(files[keep_count:]) if keep_count else set()
+        if max_age_days:
+            limit = (datetime.now() - timedelta(days=max_age_days)).timestamp()
+            to_remove.update(f for f in files if os.path.getmtime(f) < limit)
+        to_remove.discard(keep)
+
+        removed = []
+        for path in sorted(to_remove):
+            for file in (path, DBManager.archive_backup_path(path)):
+                if file != path and not os.path.exists(file):
+                    continue
+                try:
+                    os.remove(file)
+                    removed.append(file)
+                except OSError as e:
+                    print(f"Błąd usuwania starego backupu {file}: {e}")
+        return removed
+
+    def log_backup(self, backup_file):
+        details = f"Utworzono backup: {backup_file}"
+        archive_file = self.archive_backup_path(backup_file)
+        if os.path.exists(archive_file):
+            details += f" (archiwum historii: {archive_file})"
+        self.execute_query(
+            "INSERT INTO history (operator, action, details) VALUES (?, ?, ?)",
+            ("SYSTEM", "Backup bazy", details)
+        )
+
+    def backup_database(self, backup_dir="backups"):
+        """Tworzy backup bazy danych (synchronicznie, z ustawieniami z tabeli settings)"""
+        try:
+            backup_file = self.run_backup(backup_dir, **self.get_backup_config())
+            self.log_backup(backup_file)
             return backup_file
         except Exception as e:
             print(f"Błąd podczas backupu: {e}")
-            # Przywróć połączenie w przypadku błędu
-            self.conn = sqlite3.connect(self.db_name)
-            self.cursor = self.conn.cursor()
             return None
 
+    def checkpoint(self):
+        """Zapisuje zawartość dziennika WAL do pliku bazy"""
+        if self.effective_pragmas.get('journal_mode', '').lower() != 'wal':
+            return
+        try:
+            self.cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        except sqlite3.Error as e:
+            print(f"Błąd punktu kontrolnego WAL: {e}")
+
+    def close(self):
+        """Zamyka połączenie (z optymalizacją statystyk i punktem kontrolnym WAL)"""
+        try:
+            if self.conn.in_transaction:
+                self.conn.commit()
+            self.cursor.execute("PRAGMA optimize").fetchall()
+            self.checkpoint()
+        except sqlite3.Error as e:
+            print(f"Błąd podczas zamykania bazy: {e}")
+        finally:
+            self.conn.close()
+
     def get_connection(self):
         return self.conn
 
+    @contextmanager
+    def transaction(self):
+        """Transakcja z zagnieżdżaniem (SAVEPOINT) – COMMIT tylko na zewnętrznej granicy"""
+        level = self._tx_depth
+        savepoint = f"sp_{level}"
+        if level == 0:
+            if self.conn.in_transaction:
+                self.conn.commit()
+            self.cursor.execute("BEGIN")
+        else:
+            self.cursor.execute(f"SAVEPOINT {savepoint}")
+        self._commit_callbacks.append([])
+        self._tx_depth += 1
+
+        try:
+            yield self
+        except BaseException:
+            self._tx_depth -= 1
+            self._commit_callbacks.pop()
+            try:
+                if level == 0:
+                    self.conn.rollback()
+                elif self.conn.in_transaction:
+                    self.cursor.execute(f"ROLLBACK TO {savepoint}")
+                    self.cursor.execute(f"RELEASE {savepoint}")
+            except sqlite3.Error as e:
+                print(f"Błąd wycofywania transakcji: {e}")
+            raise
+
+        self._tx_depth -= 1
+        callbacks = self._commit_callbacks.pop()
+        if level > 0:
+            self.cursor.execute(f"RELEASE {savepoint}")
+            self._commit_callbacks[-1].extend(callbacks)
+            return
+
+        try:
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Błąd akcji po zatwierdzeniu transakcji: {e}")
+
+    def in_transaction(self):
+        return self._tx_depth > 0
+
+    def call_on_commit(self, callback):
+        """Wykonuje akcję po zatwierdzeniu bieżącej transakcji (lub od razu, gdy jej brak)"""
+        if self._tx_depth == 0:
+            callback()
+        else:
+            self._commit_callbacks[-1].append(callback)
+
     def execute_query(self, query, params=()):
         self.cursor.execute(query, params)
-        self.conn.commit()
+        if self._tx_depth == 0:
+            self.conn.commit()
 
     def fetch_all(self, query, params=()):
         self.cursor.execute(query, params)
@@ -191,4 +762,30 @@ class DBManager:
 
     def fetch_one(self, query, params=()):
         self.cursor.execute(query, params)
-        return self.cursor.fetchone()
\ No newline at end of file
+        return self.cursor.fetchone()
+
+
+def check_query_plans(db, queries):
+    """Sprawdza plany zapytań (nazwa, SQL, parametry, tabele/podzapytania, które wolno skanować).
+
+    Zwraca listę zapytań wykonujących pełny skan tabeli. Zapytania z gorących ścieżek
+    dostarcza EmployeeManagement.hot_queries() – te same stałe SQL, których używa aplikacja.
+    """
+    regressions = []
+    for name, query, params, allowed_scans in queries:
+        plan = db.explain(query, params)
+        full_scans = [d for d in plan if d.startswith("SCAN") and "INDEX" not in d
+                      and d.split()[1] not in allowed_scans]
+        print(f"{'BŁĄD' if full_scans else 'OK  '} {name}: {'; '.join(plan)}")
+        if full_scans:
+            regressions.append((name, plan))
+    return regressions
+
+
+if __name__ == "__main__":
+    import sys
+    from employee_management import EmployeeManagement
+    manager = DBManager(sys.argv[1] if len(sys.argv) > 1 else "hr_system.db")
+    problems = check_query_plans(manager, EmployeeManagement(manager).hot_queries())
+    manager.close()
+    sys.exit(1 if problems else 0)
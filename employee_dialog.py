@@ -153,7 +153,6 @@ class EmployeeDialog(tk.Toplevel):
         
         if result.get('success'):
             messagebox.showinfo("Sukces", "Pracownik zapisany pomyślnie!")
-            self.master.refresh_employee_list()
             self.destroy()
         else:
             if result.get('overflow'):
@@ -0,0 +1,227 @@
+from collections import defaultdict
+
+# Kolumny krotki pracownika: (id, imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna)
+FILTER_COLUMNS = {'stanowisko': 3, 'wydzial': 4, 'zmiana': 5, 'status': 6, 'maszyna': 7}
+SURNAME_COLUMN = 2
+
+# Wartości traktowane jako brak danych (wyszukiwania "bez stanowiska/wydziału/maszyny")
+MISSING_VALUES = {
+    'stanowisko': {'', 'nieustawione', 'brak', 'none', 'null'},
+    'wydzial': {'', 'nieustawiony', 'brak', 'none', 'null'},
+    'maszyna': {'', 'brak', 'none', 'null', 'nieustawione'},
+}
+
+# Długość indeksowanych fragmentów nazwiska (trigramy); krótsze zapytania przeszukują słownik nazwisk
+GRAM_SIZE = 3
+
+
+def _grams(text):
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+class EmployeeFilter:
+    """Filtrowanie pracowników na indeksach odwróconych (wartość kolumny -> zbiór id)"""
+
+    def __init__(self, employees=()):
+        self.rebuild(employees)
+
+    def rebuild(self, employees):
+        """Buduje indeksy od nowa dla podanej listy pracowników.
+
+        Lista nie jest kopiowana – aktualność indeksów sprawdza matches_data po tożsamości listy
+        (magazyn pracowników tworzy nową listę przy każdej zmianie), więc nie wolno jej modyfikować.
+        """
+        self.employees = employees
+        self.by_id = {}
+        self._position = {}
+        self.indexes = {name: defaultdict(set) for name in FILTER_COLUMNS}
+        self.surnames = {}
+        self._surname_grams = None  # indeks trigramów budowany przy pierwszym wyszukiwaniu nazwiska
+
+        columns = [(self.indexes[name], col) for name, col in FILTER_COLUMNS.items()]
+        for pos, emp in enumerate(self.employees):
+            emp_id = emp[0]
+            self.by_id[emp_id] = emp
+            self._position[emp_id] = pos
+            for index, col in columns:
+                index[emp[col]].add(emp_id)
+            self.surnames[emp_id] = str(emp[SURNAME_COLUMN]).lower() if emp[SURNAME_COLUMN] else ''
+
+    def _index(self, emp):
+        emp_id = emp[0]
+        self.by_id[emp_id] = emp
+        for name, col in FILTER_COLUMNS.items():
+            self.indexes[name][emp[col]].add(emp_id)
+        surname = str(emp[SURNAME_COLUMN]).lower() if emp[SURNAME_COLUMN] else ''
+        self.surnames[emp_id] = surname
+        if self._surname_grams is not None:
+            for gram in _grams(surname):
+                self._surname_grams[gram].add(emp_id)
+
+    def _unindex(self, emp):
+        emp_id = emp[0]
+        self.by_id.pop(emp_id, None)
+        for name, col in FILTER_COLUMNS.items():
+            ids = self.indexes[name].get(emp[col])
+            if ids is not None:
+                ids.discard(emp_id)
+                if not ids:
+                    del self.indexes[name][emp[col]]
+        surname = self.surnames.pop(emp_id, '')
+        if self._surname_grams is not None:
+            for gram in _grams(surname):
+                self._surname_grams[gram].discard(emp_id)
+
+    def apply_changes(self, changes, employees):
+        """Aktualizuje indeksy tylko o zmienione wiersze (zmiany z magazynu pracowników).
+
+        changes to obiekty z polami old/new (wiersz przed i po zmianie lub None),
+        employees – aktualna lista źródłowa wyznaczająca kolejność wyników.
+        """
+        for change in changes:
+            if change.old is not None:
+                self._unindex(change.old)
+            if change.new is not None:
+                self._index(change.new)
+        self.employees = employees
+        self._position = None  # kolejność odtwarzana dopiero przy pierwszym zapytaniu z filtrem
+
+    @property
+    def position(self):
+        """Pozycja pracownika na liście źródłowej (id -> indeks)"""
+        if self._position is None:
+            self._position = {emp[0]: pos for pos, emp in enumerate(self.employees)}
+        return self._position
+
+    @property
+    def surname_grams(self):
+        """Indeks trigram -> zbiór id (tworzony leniwie)"""
+        if self._surname_grams is None:
+            grams_index = defaultdict(set)
+            for emp_id, surname in self.surnames.items():
+                for gram in _grams(surname):
+                    grams_index[gram].add(emp_id)
+            self._surname_grams = grams_index
+        return self._surname_grams
+
+    def matches_data(self, employees):
+        """Czy indeksy odpowiadają tej liście (porównanie tożsamości – bez przeglądania wierszy)"""
+        return self.employees is employees
+
+    # ---------------- ZAPYTANIA ----------------
+    def surname_ids(self, text):
+        """Id pracowników, których nazwisko zawiera podany fragment (bez rozróżniania wielkości liter)"""
+        text = (text or '').strip().lower()
+        if not text:
+            return set(self.by_id)
+        if len(text) < GRAM_SIZE:
+            return {emp_id for emp_id, surname in self.surnames.items() if text in surname}
+        if len(text) == GRAM_SIZE:
+            return set(self.surname_grams.get(text, ()))
+
+        grams = sorted((self.surname_grams.get(g, set()) for g in _grams(text)), key=len)
+        candidates = set(grams[0]).intersection(*grams[1:])
+        return {emp_id for emp_id in candidates if text in self.surnames[emp_id]}
+
+    def ids(self, nazwisko=None, **filters):
+        """Zbiór id spełniających wszystkie filtry (puste wartości są pomijane)"""
+        sets = []
+        for name, value in filters.items():
+            if not value:
+                continue
+            if name not in FILTER_COLUMNS:
+                raise KeyError(f"Nieznany filtr: {name}")
+            sets.append(self.indexes[name].get(value, set()))
+        if nazwisko and nazwisko.strip():
+            sets.append(self.surname_ids(nazwisko))
+
+        if not sets:
+            return set(self.by_id)
+        sets.sort(key=len)
+        return set(sets[0]).intersection(*sets[1:])
+
+    def query(self, nazwisko=None, **filters):
+        """Lista pracowników spełniających filtry – w kolejności danych źródłowych"""
+        if not nazwisko and not any(filters.values()):
+            return list(self.employees)
+        return self.rows(self.ids(nazwisko, **filters))
+
+    def missing_ids(self, column):
+        """Id pracowników bez ustawionej wartości w kolumnie (stanowisko, wydzial, maszyna)"""
+        missing = MISSING_VALUES[column]
+        result = set()
+        for value, ids in self.indexes[column].items():
+            normalized = str(value).strip().lower() if value else ''
+            if normalized in missing:
+                result |= ids
+        return result
+
+    def find_missing(self, *columns):
+        """Pracownicy z brakiem danych w dowolnej z podanych kolumn"""
+        ids = set()
+        for column in columns or tuple(MISSING_VALUES):
+            ids |= self.missing_ids(column)
+        return self.rows(ids)
+
+    def rows(self, ids):
+        return [self.by_id[emp_id] for emp_id in sorted(ids, key=self.position.__getitem__)]
+
+
+if __name__ == "__main__":
+    # Benchmark: indeksy vs liniowy skan dla 50 000 pracowników
+    import random
+    import string
+    import time
+
+    random.seed(1)
+    wydzialy = [f"Wydział {i}" for i in range(12)]
+    zmiany = ["A - Rano (6-14)", "B - Południe (14-22)", "C - Noc (22-6)", "D - Wolne"]
+    statusy = ["W Pracy", "Urlop", "L4", "Wolne"]
+    stanowiska = [f"Stanowisko {i}" for i in range(40)] + ["Nieustawione"]
+    maszyny = [f"M-{i:03d}" for i in range(200)] + ["Brak"]
+
+    def random_surname():
+        return random.choice(string.ascii_uppercase) + ''.join(random.choices('aeiouklmnprstwyz', k=random.randint(4, 10)))
+
+    employees = [
+        (i, "Jan", random_surname(), random.choice(stanowiska), random.choice(wydzialy),
+         random.choice(zmiany), random.choice(statusy), random.choice(maszyny))
+        for i in range(1, 50001)
+    ]
+
+    def linear(data, wydzial='', zmiana='', status='', nazwisko=''):
+        return [e for e in data
+                if (not wydzial or e[4] == wydzial) and (not zmiana or e[5] == zmiana)
+                and (not status or e[6] == status)
+                and (not nazwisko or (e[2] and nazwisko in str(e[2]).lower()))]
+
+    start = time.perf_counter()
+    engine = EmployeeFilter(employees)
+    print(f"Budowa indeksów: {(time.perf_counter() - start) * 1000:.1f} ms")
+    start = time.perf_counter()
+    engine.surname_grams
+    print(f"Budowa indeksu trigramów nazwisk: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    queries = [
+        {'wydzial': "Wydział 3"},
+        {'wydzial': "Wydział 3", 'zmiana': "A - Rano (6-14)", 'status': "W Pracy"},
+        {'nazwisko': "ka"},
+        {'nazwisko': "kowa"},
+        {'wydzial': "Wydział 7", 'nazwisko': "mar"},
+    ]
+    for params in queries:
+        runs = 20
+        start = time.perf_counter()
+        for _ in range(runs):
+            expected = linear(employees, **params)
+        t_linear = (time.perf_counter() - start) / runs * 1000
+        start = time.perf_counter()
+        for _ in range(runs):
+            result = engine.query(**params)
+        t_index = (time.perf_counter() - start) / runs * 1000
+        assert result == expected, params
+        print(f"{params}: {len(result)} wyników, skan {t_linear:.2f} ms, indeks {t_index:.2f} ms")
+
+    start = time.perf_counter()
+    missing = engine.find_missing()
+    print(f"Braki danych: {len(missing)} pracowników w {(time.perf_counter() - start) * 1000:.2f} ms")
@@ -0,0 +1,129 @@
+import pandas as pd
+
+IMPORT_COLUMNS = ['imie', 'nazwisko', 'stanowisko', 'wydzial', 'zmiana', 'status', 'maszyna']
+
+# Wartości dla brakujących kolumn i pustych komórek (dozwolone mimo braku w słownikach)
+IMPORT_DEFAULTS = {
+    'stanowisko': 'Nieustawione',
+    'wydzial': 'Nieustawiony',
+    'zmiana': 'D - Wolne',
+    'status': 'Wolne',
+    'maszyna': 'Brak',
+}
+
+# Nagłówki z eksportu do Excela -> nazwy kolumn importu
+COLUMN_ALIASES = {
+    'imię': 'imie',
+    'wydział': 'wydzial',
+    'maszyna/urządzenie': 'maszyna',
+    'maszyna/urzadzenie': 'maszyna',
+}
+
+# Kolumny sprawdzane ze słownikami z tabeli settings
+DICTIONARY_SETTINGS = {'wydzial': 'wydzialy', 'stanowisko': 'stanowiska', 'maszyna': 'maszyny'}
+WORKING_SHIFTS = ["A - Rano (6-14)", "B - Południe (14-22)", "C - Noc (22-6)"]
+
+
+def normalize_columns(df):
+    """Ujednolica nagłówki (małe litery, podkreślenia, nazwy z eksportu)"""
+    df = df.copy()
+    names = [str(c).strip().lower() for c in df.columns]
+    df.columns = [COLUMN_ALIASES.get(name, name.replace(' ', '_')) for name in names]
+    return df
+
+
+def prepare_import(df, emp_manager):
+    """Waliduje i normalizuje dane importu operacjami na całych kolumnach.
+
+    Zwraca słownik:
+      rows – przyjęte wiersze (kolumny IMPORT_COLUMNS, indeks = numer wiersza w Excelu),
+      rejected – raport odrzuceń (wiersz, imie, nazwisko, powod),
+      overflow – maska przyjętych wierszy przekraczających wymaganą obsadę.
+    """
+    df = normalize_columns(df)
+    if 'imie' not in df.columns or 'nazwisko' not in df.columns:
+        raise ValueError("Plik musi zawierać kolumny: imie, nazwisko")
+
+    # Numer wiersza w arkuszu (nagłówek to wiersz 1)
+    df.index = pd.RangeIndex(2, len(df) + 2, name='wiersz')
+    data = pd.DataFrame(index=df.index)
+    for col in IMPORT_COLUMNS:
+        values = df[col] if col in df.columns else pd.Series(pd.NA, index=df.index)
+        values = values.astype('string').str.strip().replace('', pd.NA)
+        data[col] = values.fillna(IMPORT_DEFAULTS[col]) if col in IMPORT_DEFAULTS else values
+
+    reasons = pd.Series('', index=data.index, dtype='string')
+
+    def reject(mask, reason):
+        nonlocal reasons
+        mask = mask.fillna(False).astype(bool)
+        reasons = reasons.mask(mask, reasons + '; ' + reason)
+
+    reject(data['imie'].isna() | data['nazwisko'].isna(), "brak imienia lub nazwiska")
+
+    # Wartości spoza słowników (pusty słownik = brak sprawdzania)
+    for col, setting in DICTIONARY_SETTINGS.items():
+        allowed = set(emp_manager.get_setting(setting) or [])
+        if allowed:
+            allowed.add(IMPORT_DEFAULTS[col])
+            reject(~data[col].isin(allowed), f"nieznany {col}: " + data[col].fillna(''))
+    shifts = {s[0] for s in (emp_manager.get_shifts_config() or [])}
+    if shifts:
+        shifts.add(IMPORT_DEFAULTS['zmiana'])
+        reject(~data['zmiana'].isin(shifts), "nieznana zmiana: " + data['zmiana'].fillna(''))
+
+    # Status według zmiany – te same reguły co przy dodawaniu pojedynczego pracownika
+    zmiana = data['zmiana'].fillna('')
+    data['status'] = data['status'].mask(zmiana.isin(WORKING_SHIFTS), 'W Pracy')
+    data['status'] = data['status'].mask(zmiana.str.contains('Wolne', regex=False), 'Wolne')
+    statuses = {s[0] for s in (emp_manager.get_statuses_config() or [])}
+    if statuses:
+        statuses.add(IMPORT_DEFAULTS['status'])
+        reject(~data['status'].isin(statuses), "nieznany status: " + data['status'].fillna(''))
+
+    # Duplikaty w pliku i względem pracowników w bazie (imię + nazwisko bez wielkości liter)
+    key = data['imie'].str.lower().fillna('') + '|' + data['nazwisko'].str.lower().fillna('')
+    existing = {f"{(imie or '').strip().lower()}|{(nazwisko or '').strip().lower()}"
+                for imie, nazwisko in emp_manager.db.fetch_all("SELECT imie, nazwisko FROM employees")}
+    reject(key.isin(existing), "pracownik już istnieje w bazie")
+    reject(key.duplicated(keep='first'), "powtórzony wiersz w pliku")
+
+    # Kolejne osoby w komórce obsady: obecni pracujący + numer w pliku ponad wymaganą obsadę
+    accepted = reasons == ''
+    overflow = pd.Series(False, index=data.index)
+    working = accepted & (data['status'] == 'W Pracy') & ~zmiana.str.contains('Wolne', regex=False)
+    if working.any():
+        matrix = emp_manager.get_staffing_matrix()
+        cells = data.loc[working, ['wydzial', 'zmiana']]
+        cell_keys = list(zip(cells['wydzial'], cells['zmiana']))
+        required = pd.Series([matrix.get(k, {}).get('required', 0) for k in cell_keys], index=cells.index)
+        current = pd.Series([matrix.get(k, {}).get('current', 0) for k in cell_keys], index=cells.index)
+        position = cells.groupby(['wydzial', 'zmiana']).cumcount() + 1
+        overflow.loc[cells.index] = (required > 0) & (current + position > required)
+
+    rejected = data.loc[~accepted, ['imie', 'nazwisko']].copy()
+    rejected['powod'] = reasons[~accepted].str.lstrip('; ')
+    return {
+        'rows': data.loc[accepted, IMPORT_COLUMNS],
+        'rejected': rejected.reset_index(),
+        'overflow': overflow[accepted],
+    }
+
+
+def reject_overflow(result, reason="przekroczenie wymaganej obsady"):
+    """Przenosi wiersze ponad obsadę z przyjętych do raportu odrzuceń"""
+    overflow = result['overflow']
+    moved = result['rows'].loc[overflow, ['imie', 'nazwisko']].copy()
+    moved['powod'] = reason
+    return {
+        'rows': result['rows'].loc[~overflow],
+        'rejected': pd.concat([result['rejected'], moved.reset_index()], ignore_index=True)
+                      .sort_values('wiersz', kind='stable', ignore_index=True),
+        'overflow': overflow[~overflow],
+    }
+
+
+def to_records(rows):
+    """Wiersze DataFrame jako krotki do executemany (None zamiast braków)"""
+    return list(rows[IMPORT_COLUMNS].astype(object).where(rows[IMPORT_COLUMNS].notna(), None)
+                .itertuples(index=False, name=None))
@@ -1,11 +1,82 @@
-from db_manager import DBManager
+from db_manager import DBManager, DICTIONARY_TABLES
+from staffing_counters import StaffingCounters, STAFFING_COUNTS_SQL
+from absence_index import AbsenceIndex, PENDING_ABSENCES_SQL
+from history_queue import HistoryQueue
+from history_archive import HistoryArchive
+from employee_store import EmployeeStore, EMPLOYEE_COLUMNS
+from reference_cache import ReferenceCache, REFERENCE_TABLES
+from collections import Counter
 import datetime
 
+# Liczba wpisów historii pobieranych na jedną stronę
+HISTORY_PAGE_SIZE = 200
+
+# Operacje grupowe: rozmiar porcji id w WHERE id IN (...) i wyniki dla pojedynczych pracowników
+BULK_CHUNK_SIZE = 500
+BULK_UPDATED = 'updated'      # zmieniono
+BULK_UNCHANGED = 'unchanged'  # wartość już była taka sama
+BULK_MISSING = 'missing'      # brak pracownika o tym id
+BULK_FAILED = 'failed'        # błąd zapisu – transakcja wycofana
+
+# Liczba komórek wymaganej obsady wypisywanych w zbiorczym wpisie historii
+REQUIRED_STAFF_LOG_CELLS = 10
+
+# Listy wydziałów, stanowisk i maszyn: klucz ustawienia -> tabela słownika
+DICTIONARY_KEYS = {key: table for table, (key, _) in DICTIONARY_TABLES.items()}
+
+# Zapytania z gorących ścieżek – ich plany sprawdza db_manager.check_query_plans (przez hot_queries)
+STAFFING_MATRIX_SQL = """
+    SELECT c.wydzial, c.zmiana, COALESCE(r.required_count, 0), c.current_count
+    FROM (
+        SELECT wydzial, zmiana, COUNT(*) AS current_count
+        FROM employees
+        WHERE status='W Pracy'
+        GROUP BY wydzial, zmiana
+    ) c
+    LEFT JOIN required_staff r ON r.wydzial = c.wydzial AND r.zmiana = c.zmiana
+    UNION ALL
+    SELECT r.wydzial, r.zmiana, r.required_count, 0
+    FROM required_staff r
+    WHERE NOT EXISTS (
+        SELECT 1 FROM employees e
+        WHERE e.wydzial = r.wydzial AND e.zmiana = r.zmiana AND e.status='W Pracy'
+    )
+"""
+WORKING_EMPLOYEES_SQL = "SELECT id, imie, nazwisko FROM employees WHERE wydzial=? AND zmiana=? AND status='W Pracy' ORDER BY id"
+EMPLOYEE_HISTORY_SQL = """
+    SELECT id, timestamp, operator, action, details, field, old_value, new_value FROM history
+    WHERE employee_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?
+"""
+ACTIVE_ABSENCE_SQL = """
+    SELECT start_date, end_date
+    FROM {table}
+    WHERE employee_id = ? AND start_date <= ? AND end_date >= ?
+    ORDER BY start_date DESC LIMIT 1
+"""
+
 class EmployeeManagement:
     def __init__(self, db_manager: DBManager, current_user=None):
         self.db = db_manager
         self.current_user = current_user  # POPRAWIONE: current_user zamiast user
 
+        # Ustawienia, zmiany, statusy i wymagana obsada w pamięci (unieważniane przy zapisie)
+        self.reference_cache = ReferenceCache(db_manager)
+
+        # Wspólne liczniki obsady – uzgadniane z bazą przy starcie
+        self.staffing_counters = StaffingCounters.for_db(db_manager)
+        self.staffing_counters.rebuild()
+
+        # Bieżące i nadchodzące urlopy/L4 (ładowane przy pierwszym użyciu)
+        self.absence_index = AbsenceIndex(db_manager)
+
+        # Wpisy historii buforowane i zapisywane paczkami
+        self.history_queue = HistoryQueue.from_settings(db_manager)
+        # Starsze wpisy przenoszone do miesięcznych tabel w pliku archiwum
+        self.history_archive = HistoryArchive(db_manager)
+
+        # Wspólna lista pracowników w pamięci – odświeżana wierszami po zatwierdzeniu zmian
+        self.employee_store = EmployeeStore.for_db(db_manager)
+
     def set_current_user(self, user):
         self.current_user = user
 
@@ -25,18 +96,22 @@ class EmployeeManagement:
             elif zmiana in ["A - Rano (6-14)", "B - Południe (14-22)", "C - Noc (22-6)"]:
                 status = "W Pracy"
                 
-            self.db.execute_query("""
-                INSERT INTO employees (imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna))
-            self.log_history("Dodanie Pracownika", f"Dodano pracownika: {imie} {nazwisko}")
+            with self.db.transaction():
+                self.db.execute_query("""
+                    INSERT INTO employees (imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna))
+                emp_id = self.db.cursor.lastrowid
+                self.log_history("Dodanie Pracownika", f"Dodano pracownika: {imie} {nazwisko}", employee_id=emp_id)
+                self._apply_counters_on_commit(None, (wydzial, zmiana, status))
+                self._refresh_store_on_commit([emp_id])
             return {'success': True, 'overflow': False}
         except Exception as e:
             print(f"Błąd dodawania pracownika: {e}")
             return {'success': False, 'overflow': False}
 
     def update_employee(self, emp_id, imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna):
-        old_emp = self.db.fetch_one("SELECT * FROM employees WHERE id=?", (emp_id,))
+        old_emp = self.db.fetch_one(f"SELECT {EMPLOYEE_COLUMNS} FROM employees WHERE id=?", (emp_id,))
         if not old_emp:
             return {'success': False, 'overflow': False}
 
@@ -54,40 +129,105 @@ class EmployeeManagement:
             elif zmiana in ["A - Rano (6-14)", "B - Południe (14-22)", "C - Noc (22-6)"]:
                 status = "W Pracy"
                 
-            self.db.execute_query("""
-                UPDATE employees SET imie=?, nazwisko=?, stanowisko=?, wydzial=?, zmiana=?, status=?, maszyna=?
-                WHERE id=?
-            """, (imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna, emp_id))
-
             details = f"Zmieniono dane pracownika ID {emp_id}: {old_emp[1]} {old_emp[2]}"
-            self.log_history("Edycja Pracownika", details)
+            with self.db.transaction():
+                self.db.execute_query("""
+                    UPDATE employees SET imie=?, nazwisko=?, stanowisko=?, wydzial=?, zmiana=?, status=?, maszyna=?
+                    WHERE id=?
+                """, (imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna, emp_id))
+                self.log_history("Edycja Pracownika", details, employee_id=emp_id)
+                self._apply_counters_on_commit((old_emp[4], old_emp[5], old_emp[6]), (wydzial, zmiana, status))
+                self._refresh_store_on_commit([emp_id])
             return {'success': True, 'overflow': False}
         except Exception as e:
             print(f"Błąd aktualizacji pracownika: {e}")
             return {'success': False, 'overflow': False}
 
     def delete_employee(self, emp_id):
-        emp_name = self.db.fetch_one("SELECT imie, nazwisko FROM employees WHERE id=?", (emp_id,))
+        emp_name = self.db.fetch_one("SELECT imie, nazwisko, wydzial, zmiana, status FROM employees WHERE id=?", (emp_id,))
         try:
-            self.db.execute_query("DELETE FROM employees WHERE id=?", (emp_id,))
-            if emp_name:
-                self.log_history("Usunięcie Pracownika", f"Usunięto pracownika: {emp_name[0]} {emp_name[1]}")
+            with self.db.transaction():
+                self.db.execute_query("DELETE FROM employees WHERE id=?", (emp_id,))
+                if emp_name:
+                    self.log_history("Usunięcie Pracownika", f"Usunięto pracownika: {emp_name[0]} {emp_name[1]}",
+                                     employee_id=emp_id)
+                    self._apply_counters_on_commit((emp_name[2], emp_name[3], emp_name[4]), None)
+                self._refresh_store_on_commit([emp_id])
             return True
         except Exception as e:
             print(f"Błąd usuwania pracownika: {e}")
             return False
 
     def get_all_employees(self):
-        return self.db.fetch_all("SELECT * FROM employees ORDER BY nazwisko, imie")
+        """Pracownicy posortowani po nazwisku i imieniu (z magazynu w pamięci)"""
+        return list(self.employee_store.all())
+
+    def get_employee(self, emp_id):
+        """Pełny wiersz pracownika (id, imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna) lub None"""
+        return self.employee_store.get(emp_id)
 
     # --- NOWE METODY DO SPRAWDZANIA OBSADY ---
-    def get_staffing_info(self, wydzial, zmiana):
+    def get_staffing_matrix(self):
+        """Zwraca pełną macierz obsady {(wydzial, zmiana): {'required': ..., 'current': ...}} jednym zapytaniem"""
+        matrix = {}
+        try:
+            rows = self.db.fetch_all(STAFFING_MATRIX_SQL)
+        except Exception as e:
+            print(f"Błąd pobierania macierzy obsady: {e}")
+            return matrix
+
+        for wydzial, zmiana, required, current in rows:
+            matrix[(wydzial, zmiana)] = {'required': required or 0, 'current': current or 0}
+        return matrix
+
+    def verify_staffing_counters(self):
+        """Uzgadnia liczniki obsady w pamięci z bazą (start, import, cykliczne alerty)"""
+        differences = self.staffing_counters.verify()
+        # Dane słownikowe zmienione na innych stanowiskach
+        self.reference_cache.check_revisions()
+        if differences:
+            print(f"Liczniki obsady uzgodnione z bazą ({len(differences)} rozbieżności)")
+        return differences
+
+    def compute_staffing_groups(self, employees):
+        """Obsada w jednym przebiegu: {(wydzial, zmiana): {'required', 'current', 'overflow', 'shortage'}}
+
+        Liczy pracowników 'W Pracy' z podanej listy (bez zmian wolnych); wspólne źródło
+        dla listy głównej, kafelka podsumowania i okna podsumowania.
+        """
+        counts = Counter(
+            (emp[4], emp[5]) for emp in employees
+            if emp[6] == "W Pracy" and emp[5] and "Wolne" not in emp[5]
+        )
+        required_map = self.get_required_staff_map()
+        groups = {}
+        for key, current in counts.items():
+            required = required_map.get(key, 0)
+            groups[key] = {
+                'required': required,
+                'current': current,
+                'overflow': max(0, current - required) if required > 0 else 0,
+                'shortage': max(0, required - current) if required > 0 else 0,
+            }
+        return groups
+
+    def _apply_counters_on_commit(self, old_key, new_key):
+        """Aktualizuje liczniki obsady dopiero po zatwierdzeniu transakcji"""
+        self.db.call_on_commit(lambda: self.staffing_counters.apply(old_key, new_key))
+
+    def _refresh_store_on_commit(self, ids):
+        """Odświeża zmienione wiersze magazynu pracowników (i powiadamia subskrybentów) po zatwierdzeniu"""
+        self.db.call_on_commit(lambda: self.employee_store.refresh_ids(ids))
+
+    def get_staffing_info(self, wydzial, zmiana, matrix=None):
         """Zwraca informacje o obsadzie dla wydziału i zmiany"""
-        required = self.get_required_staff_by_wydzial_shift(wydzial, zmiana)
-        current_count = len(self.db.fetch_all(
-            "SELECT id FROM employees WHERE wydzial=? AND zmiana=? AND status='W Pracy'",
-            (wydzial, zmiana)
-        ))
+        if matrix is None:
+            required = self.get_required_staff_map().get((wydzial, zmiana), 0)
+            current_count = self.staffing_counters.get(wydzial, zmiana, 'W Pracy')
+        else:
+            cell = matrix.get((wydzial, zmiana), {'required': 0, 'current': 0})
+            required = cell['required']
+            current_count = cell['current']
         
         return {
             'required': required,
@@ -97,9 +237,12 @@ class EmployeeManagement:
             'excess': current_count - required if required > 0 and current_count > required else 0
         }
 
-    def check_staffing_overflow(self, wydzial, zmiana, current_count):
+    def check_staffing_overflow(self, wydzial, zmiana, current_count, matrix=None):
         """Sprawdza czy nie przekraczamy wymaganej obsady"""
-        required = self.get_required_staff_by_wydzial_shift(wydzial, zmiana)
+        if matrix is None:
+            required = self.get_required_staff_map().get((wydzial, zmiana), 0)
+        else:
+            required = matrix.get((wydzial, zmiana), {'required': 0})['required']
         if required > 0 and current_count >= required:
             return {
                 'overflow': True,
@@ -109,35 +252,29 @@ class EmployeeManagement:
             }
         return {'overflow': False}
 
-    def find_available_shifts(self, wydzial):
+    def find_available_shifts(self, wydzial, matrix=None):
         """Znajduje zmiany z wolnymi miejscami dla danego wydziału"""
         shifts = [s[0] for s in self.get_shifts_config() if "Wolne" not in s[0]]
+        if matrix is None:
+            matrix = self.get_staffing_matrix()
         available_shifts = []
         
         for shift in shifts:
-            required = self.get_required_staff_by_wydzial_shift(wydzial, shift)
-            if required > 0:
-                current_count = len(self.db.fetch_all(
-                    "SELECT id FROM employees WHERE wydzial=? AND zmiana=? AND status='W Pracy'",
-                    (wydzial, shift)
-                ))
-                if current_count < required:
-                    available_shifts.append({
-                        'shift': shift,
-                        'required': required,
-                        'current': current_count,
-                        'free_slots': required - current_count
-                    })
+            cell = matrix.get((wydzial, shift))
+            if cell and cell['required'] > 0 and cell['current'] < cell['required']:
+                available_shifts.append({
+                    'shift': shift,
+                    'required': cell['required'],
+                    'current': cell['current'],
+                    'free_slots': cell['required'] - cell['current']
+                })
         
         # Sortuj według liczby wolnych miejsc (malejąco)
         return sorted(available_shifts, key=lambda x: x['free_slots'], reverse=True)
 
     def auto_adjust_overflow(self, wydzial, zmiana):
         """Automatycznie przenosi nadmiarowych pracowników do innych zmian"""
-        employees = self.db.fetch_all(
-            "SELECT id, imie, nazwisko FROM employees WHERE wydzial=? AND zmiana=? AND status='W Pracy' ORDER BY id",
-            (wydzial, zmiana)
-        )
+        employees = self.db.fetch_all(WORKING_EMPLOYEES_SQL, (wydzial, zmiana))
         
         required = self.get_required_staff_by_wydzial_shift(wydzial, zmiana)
         if required <= 0:
@@ -150,18 +287,20 @@ class EmployeeManagement:
         available_shifts = self.find_available_shifts(wydzial)
         moved_employees = []
         
-        for i in range(min(excess, len(available_shifts))):
-            emp_id, imie, nazwisko = employees[required + i]
-            new_shift = available_shifts[i]['shift']
-            
-            # Przenieś pracownika
-            if self.move_employee(emp_id, None, new_shift, None):
-                moved_employees.append({
-                    'emp_id': emp_id,
-                    'name': f"{imie} {nazwisko}",
-                    'from_shift': zmiana,
-                    'to_shift': new_shift
-                })
+        # Wszystkie przeniesienia w jednej transakcji (jeden COMMIT)
+        with self.db.transaction():
+            for i in range(min(excess, len(available_shifts))):
+                emp_id, imie, nazwisko = employees[required + i]
+                new_shift = available_shifts[i]['shift']
+                
+                # Przenieś pracownika
+                if self.move_employee(emp_id, None, new_shift, None):
+                    moved_employees.append({
+                        'emp_id': emp_id,
+                        'name': f"{imie} {nazwisko}",
+                        'from_shift': zmiana,
+                        'to_shift': new_shift
+                    })
         
         return moved_employees
 
@@ -170,31 +309,29 @@ class EmployeeManagement:
         alerts = []
         wydzialy = self.get_setting('wydzialy')
         shifts = [s[0] for s in self.get_shifts_config() if "Wolne" not in s[0]]
+        matrix = self.get_staffing_matrix()
         
         for wydzial in wydzialy:
             for shift in shifts:
-                required = self.get_required_staff_by_wydzial_shift(wydzial, shift)
-                if required > 0:
-                    current_count = len(self.db.fetch_all(
-                        "SELECT id FROM employees WHERE wydzial=? AND zmiana=? AND status='W Pracy'",
-                        (wydzial, shift)
-                    ))
-                    if current_count > required:
-                        alerts.append({
-                            'wydzial': wydzial,
-                            'zmiana': shift,
-                            'wymagane': required,
-                            'aktualne': current_count,
-                            'nadmiar': current_count - required
-                        })
+                cell = matrix.get((wydzial, shift))
+                if cell and cell['required'] > 0 and cell['current'] > cell['required']:
+                    alerts.append({
+                        'wydzial': wydzial,
+                        'zmiana': shift,
+                        'wymagane': cell['required'],
+                        'aktualne': cell['current'],
+                        'nadmiar': cell['current'] - cell['required']
+                    })
         
         return alerts
 
     def get_overflow_policy(self):
         """Pobiera zapisaną politykę przekroczeń"""
-        try:
+        def load():
             result = self.db.fetch_one("SELECT value FROM settings WHERE key='overflow_policy'")
             return result[0] if result else "warning"
+        try:
+            return self.reference_cache.get('settings', 'overflow_policy', load)
         except:
             return "warning"
 
@@ -202,38 +339,37 @@ class EmployeeManagement:
         """Zapisuje politykę przekroczeń"""
         self.db.execute_query("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", 
                             ("overflow_policy", policy))
+        self.reference_cache.invalidate('settings')
 
     # --- Zarządzanie Stanem Pracownika ---
     def move_employee(self, emp_id, new_wydzial=None, new_zmiana=None, new_stanowisko=None):
-        old_data = self.db.fetch_one("SELECT wydzial, zmiana, stanowisko FROM employees WHERE id=?", (emp_id,))
+        old_data = self.db.fetch_one("SELECT wydzial, zmiana, stanowisko, status FROM employees WHERE id=?", (emp_id,))
         updates = []
         params = []
-        details = []
+        changes = []  # (pole, stara wartość, nowa wartość)
 
         if new_wydzial and new_wydzial != old_data[0]:
             updates.append("wydzial=?")
             params.append(new_wydzial)
-            details.append(f"wydział z {old_data[0]} na {new_wydzial}")
+            changes.append(('wydzial', old_data[0], new_wydzial))
         
         if new_zmiana and new_zmiana != old_data[1]:
             updates.append("zmiana=?")
             params.append(new_zmiana)
-            details.append(f"zmiana z {old_data[1]} na {new_zmiana}")
+            changes.append(('zmiana', old_data[1], new_zmiana))
             
             # AUTOMATYCZNA ZMIANA STATUSU WEDŁUG ZMIANY
-            if new_zmiana == "D - Wolne" or "Wolne" in new_zmiana:
+            auto_status = self._auto_status_for_shift(new_zmiana)
+            if auto_status:
                 updates.append("status=?")
-                params.append("Wolne")
-                details.append("status na 'Wolne' (automatycznie)")
-            elif new_zmiana in ["A - Rano (6-14)", "B - Południe (14-22)", "C - Noc (22-6)"]:
-                updates.append("status=?")
-                params.append("W Pracy")
-                details.append("status na 'W Pracy' (automatycznie)")
+                params.append(auto_status)
+                if auto_status != old_data[3]:
+                    changes.append(('status', old_data[3], auto_status))
 
         if new_stanowisko and new_stanowisko != old_data[2]:
             updates.append("stanowisko=?")
             params.append(new_stanowisko)
-            details.append(f"stanowisko z {old_data[2]} na {new_stanowisko}")
+            changes.append(('stanowisko', old_data[2], new_stanowisko))
 
         if not updates:
             return True
@@ -242,55 +378,499 @@ class EmployeeManagement:
         params.append(emp_id)
 
         try:
-            self.db.execute_query(query, params)
-            emp_name = self.db.fetch_one("SELECT imie, nazwisko FROM employees WHERE id=?", (emp_id,))
-            self.log_history("Przeniesienie Pracownika", f"Przeniesiono {emp_name[0]} {emp_name[1]}: {', '.join(details)}")
+            with self.db.transaction():
+                self.db.execute_query(query, params)
+                emp_name = self.db.fetch_one("SELECT imie, nazwisko, wydzial, zmiana, status FROM employees WHERE id=?", (emp_id,))
+                self.log_history_many(self._move_history_entries(emp_id, emp_name[0], emp_name[1], changes))
+                self._apply_counters_on_commit((old_data[0], old_data[1], old_data[3]), (emp_name[2], emp_name[3], emp_name[4]))
+                self._refresh_store_on_commit([emp_id])
             return True
         except Exception as e:
             print(f"Błąd przeniesienia pracownika: {e}")
             return False
 
     def update_employee_status(self, emp_id, new_status):
-        old_status = self.db.fetch_one("SELECT status FROM employees WHERE id=?", (emp_id,))[0]
-        if old_status == new_status: return True
-
         try:
-            self.db.execute_query("UPDATE employees SET status=? WHERE id=?", (new_status, emp_id))
-            emp_name = self.db.fetch_one("SELECT imie, nazwisko FROM employees WHERE id=?", (emp_id,))
-            self.log_history("Zmiana Statusu", f"Zmieniono status {emp_name[0]} {emp_name[1]} z '{old_status}' na '{new_status}'")
+            self._set_status(emp_id, new_status)
             return True
         except Exception as e:
             print(f"Błąd zmiany statusu: {e}")
             return False
 
+    def _set_status(self, emp_id, new_status):
+        """Zmienia status pracownika; błędy zgłasza wyjątkiem (do użycia w większych transakcjach)"""
+        old_row = self.db.fetch_one("SELECT status, wydzial, zmiana, imie, nazwisko FROM employees WHERE id=?", (emp_id,))
+        if old_row is None:
+            raise ValueError(f"Brak pracownika o id {emp_id}")
+        old_status, wydzial, zmiana, imie, nazwisko = old_row
+        if old_status == new_status:
+            return
+
+        with self.db.transaction():
+            self.db.execute_query("UPDATE employees SET status=? WHERE id=?", (new_status, emp_id))
+            self.log_history("Zmiana Statusu", f"Zmieniono status {imie} {nazwisko} z '{old_status}' na '{new_status}'",
+                             employee_id=emp_id, field='status', old_value=old_status, new_value=new_status)
+            self._apply_counters_on_commit((wydzial, zmiana, old_status), (wydzial, zmiana, new_status))
+            self._refresh_store_on_commit([emp_id])
+
     def update_employee_machine(self, emp_id, new_machine):
         old_machine = self.db.fetch_one("SELECT maszyna FROM employees WHERE id=?", (emp_id,))[0]
         if old_machine == new_machine: return True
 
         try:
-            self.db.execute_query("UPDATE employees SET maszyna=? WHERE id=?", (new_machine, emp_id))
-            emp_name = self.db.fetch_one("SELECT imie, nazwisko FROM employees WHERE id=?", (emp_id,))
-            self.log_history("Zmiana Maszyny", f"Zmieniono maszynę {emp_name[0]} {emp_name[1]} z '{old_machine}' na '{new_machine}'")
+            with self.db.transaction():
+                self.db.execute_query("UPDATE employees SET maszyna=? WHERE id=?", (new_machine, emp_id))
+                emp_name = self.db.fetch_one("SELECT imie, nazwisko FROM employees WHERE id=?", (emp_id,))
+                self.log_history("Zmiana Maszyny", f"Zmieniono maszynę {emp_name[0]} {emp_name[1]} z '{old_machine}' na '{new_machine}'",
+                                 employee_id=emp_id, field='maszyna', old_value=old_machine, new_value=new_machine)
+                self._refresh_store_on_commit([emp_id])
             return True
         except Exception as e:
             print(f"Błąd zmiany maszyny: {e}")
             return False
 
+    def import_employees(self, records, source):
+        """Dodaje zwalidowanych pracowników (krotki jak w add_employee) jednym executemany i jedną transakcją"""
+        records = list(records)
+        if not records:
+            return 0
+        with self.db.transaction():
+            last_id = self.db.fetch_one("SELECT COALESCE(MAX(id), 0) FROM employees")[0]
+            self.db.cursor.executemany("""
+                INSERT INTO employees (imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, records)
+            self.log_history("Import Excel", f"Zaimportowano {len(records)} pracowników z pliku {source}")
+            for _, _, _, wydzial, zmiana, status, _ in records:
+                self._apply_counters_on_commit(None, (wydzial, zmiana, status))
+            new_ids = [row[0] for row in self.db.fetch_all("SELECT id FROM employees WHERE id > ?", (last_id,))]
+            self._refresh_store_on_commit(new_ids)
+        return len(records)
+
+    # --- Operacje grupowe ---
+    def _fetch_employees_by_ids(self, columns, ids):
+        """Słownik id -> wiersz (id, *columns) dla podanych id, czytany porcjami WHERE id IN (...)"""
+        rows = {}
+        for i in range(0, len(ids), BULK_CHUNK_SIZE):
+            chunk = ids[i:i + BULK_CHUNK_SIZE]
+            query = f"SELECT id, {', '.join(columns)} FROM employees WHERE id IN ({','.join('?' * len(chunk))})"
+            for row in self.db.fetch_all(query, chunk):
+                rows[row[0]] = row
+        return rows
+
+    def _execute_for_ids(self, query, params, ids):
+        """Wykonuje UPDATE/DELETE z warunkiem id IN (...) – porcjami przy dużej liczbie id"""
+        for i in range(0, len(ids), BULK_CHUNK_SIZE):
+            chunk = ids[i:i + BULK_CHUNK_SIZE]
+            self.db.cursor.execute(f"{query} WHERE id IN ({','.join('?' * len(chunk))})", list(params) + chunk)
+
+    def _bulk_apply(self, ids, columns, plan, query, params, name):
+        """Wspólny przebieg operacji grupowej.
+
+        plan(row) zwraca None (bez zmian) albo (lista wpisów historii, (stary klucz obsady, nowy klucz obsady)).
+        Zwraca słownik id -> wynik (BULK_UPDATED, BULK_UNCHANGED, BULK_MISSING, BULK_FAILED).
+        """
+        ids = list(dict.fromkeys(int(emp_id) for emp_id in ids))
+        try:
+            rows = self._fetch_employees_by_ids(columns, ids)
+            outcomes, changed, entries, moves = {}, [], [], []
+            for emp_id in ids:
+                row = rows.get(emp_id)
+                if row is None:
+                    outcomes[emp_id] = BULK_MISSING
+                    continue
+                change = plan(row)
+                if change is None:
+                    outcomes[emp_id] = BULK_UNCHANGED
+                    continue
+                emp_entries, counters_keys = change
+                outcomes[emp_id] = BULK_UPDATED
+                changed.append(emp_id)
+                entries.extend(emp_entries)
+                if counters_keys:
+                    moves.append(counters_keys)
+
+            if changed:
+                with self.db.transaction():
+                    self._execute_for_ids(query, params, changed)
+                    self.log_history_many(entries)
+                    for old_key, new_key in moves:
+                        self._apply_counters_on_commit(old_key, new_key)
+                    self._refresh_store_on_commit(changed)
+            return outcomes
+        except Exception as e:
+            print(f"Błąd operacji grupowej ({name}): {e}")
+            return {emp_id: BULK_FAILED for emp_id in ids}
+
+    def bulk_update_status(self, ids, new_status):
+        """Zmienia status wielu pracowników jednym UPDATE; zwraca id -> wynik"""
+        def plan(row):
+            _, imie, nazwisko, wydzial, zmiana, old_status = row
+            if old_status == new_status:
+                return None
+            entry = ("Zmiana Statusu", f"Zmieniono status {imie} {nazwisko} z '{old_status}' na '{new_status}'",
+                     row[0], 'status', old_status, new_status)
+            return [entry], ((wydzial, zmiana, old_status), (wydzial, zmiana, new_status))
+
+        return self._bulk_apply(ids, ('imie', 'nazwisko', 'wydzial', 'zmiana', 'status'), plan,
+                                "UPDATE employees SET status=?", (new_status,), "zmiana statusu")
+
+    def bulk_update_machine(self, ids, new_machine):
+        """Zmienia maszynę wielu pracowników jednym UPDATE; zwraca id -> wynik"""
+        def plan(row):
+            _, imie, nazwisko, old_machine = row
+            if old_machine == new_machine:
+                return None
+            entry = ("Zmiana Maszyny", f"Zmieniono maszynę {imie} {nazwisko} z '{old_machine}' na '{new_machine}'",
+                     row[0], 'maszyna', old_machine, new_machine)
+            return [entry], None
+
+        return self._bulk_apply(ids, ('imie', 'nazwisko', 'maszyna'), plan,
+                                "UPDATE employees SET maszyna=?", (new_machine,), "zmiana maszyny")
+
+    @staticmethod
+    def _move_history_entries(emp_id, imie, nazwisko, changes):
+        """Wpisy historii przeniesienia – po jednym na zmienione pole (pole, stara, nowa wartość)"""
+        labels = {'wydzial': "wydział", 'zmiana': "zmiana", 'stanowisko': "stanowisko", 'status': "status"}
+        entries = []
+        for field, old_value, new_value in changes:
+            details = f"Przeniesiono {imie} {nazwisko}: {labels[field]} z {old_value} na {new_value}"
+            if field == 'status':
+                details += " (automatycznie)"
+            entries.append(("Przeniesienie Pracownika", details, emp_id, field, old_value, new_value))
+        return entries
+
+    @staticmethod
+    def _auto_status_for_shift(zmiana):
+        """Status ustawiany automatycznie po przeniesieniu na zmianę (None – status bez zmian)"""
+        if zmiana and "Wolne" in zmiana:
+            return "Wolne"
+        if zmiana in ["A - Rano (6-14)", "B - Południe (14-22)", "C - Noc (22-6)"]:
+            return "W Pracy"
+        return None
+
+    def bulk_move(self, ids, new_wydzial=None, new_zmiana=None, new_stanowisko=None):
+        """Przenosi wielu pracowników (wydział/zmiana/stanowisko) jednym UPDATE; zwraca id -> wynik.
+
+        Status jest ustawiany automatycznie według nowej zmiany – tak jak w move_employee.
+        """
+        auto_status = self._auto_status_for_shift(new_zmiana)
+
+        def plan(row):
+            _, imie, nazwisko, wydzial, zmiana, stanowisko, status = row
+            changes = []
+            new_w, new_z, new_st = wydzial, zmiana, status
+            if new_wydzial and new_wydzial != wydzial:
+                new_w = new_wydzial
+                changes.append(('wydzial', wydzial, new_wydzial))
+            if new_zmiana and new_zmiana != zmiana:
+                new_z = new_zmiana
+                changes.append(('zmiana', zmiana, new_zmiana))
+                if auto_status and auto_status != status:
+                    new_st = auto_status
+                    changes.append(('status', status, auto_status))
+            if new_stanowisko and new_stanowisko != stanowisko:
+                changes.append(('stanowisko', stanowisko, new_stanowisko))
+            if not changes:
+                return None
+            return (self._move_history_entries(row[0], imie, nazwisko, changes),
+                    ((wydzial, zmiana, status), (new_w, new_z, new_st)))
+
+        # Stara wartość zmiany po prawej stronie SET pozwala ustawić status tylko tam, gdzie zmiana się zmienia
+        query = ("UPDATE employees SET wydzial=COALESCE(?, wydzial), zmiana=COALESCE(?, zmiana), "
+                 "stanowisko=COALESCE(?, stanowisko), "
+                 "status=CASE WHEN ? IS NOT NULL AND ? IS NOT NULL AND zmiana IS NOT ? THEN ? ELSE status END")
+        params = (new_wydzial or None, new_zmiana or None, new_stanowisko or None,
+                  auto_status, new_zmiana or None, new_zmiana or None, auto_status)
+        return self._bulk_apply(ids, ('imie', 'nazwisko', 'wydzial', 'zmiana', 'stanowisko', 'status'), plan,
+                                query, params, "przeniesienie")
+
+    def plan_bulk_move(self, ids, new_wydzial=None, new_zmiana=None, new_stanowisko=None):
+        """Ocenia całą paczkę przeniesień względem macierzy obsady przed zapisem.
+
+        Pracownicy wchodzący do komórki (wydział, zmiana) jako 'W Pracy' zajmują wolne miejsca
+        w kolejności zaznaczenia; pozostali trafiają do 'overflow'. Zwraca słownik:
+        policy, fits (id w limicie lub bez limitu), overflow (id ponad limit), missing,
+        cells {(wydzial, zmiana): {required, current, incoming, overflow}}.
+        """
+        ids = list(dict.fromkeys(int(emp_id) for emp_id in ids))
+        plan = {'policy': self.get_overflow_policy(), 'fits': [], 'overflow': [], 'missing': [], 'cells': {}}
+        rows = self._fetch_employees_by_ids(('wydzial', 'zmiana', 'status'), ids)
+        matrix = self.get_staffing_matrix()
+        auto_status = self._auto_status_for_shift(new_zmiana)
+
+        for emp_id in ids:
+            row = rows.get(emp_id)
+            if row is None:
+                plan['missing'].append(emp_id)
+                continue
+            _, wydzial, zmiana, status = row
+            target = (new_wydzial or wydzial, new_zmiana or zmiana)
+            new_status = auto_status if new_zmiana and new_zmiana != zmiana and auto_status else status
+            entering = new_status == 'W Pracy' and (target != (wydzial, zmiana) or status != 'W Pracy')
+            required = matrix.get(target, {'required': 0})['required']
+            if not entering or "Wolne" in (target[1] or '') or required <= 0:
+                plan['fits'].append(emp_id)
+                continue
+
+            cell = plan['cells'].setdefault(target, {
+                'required': required,
+                'current': matrix[target]['current'],
+                'incoming': 0,
+                'overflow': 0,
+            })
+            cell['incoming'] += 1
+            if cell['current'] + cell['incoming'] > cell['required']:
+                cell['overflow'] += 1
+                plan['overflow'].append(emp_id)
+            else:
+                plan['fits'].append(emp_id)
+        return plan
+
+    def apply_bulk_move(self, ids, new_wydzial=None, new_zmiana=None, new_stanowisko=None, adjust_cells=()):
+        """Wykonuje przeniesienia i korekty obsady (auto_adjust) w jednej transakcji.
+
+        Zwraca (id -> wynik, lista pracowników przeniesionych przez korektę obsady).
+        """
+        adjusted = []
+        try:
+            with self.db.transaction():
+                outcomes = self.bulk_move(ids, new_wydzial, new_zmiana, new_stanowisko)
+                if any(o == BULK_FAILED for o in outcomes.values()):
+                    raise RuntimeError("nie udało się zapisać przeniesień")
+                for wydzial, zmiana in adjust_cells:
+                    adjusted.extend(self.auto_adjust_overflow(wydzial, zmiana))
+            return outcomes, adjusted
+        except Exception as e:
+            print(f"Błąd grupowego przeniesienia: {e}")
+            return {int(emp_id): BULK_FAILED for emp_id in ids}, []
+
+    def bulk_delete(self, ids):
+        """Usuwa wielu pracowników jednym DELETE; zwraca id -> wynik"""
+        def plan(row):
+            _, imie, nazwisko, wydzial, zmiana, status = row
+            entry = ("Usunięcie Pracownika", f"Usunięto pracownika: {imie} {nazwisko}", row[0], None, None, None)
+            return [entry], ((wydzial, zmiana, status), None)
+
+        return self._bulk_apply(ids, ('imie', 'nazwisko', 'wydzial', 'zmiana', 'status'), plan,
+                                "DELETE FROM employees", (), "usuwanie")
+
     # --- Logowanie Historii ---
-    def log_history(self, action, details):
+    def log_history(self, action, details, employee_id=None, field=None, old_value=None, new_value=None):
+        """Zapisuje wpis historii; employee_id i zmienione pole (stara/nowa wartość) są opcjonalne"""
         operator = self.current_user.get('username', 'SYSTEM') if self.current_user else 'SYSTEM'
-        self.db.execute_query("""
-            INSERT INTO history (operator, action, details) VALUES (?, ?, ?)
-        """, (operator, action, details))
+        self.history_queue.put(operator, action, details, employee_id, field, old_value, new_value)
+
+    def log_history_many(self, entries):
+        """Zapisuje wiele wpisów (action, details, employee_id, field, old_value, new_value) jedną paczką"""
+        operator = self.current_user.get('username', 'SYSTEM') if self.current_user else 'SYSTEM'
+        self.history_queue.put_many(operator, entries)
+
+    def flush_history(self):
+        """Zapisuje zbuforowane wpisy historii (przed odczytem, wylogowaniem i zamknięciem)"""
+        return self.history_queue.flush()
+
+    def get_employee_history(self, emp_id, limit=50):
+        """Najnowsze wpisy historii pracownika (id, timestamp, operator, action, details, field, old_value, new_value)"""
+        self.flush_history()
+        try:
+            return self.db.fetch_all(EMPLOYEE_HISTORY_SQL, (emp_id, limit))
+        except Exception as e:
+            print(f"Błąd pobierania historii pracownika: {e}")
+            return []
 
     def get_history(self):
+        self.flush_history()
         return self.db.fetch_all("SELECT * FROM history ORDER BY timestamp DESC")
 
+    @staticmethod
+    def _fts_phrase(text):
+        return '"' + text.replace('"', '""') + '"'
+
+    def _history_search_conditions(self, text=None, wydzial=None, use_fts=True):
+        """Warunki wyszukiwania tekstowego: przez indeks FTS5, a bez niego przez LIKE"""
+        if use_fts and self.db.has_history_fts:
+            terms = []
+            if wydzial:
+                terms.append(f"details : {self._fts_phrase(wydzial)}")
+            for word in (text or '').split():
+                terms.append(self._fts_phrase(word) + '*')
+            if not terms:
+                return [], []
+            return ["id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)"], [" AND ".join(terms)]
+
+        conditions, params = [], []
+        if wydzial:
+            conditions.append("instr(details, ?) > 0")
+            params.append(wydzial)
+        for word in (text or '').split():
+            conditions.append("(details LIKE ? OR action LIKE ? OR operator LIKE ?)")
+            params.extend([f"%{word}%"] * 3)
+        return conditions, params
+
+    def _history_search_query(self, table, text=None, employee_id=None, cursor=None, limit=HISTORY_PAGE_SIZE,
+                              newest_first=True, operator=None, action=None, operator_like=None,
+                              action_like=None, wydzial=None, date_from=None, date_to=None, use_fts=True):
+        """Zapytanie jednej strony historii (parametry jak w search_history); zwraca (SQL, parametry)"""
+        conditions, params = self._history_search_conditions(text, wydzial, use_fts=use_fts)
+        if employee_id is not None:
+            conditions.append("employee_id = ?")
+            params.append(employee_id)
+        if operator:
+            conditions.append("operator = ?")
+            params.append(operator)
+        elif operator_like:
+            conditions.append("operator LIKE ?")
+            params.append(f"%{operator_like}%")
+        if action:
+            conditions.append("action = ?")
+            params.append(action)
+        elif action_like:
+            conditions.append("action LIKE ?")
+            params.append(f"%{action_like}%")
+        if date_from:
+            conditions.append("timestamp >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("timestamp < ?")
+            params.append(date_to)
+        if cursor:
+            conditions.append(f"(timestamp, id) {'<' if newest_first else '>'} (?, ?)")
+            params.extend(cursor)
+
+        direction = "DESC" if newest_first else "ASC"
+        query = f"SELECT id, timestamp, operator, action, details FROM {table}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY timestamp {direction}, id {direction} LIMIT ?"
+        params.append(limit + 1)  # jeden wiersz więcej mówi, czy istnieje następna strona
+        return query, params
+
+    def search_history(self, text=None, employee_id=None, cursor=None, limit=HISTORY_PAGE_SIZE,
+                       newest_first=True, operator=None, action=None, operator_like=None,
+                       action_like=None, wydzial=None, date_from=None, date_to=None, archive_month=None):
+        """Wyszukuje historię i zwraca jedną stronę stronicowaną po kluczu (timestamp, id).
+
+        text – słowa (prefiksy) szukane w szczegółach, akcji i operatorze,
+        employee_id – wpisy pracownika (kolumna z indeksem), wydzial – fraza w szczegółach.
+        cursor – klucz ostatniego wiersza poprzedniej strony (None = pierwsza strona).
+        operator/action – dokładne dopasowanie (indeks), *_like – fragment tekstu,
+        date_from/date_to – zakres timestamp [od, do) w formacie bazy,
+        archive_month – miesiąc RRRR-MM z archiwum zamiast bieżącej tabeli (bez indeksu FTS).
+        Zwraca (wiersze (id, timestamp, operator, action, details), kursor następnej strony lub None).
+        """
+        try:
+            table = self.history_archive.table(archive_month) if archive_month else "history"
+        except Exception as e:
+            print(f"Błąd otwierania archiwum historii: {e}")
+            return [], None
+        query, params = self._history_search_query(
+            table, text, employee_id, cursor, limit, newest_first, operator, action, operator_like,
+            action_like, wydzial, date_from, date_to, use_fts=not archive_month)
+
+        self.flush_history()
+        try:
+            rows = self.db.fetch_all(query, params)
+        except Exception as e:
+            print(f"Błąd wyszukiwania w historii: {e}")
+            return [], None
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, (rows[-1][1], rows[-1][0])
+
+    def hot_queries(self):
+        """Zapytania z gorących ścieżek z przykładowymi parametrami do kontroli planów (check_query_plans).
+
+        Zwraca krotki (nazwa, SQL, parametry, tabele/podzapytania, które wolno skanować) zbudowane
+        z tych samych stałych i funkcji, których używają metody wykonujące te zapytania.
+        """
+        today = datetime.date.today().isoformat()
+        cell = ("Produkcja", "A - Rano (6-14)")
+        page_key = ("2024-01-01 00:00:00", 1000)
+        queries = [
+            # required_staff to kilkadziesiąt wierszy; c to wynik grupowania pracowników
+            ("Macierz obsady", STAFFING_MATRIX_SQL, (), ('c', 'r')),
+            ("Liczniki obsady", STAFFING_COUNTS_SQL, (), ()),
+            ("Pracownicy komórki obsady", WORKING_EMPLOYEES_SQL, cell, ()),
+            ("Historia pracownika", EMPLOYEE_HISTORY_SQL, (1, 50), ()),
+        ]
+        for name, table in AbsenceIndex.TABLES.items():
+            queries.append((f"Aktywna nieobecność pracownika ({name})",
+                            ACTIVE_ABSENCE_SQL.format(table=table), (1, today, today), ()))
+            queries.append((f"Niezakończone nieobecności ({name})",
+                            PENDING_ABSENCES_SQL.format(table=table), (today,), ()))
+
+        searches = [
+            ("Historia – pierwsza strona", {}),
+            ("Historia – kolejna strona", {'cursor': page_key}),
+            ("Historia operatora – strona", {'operator': 'admin', 'cursor': page_key}),
+            ("Historia akcji w zakresie dat", {'action': 'Zmiana Statusu', 'date_from': '2024-01-01 00:00:00',
+                                               'date_to': '2024-02-01 00:00:00'}),
+            ("Historia pracownika – wyszukiwanie", {'employee_id': 1, 'cursor': page_key}),
+            ("Historia – wyszukiwanie tekstu", {'text': 'urlop', 'wydzial': cell[0]}),
+        ]
+        for name, filters in searches:
+            query, params = self._history_search_query("history", **filters)
+            queries.append((name, query, tuple(params), ()))
+        return queries
+
+    def get_history_archive_months(self):
+        return self.history_archive.months()
+
+    def archive_history(self, force=False):
+        """Przenosi wpisy starsze niż horyzont do archiwum (bez force – najwyżej raz dziennie).
+
+        Działa na własnym połączeniu, więc jest wywoływana w wątku roboczym; wynik zapisuje
+        w historii log_history_archive() w wątku głównym. force=True (akcja administratora)
+        pomija limit dzienny i pozwala odzyskać miejsce w pliku bazy (VACUUM). Przed uruchomieniem
+        wątku wywołujący sprawdza history_archive_enabled(), żeby przy wyłączonej archiwizacji
+        nie tworzyć wątku ani połączenia.
+        """
+        db = None
+        try:
+            db = self.db.open_worker()
+            archive = HistoryArchive(db)
+            return archive.run(vacuum=True) if force else archive.run_if_due()
+        except Exception as e:
+            print(f"Błąd archiwizacji historii: {e}")
+            return {}
+        finally:
+            if db is not None:
+                db.close()
+
+    def history_archive_enabled(self):
+        """Czy ustawiono horyzont archiwizacji historii (odczyt ustawień na połączeniu głównym)"""
+        days, _ = self.history_archive.get_config()
+        return days is not None
+
+    def log_history_archive(self, moved):
+        if moved:
+            self.log_history("Archiwizacja Historii",
+                             f"Przeniesiono do archiwum {sum(moved.values())} wpisów ({', '.join(sorted(moved))})")
+
+    def get_history_values(self, column):
+        """Różne wartości kolumny historii (operator lub action) – do list wyboru filtrów"""
+        if column not in ('operator', 'action'):
+            raise ValueError(f"Nieobsługiwana kolumna historii: {column}")
+        self.flush_history()
+        try:
+            rows = self.db.fetch_all(f"SELECT DISTINCT {column} FROM history WHERE {column} IS NOT NULL")
+            return sorted(row[0] for row in rows)
+        except Exception as e:
+            print(f"Błąd pobierania wartości historii ({column}): {e}")
+            return []
+
     # --- Ustawienia ---
     def get_settings_list(self, table_name):
         return self.db.fetch_all(f"SELECT * FROM {table_name}")
 
     def add_setting(self, table_name, data):
+        with self.db.transaction():
+            self._invalidate_reference(table_name)
+            return self._add_setting(table_name, data)
+
+    def _add_setting(self, table_name, data):
         if table_name == 'users':
             if not data.get('password') or not data.get('role'): return False
             self.db.execute_query("INSERT OR REPLACE INTO users (username, password, role) VALUES (?, ?, ?)",
@@ -301,51 +881,153 @@ class EmployeeManagement:
         elif table_name == 'statuses':
             self.db.execute_query("INSERT OR REPLACE INTO statuses (name, color) VALUES (?, ?)",
                                   (data['name'], data['color']))
-        elif table_name in ['wydzialy', 'stanowiska', 'maszyny']:
-            current_list = self.get_setting(table_name)
-            if data['name'] not in current_list:
-                current_list.append(data['name'])
-                self.save_setting(table_name, current_list)
-                return True
-            return False
+        elif table_name in DICTIONARY_KEYS:
+            table = DICTIONARY_KEYS[table_name]
+            if data['name'] in self.get_setting(table_name):
+                return False
+            # Wartość ukryta (używana już przez pracowników) wraca na koniec listy
+            self.db.execute_query(f"""
+                INSERT INTO {table} (name, listed, sort_order)
+                VALUES (?, 1, (SELECT COALESCE(MAX(sort_order), -1) + 1 FROM {table} WHERE listed = 1))
+                ON CONFLICT(name) DO UPDATE SET listed = 1, sort_order = excluded.sort_order
+            """, (data['name'],))
         
         self.log_history("Ustawienia", f"Dodano/Edytowano w {table_name}: {data.get('name') or data.get('username')}")
         return True
 
     def delete_setting(self, table_name, name):
+        with self.db.transaction():
+            self._invalidate_reference(table_name)
+            return self._delete_setting(table_name, name)
+
+    def _invalidate_reference(self, table_name):
+        """Unieważnia dane słownikowe tabeli (teraz i po zatwierdzeniu transakcji)"""
+        table = DICTIONARY_KEYS.get(table_name, table_name)
+        if table not in REFERENCE_TABLES:
+            table = 'settings'
+        self.reference_cache.invalidate(table)
+        self.db.call_on_commit(lambda: self.reference_cache.invalidate(table))
+
+    def _delete_setting(self, table_name, name):
         if table_name == 'users':
             self.db.execute_query("DELETE FROM users WHERE username=?", (name,))
         elif table_name == 'shifts':
             self.db.execute_query("DELETE FROM shifts WHERE name=?", (name,))
         elif table_name == 'statuses':
             self.db.execute_query("DELETE FROM statuses WHERE name=?", (name,))
-        elif table_name in ['wydzialy', 'stanowiska', 'maszyny']:
-            current_list = self.get_setting(table_name)
-            if name in current_list:
-                current_list.remove(name)
-                self.save_setting(table_name, current_list)
-                return True
-            return False
+        elif table_name in DICTIONARY_KEYS:
+            if name not in self.get_setting(table_name):
+                return False
+            self._remove_dictionary_value(table_name, name)
         
         self.log_history("Ustawienia", f"Usunięto z {table_name}: {name}")
         return True
 
+    def _remove_dictionary_value(self, key, name):
+        """Usuwa wartość z listy wyboru; wartość używana przez pracowników zostaje w słowniku jako ukryta"""
+        table = DICTIONARY_KEYS[key]
+        column = DICTIONARY_TABLES[table][1]
+        self.db.execute_query(f"""
+            DELETE FROM {table} WHERE name = ?
+            AND NOT EXISTS (SELECT 1 FROM employees WHERE {column}_id = {table}.id)
+        """, (name,))
+        self.db.execute_query(f"UPDATE {table} SET listed = 0 WHERE name = ?", (name,))
+
+    def rename_setting(self, table_name, old_name, new_name):
+        """Zmienia nazwę wydziału, stanowiska lub maszyny jednym UPDATE słownika.
+
+        Wyzwalacze przenoszą nową nazwę na pracowników (po kluczu *_id) i – dla wydziału –
+        na wymaganą obsadę. Nowa nazwa istniejąca jako ukryty wpis (używana tylko przez pracowników)
+        jest z nim łączona. Zwraca False, gdy nazwy nie ma albo nowa nazwa jest już na liście.
+        """
+        table = DICTIONARY_KEYS.get(table_name)
+        new_name = (new_name or '').strip()
+        if not table or not new_name or new_name == old_name:
+            return False
+        column = DICTIONARY_TABLES[table][1]
+        try:
+            with self.db.transaction():
+                row = self.db.fetch_one(f"SELECT id, listed, sort_order FROM {table} WHERE name = ?", (old_name,))
+                if not row:
+                    return False
+                existing = self.db.fetch_one(f"SELECT id, listed FROM {table} WHERE name = ?", (new_name,))
+                if existing and existing[1]:
+                    # Nazwa jest już na liście (np. dodana na innym stanowisku) – lista w pamięci była nieaktualna
+                    print(f"Zmiana nazwy w {table_name}: '{new_name}' już istnieje")
+                    self._invalidate_reference(table_name)
+                    return False
+                emp_ids = [r[0] for r in self.db.fetch_all(f"SELECT id FROM employees WHERE {column}_id = ?", (row[0],))]
+                self._invalidate_reference(table_name)
+                if table == 'departments':
+                    self._invalidate_reference('required_staff')
+                if existing:
+                    # Pracownicy (wyzwalacz ustawia klucz po nazwie) i obsada przechodzą na ukryty wpis,
+                    # który wraca na listę w miejscu starego
+                    self.db.execute_query(f"UPDATE employees SET {column} = ? WHERE {column}_id = ?", (new_name, row[0]))
+                    if table == 'departments':
+                        self.db.execute_query("UPDATE OR REPLACE required_staff SET wydzial = ? WHERE wydzial = ?",
+                                              (new_name, old_name))
+                    self.db.execute_query(f"UPDATE {table} SET listed = ?, sort_order = ? WHERE id = ?",
+                                          (row[1], row[2], existing[0]))
+                    self.db.execute_query(f"DELETE FROM {table} WHERE id = ?", (row[0],))
+                    merged = ", połączono z istniejącym wpisem"
+                else:
+                    self.db.execute_query(f"UPDATE {table} SET name = ? WHERE id = ?", (new_name, row[0]))
+                    merged = ""
+                self.log_history("Ustawienia", f"Zmieniono nazwę w {table_name}: {old_name} -> {new_name} "
+                                               f"({len(emp_ids)} pracowników{merged})")
+                # Liczniki obsady są liczone po nazwach wydziałów
+                if table == 'departments':
+                    self.db.call_on_commit(self.staffing_counters.rebuild)
+                self._refresh_store_on_commit(emp_ids)
+            return True
+        except Exception as e:
+            print(f"Błąd zmiany nazwy w {table_name}: {e}")
+            return False
+
     def get_setting(self, key):
-        """Pobiera ustawienie jako listę z bazy danych"""
-        result = self.db.fetch_one("SELECT value FROM settings WHERE key=?", (key,))
-        if result:
-            return result[0].split(',') if result[0] else []
-        return []
+        """Pobiera ustawienie jako listę (z pamięci; kopia, którą można modyfikować).
+
+        Wydziały, stanowiska i maszyny pochodzą z tabel słownikowych (tylko wartości do wyboru).
+        """
+        table = DICTIONARY_KEYS.get(key)
+        if table:
+            def load():
+                return tuple(row[0] for row in self.db.fetch_all(
+                    f"SELECT name FROM {table} WHERE listed = 1 ORDER BY sort_order, id"))
+            return list(self.reference_cache.get(table, table, load))
+
+        def load():
+            result = self.db.fetch_one("SELECT value FROM settings WHERE key=?", (key,))
+            return tuple(result[0].split(',')) if result and result[0] else ()
+        return list(self.reference_cache.get('settings', ('setting', key), load))
 
     def save_setting(self, key, value_list):
-        value_str = ','.join(value_list)
-        self.db.execute_query("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value_str))
-        self.log_history("Ustawienia", f"Zapisano ustawienia dla klucza: {key}")
+        with self.db.transaction():
+            self._invalidate_reference(key)
+            if key in DICTIONARY_KEYS:
+                self._save_dictionary(key, value_list)
+            else:
+                self.db.execute_query("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                                      (key, ','.join(value_list)))
+            self.log_history("Ustawienia", f"Zapisano ustawienia dla klucza: {key}")
+
+    def _save_dictionary(self, key, names):
+        """Ustawia listę wyboru słownika: kolejność według names, pozostałe wartości ukryte lub usunięte"""
+        table = DICTIONARY_KEYS[key]
+        names = list(dict.fromkeys(name for name in names if name))
+        self.db.cursor.executemany(f"""
+            INSERT INTO {table} (name, listed, sort_order) VALUES (?, 1, ?)
+            ON CONFLICT(name) DO UPDATE SET listed = 1, sort_order = excluded.sort_order
+        """, [(name, position) for position, name in enumerate(names)])
+        for name in set(self.get_setting(key)) - set(names):
+            self._remove_dictionary_value(key, name)
         
     def get_shifts_config(self):
         """Pobiera konfigurację zmian"""
         try:
-            return self.db.fetch_all("SELECT name, start_time, end_time, color FROM shifts")
+            return list(self.reference_cache.get('shifts', 'shifts', lambda: tuple(
+                self.db.fetch_all("SELECT name, start_time, end_time, color FROM shifts"))))
         except Exception as e:
             print(f"Błąd pobierania konfiguracji zmian: {e}")
             return []
@@ -353,45 +1035,85 @@ class EmployeeManagement:
     def get_statuses_config(self):
         """Pobiera konfigurację statusów"""
         try:
-            return self.db.fetch_all("SELECT name, color FROM statuses")
+            return list(self.reference_cache.get('statuses', 'statuses', lambda: tuple(
+                self.db.fetch_all("SELECT name, color FROM statuses"))))
         except Exception as e:
             print(f"Błąd pobierania konfiguracji statusów: {e}")
             return []
 
     def get_shift_color(self, shift_name):
         """Pobiera kolor dla konkretnej zmiany"""
-        try:
-            result = self.db.fetch_one("SELECT color FROM shifts WHERE name=?", (shift_name,))
-            return result[0] if result else 'white'
-        except Exception as e:
-            print(f"Błąd pobierania koloru zmiany: {e}")
-            return 'white'
+        colors = self.reference_cache.get('shifts', 'shift_colors', lambda: {
+            name: color for name, _, _, color in self.get_shifts_config()})
+        return colors.get(shift_name) or 'white'
 
     def get_status_color(self, status_name):
         """Pobiera kolor dla konkretnego statusu"""
-        try:
-            result = self.db.fetch_one("SELECT color FROM statuses WHERE name=?", (status_name,))
-            return result[0] if result else 'white'
-        except Exception as e:
-            print(f"Błąd pobierania koloru statusu: {e}")
-            return 'white'
+        colors = self.reference_cache.get('statuses', 'status_colors', lambda: dict(self.get_statuses_config()))
+        return colors.get(status_name) or 'white'
 
     def get_required_staff_by_wydzial_shift(self, wydzial, shift):
         """Pobiera wymaganą obsadę dla wydziału i zmiany"""
+        return self.get_required_staff_map().get((wydzial, shift), 0)
+
+    def get_required_staff_map(self):
+        """Zwraca (z pamięci) mapę wymaganej obsady {(wydzial, zmiana): liczba}"""
+        def load():
+            rows = self.db.fetch_all("SELECT wydzial, zmiana, required_count FROM required_staff")
+            return {(w, z): (c or 0) for w, z, c in rows}
         try:
-            result = self.db.fetch_one("SELECT required_count FROM required_staff WHERE wydzial=? AND zmiana=?", (wydzial, shift))
-            return result[0] if result else 0
+            return self.reference_cache.get('required_staff', 'required_staff', load)
         except Exception as e:
-            print(f"Błąd pobierania wymaganej obsady: {e}")
-            return 0
+            print(f"Błąd pobierania mapy wymaganej obsady: {e}")
+            return {}
+
+    def get_required_staff_grid(self):
+        """Siatka wymaganej obsady: (wydziały, zmiany, {(wydzial, zmiana): liczba}) – z danych w pamięci"""
+        wydzialy = self.get_setting('wydzialy')
+        shifts = [s[0] for s in self.get_shifts_config()]
+        required = self.get_required_staff_map()
+        return wydzialy, shifts, {(w, z): required.get((w, z), 0) for w in wydzialy for z in shifts}
 
     def save_required_staff(self, wydzial, shift, count):
         """Zapisuje wymaganą obsadę"""
-        self.db.execute_query("""
-            INSERT OR REPLACE INTO required_staff (wydzial, zmiana, required_count)
-            VALUES (?, ?, ?)
-        """, (wydzial, shift, count))
-        self.log_history("Ustawienia", f"Ustawiono wymaganą obsadę: {wydzial}, {shift} na {count} os.")
+        self.save_required_staff_many({(wydzial, shift): count})
+
+    def save_required_staff_many(self, counts):
+        """Zapisuje wymaganą obsadę wielu komórek {(wydzial, zmiana): liczba} jedną transakcją.
+
+        Zapisywane są tylko komórki z inną wartością niż w bazie; historia dostaje jeden wpis
+        podsumowujący. Zwraca liczbę zmienionych komórek.
+        """
+        with self.db.transaction():
+            # Porównanie z bazą w tej samej transakcji – mapa w pamięci mogła nie widzieć zmian z innych stanowisk
+            current = {(w, z): c for w, z, c in self.db.fetch_all(
+                "SELECT wydzial, zmiana, required_count FROM required_staff")}
+            changes = [(w, z, int(c)) for (w, z), c in counts.items() if current.get((w, z), 0) != int(c)]
+            if not changes:
+                return 0
+            self._invalidate_reference('required_staff')
+            self.db.cursor.executemany("""
+                INSERT OR REPLACE INTO required_staff (wydzial, zmiana, required_count)
+                VALUES (?, ?, ?)
+            """, changes)
+            if len(changes) == 1:
+                w, z, c = changes[0]
+                self.log_history("Ustawienia", f"Ustawiono wymaganą obsadę: {w}, {z} na {c} os.")
+            else:
+                cells = "; ".join(f"{w}, {z}: {current.get((w, z), 0)} -> {c}" for w, z, c in changes[:REQUIRED_STAFF_LOG_CELLS])
+                more = f" (i {len(changes) - REQUIRED_STAFF_LOG_CELLS} innych)" if len(changes) > REQUIRED_STAFF_LOG_CELLS else ""
+                self.log_history("Ustawienia", f"Ustawiono wymaganą obsadę dla {len(changes)} komórek: {cells}{more}")
+        return len(changes)
+
+    def clear_required_staff(self):
+        """Usuwa całą wymaganą obsadę (brak wpisu = 0); zwraca liczbę wyzerowanych komórek"""
+        with self.db.transaction():
+            self._invalidate_reference('required_staff')
+            cleared = self.db.fetch_one("SELECT COUNT(*) FROM required_staff WHERE required_count != 0")[0]
+            self.db.execute_query("DELETE FROM required_staff")
+            if cleared:
+                self.log_history("Ustawienia", f"Wyczyszczono wymaganą obsadę ({cleared} komórek)")
+        return cleared
 
     # NOWA FUNKCJA: Sprawdzanie alertów o brakach kadrowych
     def check_staffing_alerts(self):
@@ -400,25 +1122,20 @@ class EmployeeManagement:
         
         wydzialy = self.get_setting('wydzialy')
         shifts = [s[0] for s in self.get_shifts_config()]
+        matrix = self.get_staffing_matrix()
         
         for wydzial in wydzialy:
             for shift in shifts:
-                required = self.get_required_staff_by_wydzial_shift(wydzial, shift)
-                if required > 0:
-                    # Policz pracowników na tej zmianie z statusem "W Pracy"
-                    current_count = len(self.db.fetch_all(
-                        "SELECT id FROM employees WHERE wydzial=? AND zmiana=? AND status='W Pracy'",
-                        (wydzial, shift)
-                    ))
-                    
-                    if current_count < required:
-                        alerts.append({
-                            'wydzial': wydzial,
-                            'zmiana': shift,
-                            'wymagane': required,
-                            'aktualne': current_count,
-                            'brakuje': required - current_count
-                        })
+                cell = matrix.get((wydzial, shift))
+                # Liczba pracowników ze statusem "W Pracy" pochodzi z macierzy obsady
+                if cell and cell['required'] > 0 and cell['current'] < cell['required']:
+                    alerts.append({
+                        'wydzial': wydzial,
+                        'zmiana': shift,
+                        'wymagane': cell['required'],
+                        'aktualne': cell['current'],
+                        'brakuje': cell['required'] - cell['current']
+                    })
         
         return alerts
 
@@ -442,22 +1159,38 @@ class EmployeeManagement:
             ORDER BY l.start_date DESC
         """)
 
+    def get_absence_maps(self):
+        """Zwraca (urlopy, L4): id pracownika -> 'od - do' trwającej lub najbliższej nieobecności"""
+        return self.absence_index.display_maps()
+
+    def add_vacation(self, emp_id, start_date, end_date, total_days, vacation_type):
+        """Zapisuje urlop i ustawia status 'Urlop' w jednej transakcji"""
+        with self.db.transaction():
+            self.db.execute_query("""
+                INSERT INTO vacations (employee_id, start_date, end_date, total_days, vacation_type)
+                VALUES (?, ?, ?, ?, ?)
+            """, (emp_id, start_date, end_date, total_days, vacation_type))
+            # Błąd zmiany statusu wycofuje też zapis nieobecności
+            self._set_status(emp_id, "Urlop")
+            self.db.call_on_commit(lambda: self.absence_index.invalidate(emp_id))
+
+    def add_l4(self, emp_id, start_date, end_date, total_days):
+        """Zapisuje zwolnienie L4 i ustawia status 'L4' w jednej transakcji"""
+        with self.db.transaction():
+            self.db.execute_query("""
+                INSERT INTO l4_records (employee_id, start_date, end_date, total_days)
+                VALUES (?, ?, ?, ?)
+            """, (emp_id, start_date, end_date, total_days))
+            # Błąd zmiany statusu wycofuje też zapis nieobecności
+            self._set_status(emp_id, "L4")
+            self.db.call_on_commit(lambda: self.absence_index.invalidate(emp_id))
+
     def get_active_vacation(self, emp_id):
         """Pobiera aktywny urlop pracownika"""
         today = datetime.datetime.now().date()
-        return self.db.fetch_one("""
-            SELECT start_date, end_date 
-            FROM vacations 
-            WHERE employee_id = ? AND start_date <= ? AND end_date >= ?
-            ORDER BY start_date DESC LIMIT 1
-        """, (emp_id, today, today))
+        return self.db.fetch_one(ACTIVE_ABSENCE_SQL.format(table='vacations'), (emp_id, today, today))
 
     def get_active_l4(self, emp_id):
         """Pobiera aktywne L4 pracownika"""
         today = datetime.datetime.now().date()
-        return self.db.fetch_one("""
-            SELECT start_date, end_date 
-            FROM l4_records 
-            WHERE employee_id = ? AND start_date <= ? AND end_date >= ?
-            ORDER BY start_date DESC LIMIT 1
-        """, (emp_id, today, today))
\ No newline at end of file
+        return self.db.fetch_one(ACTIVE_ABSENCE_SQL.format(table='l4_records'), (emp_id, today, today))
\ No newline at end of file
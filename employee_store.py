@@ -0,0 +1,158 @@
+import os
+from collections import namedtuple
+
+# Rodzaje zdarzeń publikowanych przez magazyn pracowników
+EMPLOYEE_ADDED = 'added'
+EMPLOYEE_CHANGED = 'changed'
+EMPLOYEE_REMOVED = 'removed'
+STORE_RELOADED = 'reloaded'  # pełne przeładowanie (np. zmiana poza tym procesem)
+
+# Zmiana jednego wiersza: old/new to krotki (id, imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna) lub None
+EmployeeChange = namedtuple('EmployeeChange', 'kind emp_id old new')
+
+# Liczba id w jednym WHERE id IN (...)
+STORE_CHUNK_SIZE = 500
+
+# Kolumny wiersza pracownika (klucze słowników *_id nie trafiają do krotek używanych przez okna)
+EMPLOYEE_COLUMNS = "id, imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna"
+
+
+def employee_sort_key(emp):
+    """Kolejność jak ORDER BY nazwisko, imie (NULL na początku); id rozstrzyga remisy"""
+    return (emp[2] is not None, emp[2] or '', emp[1] is not None, emp[1] or '', emp[0])
+
+
+class EmployeeStore:
+    """Wspólna lista pracowników w pamięci procesu.
+
+    Dane są wczytywane raz, a mutatory EmployeeManagement po zatwierdzeniu transakcji
+    odświeżają tylko zmienione wiersze (refresh_ids). Subskrybenci dostają listę zmian
+    EmployeeChange – jedno wywołanie na operację, także grupową.
+    """
+
+    # Wspólny magazyn dla całego procesu (jeden na plik bazy)
+    _instances = {}
+
+    @classmethod
+    def for_db(cls, db_manager):
+        """Zwraca wspólny magazyn pracowników dla danej bazy danych"""
+        key = os.path.abspath(db_manager.db_name)
+        instance = cls._instances.get(key)
+        if instance is None or instance.db is not db_manager:
+            instance = cls(db_manager)
+            cls._instances[key] = instance
+        return instance
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self.by_id = {}
+        self.loaded = False
+        self.revision = None        # rewizja tabeli employees, której odpowiadają dane w pamięci
+        self.local_revision = None  # licznik zmian employees z tego połączenia w tym samym momencie
+        self._ordered = None   # lista posortowana (tworzona przy pierwszym odczycie po zmianie)
+        self._listeners = []
+
+    # ---------------- SUBSKRYPCJE ----------------
+    def subscribe(self, listener):
+        """Rejestruje funkcję listener(changes) wywoływaną po każdej zmianie danych"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _publish(self, changes):
+        for listener in list(self._listeners):
+            try:
+                listener(changes)
+            except Exception as e:
+                print(f"Błąd obsługi zmian pracowników: {e}")
+
+    # ---------------- ODCZYT ----------------
+    def _employees_revision(self):
+        return self.db.get_data_revisions(('employees',)).get('employees')
+
+    def _revisions(self):
+        """(rewizja employees, liczba zmian employees wykonanych tym połączeniem)"""
+        return self._employees_revision(), self.db.get_local_revisions(('employees',)).get('employees')
+
+    def reload(self, notify=True):
+        """Wczytuje wszystkich pracowników od nowa"""
+        try:
+            # Rewizje przed danymi – zmiana w międzyczasie wywoła najwyżej kolejne przeładowanie
+            revision, local_revision = self._revisions()
+            rows = self.db.fetch_all(f"SELECT {EMPLOYEE_COLUMNS} FROM employees")
+        except Exception as e:
+            print(f"Błąd wczytywania pracowników: {e}")
+            return
+        self.revision, self.local_revision = revision, local_revision
+        self.by_id = {row[0]: row for row in rows}
+        self._ordered = None
+        self.loaded = True
+        if notify:
+            self._publish([EmployeeChange(STORE_RELOADED, None, None, None)])
+
+    def sync(self):
+        """Przeładowuje dane, gdy tabelę employees zmieniono z pominięciem magazynu; zwraca True po przeładowaniu"""
+        if self.loaded and self._employees_revision() == self.revision:
+            return False
+        self.reload()
+        return True
+
+    def all(self):
+        """Wszyscy pracownicy posortowani po nazwisku i imieniu (lista współdzielona – tylko do odczytu)"""
+        if not self.loaded:
+            self.reload(notify=False)
+        if self._ordered is None:
+            self._ordered = sorted(self.by_id.values(), key=employee_sort_key)
+        return self._ordered
+
+    def get(self, emp_id):
+        if not self.loaded:
+            self.reload(notify=False)
+        return self.by_id.get(emp_id)
+
+    # ---------------- ZMIANY ----------------
+    def refresh_ids(self, ids):
+        """Czyta ponownie wskazane wiersze i publikuje różnice (dodanie, zmiana, usunięcie).
+
+        Gdy od ostatniego odczytu tabelę zmieniło też inne połączenie (rewizja wzrosła bardziej
+        niż licznik zmian tego połączenia), dane są przeładowywane w całości.
+        """
+        if not self.loaded:
+            return []
+        ids = list(dict.fromkeys(ids))
+        rows = {}
+        try:
+            revision, local_revision = self._revisions()
+            if (None in (revision, local_revision, self.revision, self.local_revision)
+                    or revision - self.revision != local_revision - self.local_revision):
+                self.reload()
+                return []
+            for i in range(0, len(ids), STORE_CHUNK_SIZE):
+                chunk = ids[i:i + STORE_CHUNK_SIZE]
+                query = f"SELECT {EMPLOYEE_COLUMNS} FROM employees WHERE id IN ({','.join('?' * len(chunk))})"
+                rows.update((row[0], row) for row in self.db.fetch_all(query, chunk))
+            self.revision, self.local_revision = revision, local_revision
+        except Exception as e:
+            print(f"Błąd odświeżania pracowników: {e}")
+            self.reload()
+            return []
+
+        changes = []
+        for emp_id in ids:
+            old, new = self.by_id.get(emp_id), rows.get(emp_id)
+            if old == new:
+                continue
+            if new is None:
+                del self.by_id[emp_id]
+                changes.append(EmployeeChange(EMPLOYEE_REMOVED, emp_id, old, None))
+            else:
+                self.by_id[emp_id] = new
+                changes.append(EmployeeChange(EMPLOYEE_ADDED if old is None else EMPLOYEE_CHANGED, emp_id, old, new))
+
+        if changes:
+            self._ordered = None
+            self._publish(changes)
+        return changes
@@ -0,0 +1,216 @@
+import os
+import re
+import sqlite3
+import datetime
+
+# Ustawienia archiwizacji w tabeli settings: horyzont w dniach (puste/0 = wyłączona) i plik archiwum.
+# Archiwizacja jest domyślnie wyłączona – włącza ją administrator, ustawiając horyzont.
+HISTORY_ARCHIVE_SETTINGS_DEFAULTS = {
+    'history_retention_days': '',
+    'history_archive_path': '',
+}
+# Data ostatniej archiwizacji (najwyżej raz dziennie) – w tabeli archive_meta pliku archiwum,
+# a nie w settings, której zmiana unieważnia dane słownikowe na wszystkich stanowiskach
+HISTORY_ARCHIVE_LAST_RUN_KEY = 'last_run'
+ARCHIVE_META_TABLE = 'archive_meta'
+
+# VACUUM (tylko na żądanie, nie w cyklicznej archiwizacji) gdy wolne strony to co najmniej taka część pliku bazy
+ARCHIVE_VACUUM_FREE_RATIO = 0.25
+
+ARCHIVE_SCHEMA = 'archive'
+ARCHIVE_COLUMNS = ('id', 'timestamp', 'operator', 'action', 'details', 'employee_id', 'field', 'old_value', 'new_value')
+MONTH_PATTERN = re.compile(r'^\d{4}-\d{2}$')
+
+
+class HistoryArchive:
+    """Archiwizacja historii: wpisy starsze niż horyzont trafiają do miesięcznych tabel
+    history_RRRR_MM w osobnym pliku bazy (dołączanym przez ATTACH tylko gdy potrzebny)."""
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+
+    def get_config(self):
+        """Zwraca (horyzont w dniach lub None, ścieżka pliku archiwum)"""
+        config = dict(HISTORY_ARCHIVE_SETTINGS_DEFAULTS)
+        try:
+            rows = self.db.fetch_all(
+                f"SELECT key, value FROM settings WHERE key IN ({','.join('?' * len(config))})",
+                tuple(config)
+            )
+            config.update({key: (value or '').strip() for key, value in rows})
+        except sqlite3.Error as e:
+            print(f"Błąd odczytu ustawień archiwizacji historii: {e}")
+
+        try:
+            days = int(config['history_retention_days']) if config['history_retention_days'] else None
+        except ValueError:
+            print(f"Niepoprawny horyzont archiwizacji historii: {config['history_retention_days']}")
+            days = None
+        path = config['history_archive_path'] or f"{os.path.splitext(self.db.db_name)[0]}_archive.db"
+        return (days if days and days > 0 else None), path
+
+    # ---------------- PLIK ARCHIWUM ----------------
+    def is_attached(self):
+        return any(row[1] == ARCHIVE_SCHEMA for row in self.db.fetch_all("PRAGMA database_list"))
+
+    def attach(self):
+        """Dołącza plik archiwum do połączenia (ATTACH nie działa wewnątrz transakcji)"""
+        if self.is_attached():
+            return True
+        if self.db.in_transaction():
+            return False
+        _, path = self.get_config()
+        self.db.cursor.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (path,))
+        return True
+
+    @staticmethod
+    def table_name(month):
+        if not MONTH_PATTERN.match(month or ''):
+            raise ValueError(f"Niepoprawny miesiąc archiwum: {month}")
+        return f"history_{month.replace('-', '_')}"
+
+    def table(self, month):
+        """Pełna nazwa tabeli archiwum dla miesiąca RRRR-MM (z dołączeniem pliku archiwum)"""
+        name = self.table_name(month)
+        if not self.attach():
+            raise RuntimeError("Nie można dołączyć archiwum historii w trakcie transakcji")
+        return f"{ARCHIVE_SCHEMA}.{name}"
+
+    def months(self):
+        """Miesiące dostępne w archiwum (od najnowszego); pusta lista, gdy archiwum nie istnieje"""
+        _, path = self.get_config()
+        if not self.is_attached() and not os.path.exists(path):
+            return []
+        try:
+            self.attach()
+            rows = self.db.fetch_all(
+                f"SELECT name FROM {ARCHIVE_SCHEMA}.sqlite_master WHERE type='table' AND name LIKE 'history!_%' ESCAPE '!'"
+            )
+        except sqlite3.Error as e:
+            print(f"Błąd odczytu archiwum historii: {e}")
+            return []
+        months = [name[len('history_'):].replace('_', '-') for (name,) in rows]
+        return sorted((m for m in months if MONTH_PATTERN.match(m)), reverse=True)
+
+    def _create_table(self, month):
+        table = self.table(month)
+        self.db.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY,
+                timestamp DATETIME,
+                operator TEXT,
+                action TEXT,
+                details TEXT,
+                employee_id INTEGER,
+                field TEXT,
+                old_value TEXT,
+                new_value TEXT
+            )
+        """)
+        name = self.table_name(month)
+        self.db.cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_{name}_timestamp ON {name} (timestamp)"
+        )
+        self.db.cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_{name}_employee ON {name} (employee_id, timestamp)"
+        )
+        return table
+
+    # ---------------- ARCHIWIZACJA ----------------
+    @staticmethod
+    def _month_bounds(month):
+        year, mon = (int(x) for x in month.split('-'))
+        start = datetime.date(year, mon, 1)
+        end = datetime.date(year + mon // 12, mon % 12 + 1, 1)
+        return f"{start.isoformat()} 00:00:00", f"{end.isoformat()} 00:00:00"
+
+    def run(self, now=None, vacuum=False):
+        """Przenosi wpisy starsze niż horyzont do archiwum; zwraca słownik miesiąc -> liczba wpisów.
+
+        Każdy miesiąc jest kopiowany (INSERT OR IGNORE – powtórzenie po awarii nie dubluje wpisów),
+        a dopiero potem usuwany z tabeli history. Na koniec indeks FTS jest optymalizowany,
+        a baza przechodzi ANALYZE; VACUUM tylko przy vacuum=True (patrz maintain).
+        """
+        days, _ = self.get_config()
+        if not days or self.db.in_transaction():
+            return {}
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        cutoff = (now - datetime.timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+        months = [row[0] for row in self.db.fetch_all(
+            "SELECT DISTINCT substr(timestamp, 1, 7) FROM history WHERE timestamp < ?", (cutoff,)
+        )]
+        moved = {}
+        columns = ', '.join(ARCHIVE_COLUMNS)
+        for month in sorted(m for m in months if m and MONTH_PATTERN.match(m)):
+            start, end = self._month_bounds(month)
+            end = min(end, cutoff)
+            table = self._create_table(month)
+            # Osobne transakcje: w trybie WAL zapis do dwóch plików nie jest atomowy
+            with self.db.transaction():
+                self.db.cursor.execute(
+                    f"INSERT OR IGNORE INTO {table} ({columns}) "
+                    f"SELECT {columns} FROM main.history WHERE timestamp >= ? AND timestamp < ?",
+                    (start, end)
+                )
+            with self.db.transaction():
+                self.db.cursor.execute(
+                    f"DELETE FROM main.history WHERE timestamp >= ? AND timestamp < ? "
+                    f"AND id IN (SELECT id FROM {table})",
+                    (start, end)
+                )
+                moved[month] = self.db.cursor.rowcount
+
+        if moved:
+            self.maintain(vacuum)
+        return moved
+
+    def _meta_table(self):
+        table = f"{ARCHIVE_SCHEMA}.{ARCHIVE_META_TABLE}"
+        if not self.attach():
+            raise RuntimeError("Nie można dołączyć archiwum historii w trakcie transakcji")
+        self.db.cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT)")
+        return table
+
+    def run_if_due(self):
+        """Archiwizacja najwyżej raz dziennie (data ostatniego uruchomienia w pliku archiwum)"""
+        days, _ = self.get_config()
+        if not days or self.db.in_transaction():
+            return {}
+        today = datetime.date.today().isoformat()
+        table = self._meta_table()
+        row = self.db.fetch_one(f"SELECT value FROM {table} WHERE key=?", (HISTORY_ARCHIVE_LAST_RUN_KEY,))
+        if row and row[0] == today:
+            return {}
+        moved = self.run()
+        with self.db.transaction():
+            self.db.cursor.execute(f"INSERT OR REPLACE INTO {table} (key, value) VALUES (?, ?)",
+                                   (HISTORY_ARCHIVE_LAST_RUN_KEY, today))
+        return moved
+
+    def maintain(self, vacuum=False):
+        """Porządkuje bazę po archiwizacji: optymalizacja FTS i statystyki.
+
+        Zwolnione strony SQLite wykorzystuje ponownie, więc plik nie rośnie. VACUUM przepisuje całą
+        bazę pod wyłączną blokadą (inne stanowiska czekają), dlatego działa tylko na żądanie
+        (vacuum=True) i gdy wolne strony stanowią co najmniej ARCHIVE_VACUUM_FREE_RATIO pliku.
+        """
+        try:
+            if self.db.has_history_fts:
+                self.db.execute_query("INSERT INTO history_fts (history_fts) VALUES ('optimize')")
+            self.db.cursor.execute("ANALYZE main").fetchall()
+            if self.is_attached():
+                self.db.cursor.execute(f"ANALYZE {ARCHIVE_SCHEMA}").fetchall()
+            self.db.conn.commit()
+            if vacuum and self.free_ratio() >= ARCHIVE_VACUUM_FREE_RATIO:
+                self.db.cursor.execute("VACUUM main").fetchall()
+                # W trybie WAL plik bazy zmniejsza się dopiero po punkcie kontrolnym
+                self.db.checkpoint()
+        except sqlite3.Error as e:
+            print(f"Błąd porządkowania bazy po archiwizacji: {e}")
+
+    def free_ratio(self):
+        """Część stron pliku bazy na liście wolnych stron"""
+        pages = self.db.fetch_one("PRAGMA main.page_count")[0]
+        free = self.db.fetch_one("PRAGMA main.freelist_count")[0]
+        return free / pages if pages else 0.0
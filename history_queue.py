@@ -0,0 +1,111 @@
+import datetime
+
+# Ustawienia kolejki historii w tabeli settings
+HISTORY_QUEUE_SETTINGS_DEFAULTS = {
+    'history_crash_safe': '0',   # 1 = wpisy zapisywane w transakcji zmiany danych
+    'history_flush_size': '200',  # liczba wpisów wymuszająca zapis
+    'history_flush_ms': '2000',   # odstęp okresowego zapisu w oknie głównym
+}
+
+HISTORY_COLUMNS = ('timestamp', 'operator', 'action', 'details', 'employee_id', 'field', 'old_value', 'new_value')
+
+
+class HistoryQueue:
+    """Bufor zapisu historii (write-behind).
+
+    Wpisy dostają znacznik czasu w chwili zdarzenia i są zapisywane paczkami w jednej transakcji
+    (co flush_ms w oknie głównym, po przekroczeniu flush_size, przy wylogowaniu i zamknięciu).
+    Wpis z transakcji danych trafia do bufora dopiero po jej zatwierdzeniu – wycofana zmiana
+    nie zostawia śladu w historii.
+
+    W trybie crash_safe wpisy są zapisywane od razu w bieżącej transakcji danych, więc są
+    zatwierdzane razem z nią i nie giną przy awarii programu.
+    """
+
+    def __init__(self, db_manager, flush_size=200, crash_safe=False):
+        self.db = db_manager
+        self.flush_size = flush_size
+        self.crash_safe = crash_safe
+        self.flush_ms = int(HISTORY_QUEUE_SETTINGS_DEFAULTS['history_flush_ms'])
+        self.pending = []
+
+    @classmethod
+    def from_settings(cls, db_manager):
+        """Tworzy kolejkę z ustawieniami z tabeli settings (z wartościami domyślnymi)"""
+        config = dict(HISTORY_QUEUE_SETTINGS_DEFAULTS)
+        try:
+            rows = db_manager.fetch_all(
+                f"SELECT key, value FROM settings WHERE key IN ({','.join('?' * len(config))})",
+                tuple(config)
+            )
+            config.update({key: (value or '').strip() for key, value in rows if value})
+        except Exception as e:
+            print(f"Błąd odczytu ustawień kolejki historii: {e}")
+
+        def to_int(name):
+            try:
+                return max(1, int(config[name]))
+            except ValueError:
+                return int(HISTORY_QUEUE_SETTINGS_DEFAULTS[name])
+
+        queue = cls(db_manager, flush_size=to_int('history_flush_size'),
+                    crash_safe=config['history_crash_safe'].lower() in ('1', 'true', 'tak'))
+        queue.flush_ms = to_int('history_flush_ms')
+        return queue
+
+    def __len__(self):
+        return len(self.pending)
+
+    def put(self, operator, action, details, employee_id=None, field=None, old_value=None, new_value=None):
+        self.put_many(operator, [(action, details, employee_id, field, old_value, new_value)])
+
+    def put_many(self, operator, entries):
+        """Kolejkuje wpisy (action, details, employee_id, field, old_value, new_value) jednego operatora"""
+        # Czas zdarzenia w formacie CURRENT_TIMESTAMP (UTC), niezależny od chwili zapisu
+        timestamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        events = [(timestamp, operator) + tuple(entry) for entry in entries]
+        if not events:
+            return
+
+        if self.crash_safe:
+            # Starsze wpisy najpierw – kolejność w tabeli zgodna z kolejnością zdarzeń
+            self.pending.extend(events)
+            self._write()
+        elif self.db.in_transaction():
+            self.db.call_on_commit(lambda: self._append(events))
+        else:
+            self._append(events)
+
+    def _append(self, events):
+        self.pending.extend(events)
+        if len(self.pending) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        """Zapisuje oczekujące wpisy jedną transakcją; zwraca liczbę zapisanych wpisów"""
+        if not self.pending:
+            return 0
+        if self.db.in_transaction() and not self.crash_safe:
+            # Zapis w cudzej transakcji zginąłby razem z jej wycofaniem
+            self.db.call_on_commit(self.flush)
+            return 0
+        return self._write()
+
+    def _write(self):
+        events, self.pending = self.pending, []
+        try:
+            with self.db.transaction():
+                self.db.cursor.executemany(
+                    f"INSERT INTO history ({', '.join(HISTORY_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(HISTORY_COLUMNS))})",
+                    events
+                )
+            return len(events)
+        except Exception as e:
+            print(f"Błąd zapisu historii: {e}")
+            if self.crash_safe:
+                # Błąd wycofuje transakcję danych razem z wpisem – tak jak przy zapisie synchronicznym
+                raise
+            # Wpisy wracają na początek bufora i zostaną zapisane przy kolejnej próbie
+            self.pending = events + self.pending
+            return 0
@@ -3,6 +3,16 @@ from tkinter import ttk
 from employee_management import EmployeeManagement
 import datetime
 
+# Przesunięcie czasu zapisanego w bazie względem czasu lokalnego wyświetlanego w oknie
+TIMESTAMP_OFFSET = datetime.timedelta(hours=1)
+# Kolumny historii filtrowane polami Operator i Akcja
+HISTORY_FILTER_COLUMNS = {"Operator": 'operator', "Akcja": 'action'}
+# Opóźnienie filtrowania po wpisaniu znaku oraz próg przewinięcia doczytujący kolejną stronę
+FILTER_DEBOUNCE_MS = 300
+LOAD_MORE_THRESHOLD = 0.9
+# Pozycja listy źródeł oznaczająca bieżącą (niezarchiwizowaną) historię
+CURRENT_SOURCE = "Bieżąca historia"
+
 class HistoryWindow(tk.Toplevel):
     def __init__(self, master, emp_manager: EmployeeManagement):
         super().__init__(master)
@@ -16,6 +26,16 @@ class HistoryWindow(tk.Toplevel):
         self.main_frame = ttk.Frame(self, padding="10")
         self.main_frame.pack(fill="both", expand=True)
 
+        # Stan stronicowania: filtry bieżącego zapytania, kursor następnej strony
+        self._query = {}
+        self._cursor = None
+        self._loaded = 0
+        self._has_more = False
+        self._loading = False
+        self._newest_first = True
+        self._filter_job = None
+        self._filter_values = {}
+
         self.create_widgets()
         self.refresh_history()
         
@@ -47,17 +67,48 @@ class HistoryWindow(tk.Toplevel):
                 combo.bind('<<ComboboxSelected>>', self.apply_filters)
                 self.filters[col] = combo
             else:
-                entry = ttk.Entry(filter_frame)
-                entry.grid(row=0, column=i * 2 + 1, padx=5, pady=2, sticky='ew')
-                entry.bind('<KeyRelease>', self.apply_filters)
-                self.filters[col] = entry
+                # Lista wartości wczytywana dopiero przy rozwinięciu – otwarcie okna nie skanuje historii
+                column = HISTORY_FILTER_COLUMNS[col]
+                combo = ttk.Combobox(filter_frame, postcommand=lambda c=col, name=column: self.load_filter_values(c, name))
+                combo.grid(row=0, column=i * 2 + 1, padx=5, pady=2, sticky='ew')
+                combo.bind('<KeyRelease>', self.schedule_filters)
+                combo.bind('<<ComboboxSelected>>', self.apply_filters)
+                self.filters[col] = combo
 
         ttk.Button(filter_frame, text="Wyczyść Filtry", command=self.clear_filters).grid(row=0, column=6, padx=5, pady=2)
         ttk.Button(filter_frame, text="Odśwież", command=self.refresh_history).grid(row=0, column=7, padx=5, pady=2)
+
+        for i, col in enumerate(["Od", "Do"]):
+            ttk.Label(filter_frame, text=f"{col} (RRRR-MM-DD):").grid(row=1, column=i * 2, padx=5, pady=2, sticky='w')
+            entry = ttk.Entry(filter_frame)
+            entry.grid(row=1, column=i * 2 + 1, padx=5, pady=2, sticky='ew')
+            entry.bind('<KeyRelease>', self.schedule_filters)
+            entry.bind('<Return>', self.apply_filters)
+            self.filters[col] = entry
+
+        # Wyszukiwanie pełnotekstowe w szczegółach, akcji i operatorze (słowa jako prefiksy)
+        ttk.Label(filter_frame, text="Szukaj:").grid(row=1, column=4, padx=5, pady=2, sticky='w')
+        entry = ttk.Entry(filter_frame)
+        entry.grid(row=1, column=5, columnspan=3, padx=5, pady=2, sticky='ew')
+        entry.bind('<KeyRelease>', self.schedule_filters)
+        entry.bind('<Return>', self.apply_filters)
+        self.filters["Szukaj"] = entry
+
+        # Źródło wpisów: bieżąca tabela albo miesiąc z archiwum (lista wczytywana przy rozwinięciu)
+        ttk.Label(filter_frame, text="Źródło:").grid(row=2, column=0, padx=5, pady=2, sticky='w')
+        combo = ttk.Combobox(filter_frame, state='readonly', values=[CURRENT_SOURCE],
+                             postcommand=self.load_archive_months)
+        combo.set(CURRENT_SOURCE)
+        combo.grid(row=2, column=1, padx=5, pady=2, sticky='ew')
+        combo.bind('<<ComboboxSelected>>', self.apply_filters)
+        self.filters["Źródło"] = combo
         
         for i in range(8):
             filter_frame.columnconfigure(i, weight=1)
 
+        self.status_label = ttk.Label(self.main_frame, text="")
+        self.status_label.pack(side="bottom", fill='x', pady=(5, 0))
+
         columns = ("Timestamp", "Operator", "Akcja", "Szczegóły")
         self.history_tree = ttk.Treeview(self.main_frame, columns=columns, show="headings")
         
@@ -71,24 +122,48 @@ class HistoryWindow(tk.Toplevel):
         self.history_tree.column("Akcja", width=150, stretch=tk.NO)
         self.history_tree.column("Szczegóły", width=500, stretch=tk.YES)
         
-        v_scroll = ttk.Scrollbar(self.main_frame, orient="vertical", command=self.history_tree.yview)
+        self.v_scroll = ttk.Scrollbar(self.main_frame, orient="vertical", command=self.history_tree.yview)
         h_scroll = ttk.Scrollbar(self.main_frame, orient="horizontal", command=self.history_tree.xview)
-        self.history_tree.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
+        self.history_tree.configure(yscrollcommand=self.on_tree_yscroll, xscrollcommand=h_scroll.set)
         
-        v_scroll.pack(side="right", fill="y")
+        self.v_scroll.pack(side="right", fill="y")
         h_scroll.pack(side="bottom", fill="x")
         self.history_tree.pack(fill="both", expand=True)
         
-        self.history_tree.heading("Timestamp", text="Data/Czas", command=lambda: self.sort_column(self.history_tree, "Timestamp", False))
-        
+        self.history_tree.heading("Timestamp", text="Data/Czas ▼", command=self.toggle_sort)
+
+    # ---------------- STRONICOWANIE ----------------
     def refresh_history(self):
-        self.all_history_data = self.emp_manager.get_history()
-        self.display_history(self.all_history_data)
+        """Wczytuje pierwszą stronę historii dla bieżących filtrów"""
+        self._query = self.current_query()
+        self._cursor = None
+        self._loaded = 0
+        self._has_more = True
+        self.history_tree.delete(*self.history_tree.get_children())
+        self.load_next_page()
+
+    def load_next_page(self):
+        if not self._has_more or self._loading:
+            return
+        self._loading = True
+        try:
+            rows, self._cursor = self.emp_manager.search_history(
+                cursor=self._cursor, newest_first=self._newest_first, **self._query)
+            self._has_more = self._cursor is not None
+            self.display_history(rows)
+            self._loaded += len(rows)
+            more = " – przewiń w dół, aby wczytać kolejne" if self._has_more else ""
+            self.status_label.config(text=f"Wczytano wpisów: {self._loaded}{more}")
+        finally:
+            self._loading = False
+
+    def on_tree_yscroll(self, lo, hi):
+        self.v_scroll.set(lo, hi)
+        # Doczytanie kolejnej strony, gdy widok zbliża się do końca wczytanych wierszy
+        if self._has_more and not self._loading and float(hi) >= LOAD_MORE_THRESHOLD:
+            self.after_idle(self.load_next_page)
 
     def display_history(self, data):
-        for item in self.history_tree.get_children():
-            self.history_tree.delete(item)
-            
         for item in data:
             # Poprawiona konwersja czasu - użyj lokalnego czasu
             timestamp = self.convert_timestamp(item[1])
@@ -107,48 +182,90 @@ class HistoryWindow(tk.Toplevel):
                 dt = timestamp
                 
             # Dodaj godzinę (naprawa różnicy czasu)
-            dt = dt + datetime.timedelta(hours=1)
+            dt = dt + TIMESTAMP_OFFSET
             
             return dt.strftime('%Y-%m-%d %H:%M:%S')
         except Exception as e:
             print(f"Błąd konwersji czasu: {e}")
             return timestamp
+
+    def date_bound(self, text, next_day=False):
+        """Zamienia lokalną datę RRRR-MM-DD na granicę timestamp w bazie (None gdy pusta lub błędna)"""
+        text = text.strip()
+        if not text:
+            return None
+        try:
+            day = datetime.datetime.strptime(text, '%Y-%m-%d')
+        except ValueError:
+            return None
+        if next_day:
+            day += datetime.timedelta(days=1)
+        return (day - TIMESTAMP_OFFSET).strftime('%Y-%m-%d %H:%M:%S')
+
+    # ---------------- FILTRY ----------------
+    def load_filter_values(self, col, column):
+        if col not in self._filter_values:
+            self._filter_values[col] = self.emp_manager.get_history_values(column)
+        self.filters[col]['values'] = [''] + self._filter_values[col]
+
+    def load_archive_months(self):
+        months = [f"Archiwum {month}" for month in self.emp_manager.get_history_archive_months()]
+        self.filters["Źródło"]['values'] = [CURRENT_SOURCE] + months
+
+    def text_filter(self, col, name):
+        """Wartość z listy – dopasowanie dokładne (indeks); wpisany fragment – wyszukiwanie tekstu"""
+        value = self.filters[col].get().strip()
+        if not value:
+            return {}
+        if value in self._filter_values.get(col, ()):
+            return {name: value}
+        return {f"{name}_like": value}
+
+    def current_query(self):
+        query = {}
+        query.update(self.text_filter("Operator", 'operator'))
+        query.update(self.text_filter("Akcja", 'action'))
+        if self.filters["Szukaj"].get().strip():
+            query['text'] = self.filters["Szukaj"].get().strip()
+        if self.filters["Wydział"].get():
+            query['wydzial'] = self.filters["Wydział"].get()
+        date_from = self.date_bound(self.filters["Od"].get())
+        date_to = self.date_bound(self.filters["Do"].get(), next_day=True)
+        source = self.filters["Źródło"].get()
+        if source and source != CURRENT_SOURCE:
+            query['archive_month'] = source.split()[-1]
+        if date_from:
+            query['date_from'] = date_from
+        if date_to:
+            query['date_to'] = date_to
+        return query
+
+    def schedule_filters(self, event=None):
+        """Filtruje po przerwie w pisaniu – kolejne naciśnięcia zastępują oczekujące zadanie"""
+        if self._filter_job:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(FILTER_DEBOUNCE_MS, self.apply_filters)
             
     def apply_filters(self, event=None):
-        filtered_data = []
-        filter_operator = self.filters["Operator"].get().lower()
-        filter_action = self.filters["Akcja"].get().lower()
-        filter_wydzial = self.filters["Wydział"].get()
-        
-        for item in self.all_history_data:
-            timestamp, operator, action, details = str(item[1]), str(item[2]), str(item[3]), str(item[4])
-            
-            match_operator = filter_operator in operator.lower()
-            match_action = filter_action in action.lower()
-            match_wydzial = not filter_wydzial or filter_wydzial in details
-            
-            if match_operator and match_action and match_wydzial:
-                filtered_data.append(item)
-                
-        self.display_history(filtered_data)
+        if self._filter_job:
+            self.after_cancel(self._filter_job)
+            self._filter_job = None
+        # Bez zmiany filtrów (np. strzałki, niedokończona data) nie ma ponownego zapytania
+        if self.current_query() != self._query:
+            self.refresh_history()
         
     def clear_filters(self):
-        for widget in self.filters.values():
-            if isinstance(widget, ttk.Combobox):
+        for name, widget in self.filters.items():
+            if name == "Źródło":
+                widget.set(CURRENT_SOURCE)
+            elif isinstance(widget, ttk.Combobox):
                 widget.set('')
             else:
                 widget.delete(0, tk.END)
         self.refresh_history()
         
-    def sort_column(self, tree, col, reverse):
-        l = [(tree.set(k, col), k) for k in tree.get_children('')]
-        
-        if col == "Timestamp":
-            l.sort(key=lambda t: datetime.datetime.strptime(t[0], '%Y-%m-%d %H:%M:%S'), reverse=reverse)
-        else:
-            l.sort(reverse=reverse)
-            
-        for index, (val, k) in enumerate(l):
-            tree.move(k, '', index)
-            
-        tree.heading(col, command=lambda: self.sort_column(tree, col, not reverse))
\ No newline at end of file
+    def toggle_sort(self):
+        # Kolejność jest zmieniana w zapytaniu – sortowanie w drzewie dotyczyłoby tylko wczytanych stron
+        self._newest_first = not self._newest_first
+        self.history_tree.heading("Timestamp", text=f"Data/Czas {'▼' if self._newest_first else '▲'}")
+        self.refresh_history()
@@ -168,14 +168,8 @@ class L4Dialog(tk.Toplevel):
                 
             total_days = (end - start).days + 1
             
-            # Zapisz do bazy danych
-            self.emp_manager.db.execute_query("""
-                INSERT INTO l4_records (employee_id, start_date, end_date, total_days)
-                VALUES (?, ?, ?, ?)
-            """, (self.emp_id, start.date(), end.date(), total_days))
-            
-            # Zmień status pracownika na "L4"
-            self.emp_manager.update_employee_status(self.emp_id, "L4")
+            # Zapisz L4 i zmień status pracownika na "L4"
+            self.emp_manager.add_l4(self.emp_id, start.date(), end.date(), total_days)
             
             messagebox.showinfo("Sukces", 
                               f"Zwolnienie L4 zarejestrowane!\n\n"
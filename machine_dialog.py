@@ -46,7 +46,6 @@ class MachineDialog(tk.Toplevel):
         new_machine = self.maszyna_var.get()
         if new_machine and self.emp_manager.update_employee_machine(self.emp_id, new_machine):
             messagebox.showinfo("Sukces", f"Maszyna dla {self.emp_name} została zmieniona na {new_machine}.")
-            self.master.refresh_employee_list()
             self.destroy()
         else:
             messagebox.showerror("Błąd", "Nie udało się zmienić maszyny.")
\ No newline at end of file
@@ -2,9 +2,10 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from tkinter import font as tkfont
 from datetime import datetime
+import threading
 import pandas as pd
 
-from employee_management import EmployeeManagement
+from employee_management import EmployeeManagement, BULK_UPDATED, BULK_UNCHANGED
 from db_manager import DBManager
 from login_window import LoginWindow
 from employee_dialog import EmployeeDialog
@@ -15,6 +16,13 @@ from machine_dialog import MachineDialog
 from vacation_dialog import VacationDialog
 from l4_dialog import L4Dialog
 from color_editor import ColorEditor
+from virtual_tree import VirtualTreeview
+from employee_filter import EmployeeFilter
+from employee_store import STORE_RELOADED
+from employee_import import prepare_import, reject_overflow, to_records
+
+# Opóźnienie filtrowania po ostatnim naciśnięciu klawisza w polu nazwiska (ms)
+FILTER_DEBOUNCE_MS = 250
 
 
 class MainWindow(tk.Tk):
@@ -36,6 +44,7 @@ class MainWindow(tk.Tk):
         self.current_user = None
         self.emp_manager = EmployeeManagement(self.db_manager, self.current_user)
         self.all_employees_data = []
+        self.employee_filter = EmployeeFilter()
         self.filtered_data = []
         self.current_filters = {}
 
@@ -43,14 +52,23 @@ class MainWindow(tk.Tk):
         self._app_initialized = False
         self.login_win = None
 
-        # Debounce autosize, panel historii i meta historii
+        # Debounce autosize i panel historii
         self._autosize_job = None
+        # Debounce wyszukiwania: oczekujące zadanie i ostatnio zastosowany zestaw filtrów
+        self._filter_job = None
+        self._last_filter_query = None
         self._history_pane_visible = True
-        self._history_meta = None
+        # Zmiany z magazynu pracowników zbierane do jednego odświeżenia widoku
+        self._employee_changes_job = None
+        self._changed_employee_ids = set()
+        self._staffing_changed = False
+        self.staffing_alerts = []
 
         self.setup_light_theme()
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
         self.create_login_screen()
+        # Okresowy zapis zbuforowanej historii (niezależnie od logowania)
+        self.after(self.emp_manager.history_queue.flush_ms, self.flush_history_periodically)
 
     # ---------------- MOTYWY ----------------
     def setup_light_theme(self):
@@ -215,6 +233,8 @@ class MainWindow(tk.Tk):
         self.create_employee_tab()
         self.refresh_employee_list()
         self.update_dashboard()
+        # Lista, historia boczna i alerty śledzą zmiany pracowników zamiast przeładowań
+        self.emp_manager.employee_store.subscribe(self.on_employee_changes)
 
         self.main_frame.grid_rowconfigure(2, weight=1)  # lista (bez kafelka)
         self.main_frame.grid_rowconfigure(3, weight=1)  # lista (z kafelkiem)
@@ -304,7 +324,7 @@ class MainWindow(tk.Tk):
         ttk.Label(filter_frame, text="Nazwisko:").grid(row=0, column=len(filter_cols)*2, padx=4, pady=2, sticky='w')
         self.nazwisko_entry = ttk.Entry(filter_frame, width=15)
         self.nazwisko_entry.grid(row=0, column=len(filter_cols)*2+1, padx=4, pady=2, sticky='ew')
-        self.nazwisko_entry.bind('<KeyRelease>', self.apply_filters)
+        self.nazwisko_entry.bind('<KeyRelease>', self.schedule_filters)
 
         ttk.Button(filter_frame, text="🗑️ Wyczyść Filtry",
                    command=self.reset_filters).grid(row=0, column=len(filter_cols)*2+2, padx=4, pady=2)
@@ -334,7 +354,9 @@ class MainWindow(tk.Tk):
 
         columns = ("ID", "Imię", "Nazwisko", "Stanowisko", "Wydział", "Zmiana",
                    "Status", "Maszyna/Urządzenie", "Urlop od-do", "L4 od-do")
-        self.employee_tree = ttk.Treeview(self.list_frame, columns=columns, show="headings", selectmode='extended')
+        # Lista wirtualna: powyżej progu w Treeview istnieją tylko widoczne wiersze (iid = id pracownika)
+        self.employee_list = VirtualTreeview(self.list_frame, columns, show="headings", selectmode='extended')
+        self.employee_tree = self.employee_list.tree
 
         for col in columns:
             self.employee_tree.heading(col, text=col, anchor='center',
@@ -344,21 +366,15 @@ class MainWindow(tk.Tk):
         self.employee_tree.column("Urlop od-do", width=140, minwidth=110, anchor='center', stretch=False)
         self.employee_tree.column("L4 od-do",    width=120, minwidth=100, anchor='center', stretch=False)
 
-        v_scroll = ttk.Scrollbar(self.list_frame, orient="vertical", command=self.employee_tree.yview)
-        h_scroll = ttk.Scrollbar(self.list_frame, orient="horizontal", command=self.employee_tree.xview)
-        self.employee_tree.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
-
-        self.employee_tree.grid(row=0, column=0, sticky="nsew")
-        v_scroll.grid(row=0, column=1, sticky="ns")
-        h_scroll.grid(row=1, column=0, sticky="ew")
+        self.employee_list.grid(row=0, column=0, sticky="nsew")
 
         self.list_frame.grid_rowconfigure(0, weight=1)
         self.list_frame.grid_columnconfigure(0, weight=1)
 
         self.employee_tree.bind('<Double-1>', self.on_double_click_employee)
         self.employee_tree.bind('<Button-3>', self.show_context_menu)
-        self.employee_tree.bind('<<TreeviewSelect>>', self.on_selection_change)
-        self.employee_tree.bind('<Configure>', self._on_tree_configure)
+        self.employee_tree.bind('<<TreeviewSelect>>', self.on_selection_change, add='+')
+        self.employee_tree.bind('<Configure>', self._on_tree_configure, add='+')
 
         # Prawy panel: podgląd historii
         self.history_side_frame = self.create_history_side_panel()
@@ -389,133 +405,30 @@ class MainWindow(tk.Tk):
         yscroll.pack(side='left', fill='y', padx=(0,6), pady=(0,6))
         return side
 
-    # ---------- WSPARCIE HISTORII (detekcja i logowanie) ----------
-    def _detect_history_table_and_columns(self):
-        candidates = ['history', 'historia', 'employee_history', 'log_history', 'logs']
-        for t in candidates:
-            try:
-                info = self.emp_manager.db.fetch_all(f"PRAGMA table_info({t})")
-            except Exception:
-                info = []
-            cols = [row[1] for row in info] if info else []
-            if not cols:
-                continue
-            lower = [c.lower() for c in cols]
-
-            def find(names):
-                for n in names:
-                    if n in lower:
-                        return cols[lower.index(n)]
-                return None
-
-            ts = find(['timestamp', 'czas', 'date', 'created_at', 'created', 'ts', 'data', 'datetime'])
-            action = find(['action', 'akcja', 'type', 'event', 'operation'])
-            details = find(['details', 'szczegoly', 'message', 'opis', 'info', 'detail', 'msg'])
-            emp = find(['employee_id', 'pracownik_id', 'emp_id', 'id_pracownika'])
-            if not ts:
-                ts = 'rowid'
-            return {'table': t, 'ts': ts, 'action': action, 'details': details, 'emp': emp}
-        return None
-
-    def _get_emp_row(self, emp_id):
-        try:
-            return self.emp_manager.db.fetch_one(
-                "SELECT id, imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna FROM employees WHERE id=?",
-                (emp_id,)
-            )
-        except Exception:
-            return None
-
-    def _log_history_emp(self, action, details, emp_id):
-        try:
-            return self.emp_manager.log_history(action, details, employee_id=emp_id)
-        except TypeError:
-            try:
-                return self.emp_manager.log_history(action, details, emp_id)
-            except Exception:
-                try:
-                    return self.emp_manager.log_history(action, f"[EMP:{emp_id}] {details}")
-                except Exception:
-                    pass
-
-    def _log_field_change(self, emp_id, label, old, new):
-        if old == new:
-            return
-        action = f"Zmiana {label.lower()}"
-        details = f"Zmieniono {label.lower()}: {old or '-'} -> {new or '-'}"
-        self._log_history_emp(action, details, emp_id)
-
+    # ---------- HISTORIA PRACOWNIKA ----------
     def populate_side_history(self):
         if not hasattr(self, 'history_tree'):
             return
         for i in self.history_tree.get_children():
             self.history_tree.delete(i)
 
-        sel = self.employee_tree.selection()
+        sel = self.employee_list.selection()
         if not sel:
             self.history_tree.insert('', 'end', values=('', 'Wybierz pracownika', ''))
             return
 
         try:
-            emp_id = int(self.employee_tree.item(sel[0], 'values')[0])
+            emp_id = int(sel[0])
         except Exception:
             self.history_tree.insert('', 'end', values=('', 'Wybierz pracownika', ''))
             return
 
-        rows = []
-        try:
-            rows = self.emp_manager.get_employee_history(emp_id)
-        except Exception:
-            pass
-        if not rows:
-            try:
-                rows = self.emp_manager.get_history(employee_id=emp_id, limit=50)
-            except Exception:
-                rows = []
-        if not rows:
-            if not self._history_meta:
-                self._history_meta = self._detect_history_table_and_columns()
-            meta = self._history_meta
-            if meta:
-                try:
-                    if meta['emp']:
-                        sql = f"SELECT {meta['ts']}, {meta['action'] or 'NULL'}, {meta['details'] or 'NULL'} " \
-                              f"FROM {meta['table']} WHERE {meta['emp']}=? " \
-                              f"ORDER BY {meta['ts']} DESC LIMIT 50"
-                        rows = self.emp_manager.db.fetch_all(sql, (emp_id,))
-                    elif meta['details']:
-                        sql = f"SELECT {meta['ts']}, {meta['action'] or 'NULL'}, {meta['details']} " \
-                              f"FROM {meta['table']} WHERE {meta['details']} LIKE ? " \
-                              f"ORDER BY {meta['ts']} DESC LIMIT 50"
-                        rows = self.emp_manager.db.fetch_all(sql, (f"%{emp_id}%",))
-                    else:
-                        sql = f"SELECT {meta['ts']}, {meta['action'] or 'NULL'}, {meta['details'] or 'NULL'} " \
-                              f"FROM {meta['table']} ORDER BY {meta['ts']} DESC LIMIT 20"
-                        rows = self.emp_manager.db.fetch_all(sql)
-                except Exception:
-                    rows = []
-        if not rows:
-            try:
-                rows = self.emp_manager.get_history(limit=20)
-            except Exception:
-                rows = []
-
+        rows = self.emp_manager.get_employee_history(emp_id, limit=50)
         if not rows:
             self.history_tree.insert('', 'end', values=('', 'Brak wpisów historii', ''))
             return
 
-        for r in rows:
-            if isinstance(r, dict):
-                ts = r.get('timestamp') or r.get('time') or r.get('date') or ''
-                action = r.get('action') or r.get('type') or ''
-                details = r.get('details') or r.get('message') or ''
-            else:
-                if len(r) >= 3:
-                    ts, action, details = r[0], r[1], r[2]
-                elif len(r) == 2:
-                    ts, action, details = r[0], r[1], ''
-                else:
-                    ts, action, details = '', str(r), ''
+        for _, ts, _, action, details, *_ in rows:
             self.history_tree.insert('', 'end', values=(ts, action, details))
 
     def toggle_side_history(self):
@@ -551,36 +464,25 @@ class MainWindow(tk.Tk):
 
     def refresh_employee_list(self, filter_data=None):
         if filter_data is None:
-            self.all_employees_data = self.emp_manager.get_all_employees()
+            # Przeładowanie tylko po zmianach z pominięciem magazynu (np. z innego stanowiska)
+            self.emp_manager.employee_store.sync()
+            # Wspólna lista magazynu (tylko do odczytu) – nowa lista oznacza zmianę danych
+            self.all_employees_data = self.emp_manager.employee_store.all()
+            if not self.employee_filter.matches_data(self.all_employees_data):
+                self.employee_filter.rebuild(self.all_employees_data)
             data_to_display = self.all_employees_data
         else:
             data_to_display = filter_data
 
-        for item in self.employee_tree.get_children():
-            self.employee_tree.delete(item)
-
+        previous_selection = self.employee_list.selection()
         status_colors = {name: color for name, color in (self.emp_manager.get_statuses_config() or [])}
 
-        vacations = self.emp_manager.get_vacations() or []
-        l4_records = self.emp_manager.get_l4_records() or []
-        vacation_map = {v[1]: f"{v[2]} - {v[3]}" for v in vacations}
-        l4_map = {l[1]: f"{l[2]} - {l[3]}" for l in l4_records}
+        vacation_map, l4_map = self.emp_manager.get_absence_maps()
 
-        overflow_data = {}
-        for emp in data_to_display:
-            wydzial, zmiana, status = emp[4], emp[5], emp[6]
-            if status == "W Pracy" and (zmiana and "Wolne" not in zmiana):
-                key = (wydzial, zmiana)
-                if key not in overflow_data:
-                    required = self.emp_manager.get_required_staff_by_wydzial_shift(wydzial, zmiana)
-                    current_count = len([e for e in data_to_display
-                                         if e[4] == wydzial and e[5] == zmiana and e[6] == "W Pracy"])
-                    overflow_data[key] = {
-                        'required': required,
-                        'current': current_count,
-                        'overflow': (current_count > required) if (required and required > 0) else False
-                    }
+        staffing_groups = self.emp_manager.compute_staffing_groups(data_to_display)
 
+        rows = []
+        tag_colors = {'OVERFLOW': '#FFF0E0'}
         for emp in data_to_display:
             emp_id, imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna = emp
             vacation_info = vacation_map.get(emp_id, "")
@@ -589,25 +491,26 @@ class MainWindow(tk.Tk):
             values = (emp_id, imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna, vacation_info, l4_info)
 
             color_tag = (status or '').replace(' ', '_') or 'STATUS_NONE'
-            self.employee_tree.tag_configure(color_tag, background=status_colors.get(status, 'white'))
+            tag_colors[color_tag] = status_colors.get(status, 'white')
+
+            tags = (color_tag,)
+            if status == "W Pracy" and staffing_groups.get((wydzial, zmiana), {}).get('overflow'):
+                tags = (color_tag, 'OVERFLOW')
 
-            tags = [color_tag]
-            if status == "W Pracy" and (zmiana and "Wolne" not in zmiana):
-                key = (wydzial, zmiana)
-                if key in overflow_data and overflow_data[key]['overflow']:
-                    self.employee_tree.tag_configure('OVERFLOW', background='#FFF0E0')
-                    tags.append('OVERFLOW')
+            rows.append((str(emp_id), values, tags))
 
-            self.employee_tree.insert("", tk.END, values=values, tags=tuple(tags))
+        self.employee_list.configure_tags(tag_colors)
+        self.employee_list.set_rows(rows)
 
         # jeśli panel historii włączony i nic nie zaznaczono – zaznacz pierwszy
-        if self._history_pane_visible and not self.employee_tree.selection():
-            children = self.employee_tree.get_children('')
-            if children:
-                self.employee_tree.selection_set(children[0])
+        if self._history_pane_visible and not self.employee_list.selection():
+            if self.employee_list.rows:
+                self.employee_list.selection_set((self.employee_list.rows[0][0],))
 
         self.update_status_bar()
-        self.on_selection_change(None)
+        # Przy samym filtrowaniu historia jest odświeżana tylko, gdy zmieniło się zaznaczenie
+        if filter_data is None or self.employee_list.selection() != previous_selection:
+            self.on_selection_change(None)
         self.update_dashboard()
         # UWAGA: bez nawiasów – przekazujemy referencję
         self.after_idle(self.schedule_autosize)
@@ -615,10 +518,7 @@ class MainWindow(tk.Tk):
     # Autosize kolumn – wyśrodkowanie + limity (L4/Urlop węższe)
     def auto_size_employee_tree(self, max_col_widths=None, sample_limit=600):
         tv = getattr(self, 'employee_tree', None)
-        if not tv:
-            return
-        rows = tv.get_children("")
-        if not rows:
+        if not tv or not self.employee_list.rows:
             return
 
         default_max = {
@@ -642,15 +542,13 @@ class MainWindow(tk.Tk):
             font_data = tkfont.Font()
             font_head = font_data
 
-        sample = rows[:sample_limit]
-
-        for col in tv["columns"]:
+        # Próbka z danych w Pythonie (nie z elementów drzewa – w trybie wirtualnym jest ich tylko kilka)
+        for col_index, col in enumerate(tv["columns"]):
             header_text = tv.heading(col).get("text", col)
             w_header = font_head.measure(str(header_text)) + 24
 
             w_data = 0
-            for iid in sample:
-                val = tv.set(iid, col)
+            for val in set(self.employee_list.column_values(col_index, sample_limit)):
                 w_data = max(w_data, font_data.measure(str(val)) + 18)
 
             width = max(min_widths.get(col, 60),
@@ -673,26 +571,42 @@ class MainWindow(tk.Tk):
     def _on_window_configure(self, event):
         self.schedule_autosize()
 
+    def _current_filter_query(self):
+        return (
+            self.dynamic_filter_vars["Wydział"].get(),
+            self.dynamic_filter_vars["Zmiana"].get(),
+            self.dynamic_filter_vars["Status"].get(),
+            self.dynamic_filter_vars["Stanowisko"].get(),
+            self.dynamic_filter_vars["Maszyna"].get(),
+            self.nazwisko_entry.get().strip().lower(),
+        )
+
+    def schedule_filters(self, event=None):
+        """Filtruje po przerwie w pisaniu – kolejne naciśnięcia zastępują oczekujące zadanie"""
+        if self._filter_job:
+            try:
+                self.after_cancel(self._filter_job)
+            except Exception:
+                pass
+        self._filter_job = self.after(FILTER_DEBOUNCE_MS, self._run_scheduled_filters)
+
+    def _run_scheduled_filters(self):
+        self._filter_job = None
+        # Klawisze niezmieniające tekstu (strzałki, Shift...) nie powodują ponownego filtrowania
+        if self._current_filter_query() != self._last_filter_query:
+            self.apply_filters()
+
     def apply_filters(self, event=None):
-        filtered_data = []
-
-        filter_wydzial = self.dynamic_filter_vars["Wydział"].get()
-        filter_zmiana = self.dynamic_filter_vars["Zmiana"].get()
-        filter_status = self.dynamic_filter_vars["Status"].get()
-        filter_stanowisko = self.dynamic_filter_vars["Stanowisko"].get()
-        filter_maszyna = self.dynamic_filter_vars["Maszyna"].get()
-        filter_nazwisko = self.nazwisko_entry.get().strip().lower()
-
-        for emp in self.all_employees_data:
-            match_wydzial = not filter_wydzial or emp[4] == filter_wydzial
-            match_zmiana = not filter_zmiana or emp[5] == filter_zmiana
-            match_status = not filter_status or emp[6] == filter_status
-            match_stanowisko = not filter_stanowisko or emp[3] == filter_stanowisko
-            match_maszyna = not filter_maszyna or emp[7] == filter_maszyna
-            match_nazwisko = not filter_nazwisko or (emp[2] and filter_nazwisko in str(emp[2]).lower())
-
-            if match_wydzial and match_zmiana and match_status and match_stanowisko and match_maszyna and match_nazwisko:
-                filtered_data.append(emp)
+        query = self._current_filter_query()
+        self._last_filter_query = query
+        filter_wydzial, filter_zmiana, filter_status, filter_stanowisko, filter_maszyna, filter_nazwisko = query
+
+        if not self.employee_filter.matches_data(self.all_employees_data):
+            self.employee_filter.rebuild(self.all_employees_data)
+        filtered_data = self.employee_filter.query(
+            nazwisko=filter_nazwisko, wydzial=filter_wydzial, zmiana=filter_zmiana,
+            status=filter_status, stanowisko=filter_stanowisko, maszyna=filter_maszyna
+        )
 
         self.filtered_data = filtered_data
         self.refresh_employee_list(filtered_data)
@@ -704,18 +618,46 @@ class MainWindow(tk.Tk):
 
         # jeśli dokładnie 1 pracownik – zaznacz i pokaż historię
         if len(self.filtered_data) == 1:
-            target_id = self.filtered_data[0][0]
-            for iid in self.employee_tree.get_children(''):
-                try:
-                    row_id = int(self.employee_tree.set(iid, "ID"))
-                except Exception:
-                    continue
-                if row_id == target_id:
-                    self.employee_tree.selection_set(iid)
-                    self.employee_tree.see(iid)
-                    break
+            target_iid = str(self.filtered_data[0][0])
+            if self.employee_list.exists(target_iid):
+                self.employee_list.selection_set((target_iid,))
+                self.employee_list.see(target_iid)
             self.populate_side_history()
 
+    # ---------------- ZMIANY PRACOWNIKÓW (subskrypcja magazynu) ----------------
+    def on_employee_changes(self, changes):
+        """Aktualizuje indeksy filtrów o zmienione wiersze; widok odświeżany raz po zakończeniu operacji"""
+        self.all_employees_data = self.emp_manager.employee_store.all()
+        if any(change.kind == STORE_RELOADED for change in changes):
+            self.employee_filter.rebuild(self.all_employees_data)
+            self._changed_employee_ids.add(None)
+            self._staffing_changed = True
+        else:
+            self.employee_filter.apply_changes(changes, self.all_employees_data)
+            self._changed_employee_ids.update(change.emp_id for change in changes)
+            # Alerty zależą tylko od wydziału, zmiany i statusu
+            if any((change.old or ())[4:7] != (change.new or ())[4:7] for change in changes):
+                self._staffing_changed = True
+        if not self._employee_changes_job:
+            self._employee_changes_job = self.after_idle(self._apply_employee_changes)
+
+    def _apply_employee_changes(self):
+        self._employee_changes_job = None
+        changed_ids, self._changed_employee_ids = self._changed_employee_ids, set()
+        staffing_changed, self._staffing_changed = self._staffing_changed, False
+        try:
+            previous_selection = self.employee_list.selection()
+            self.apply_filters()
+            # Historia boczna – tylko gdy zmienił się zaznaczony pracownik (zmiana zaznaczenia odświeża ją sama)
+            selection = self.employee_list.selection()
+            if selection and selection == previous_selection and \
+                    (None in changed_ids or int(selection[0]) in changed_ids):
+                self.populate_side_history()
+            if staffing_changed:
+                self.refresh_staffing_alerts()
+        except Exception as e:
+            print(f"Błąd odświeżania po zmianie pracowników: {e}")
+
     def show_summary_tile(self, filtered_data, filter_wydzial, filter_zmiana, filter_status):
         if not self.summary_tile_frame.winfo_ismapped():
             self.summary_tile_frame.grid(row=2, column=0, sticky="ew", pady=(0, 6))
@@ -760,6 +702,16 @@ class MainWindow(tk.Tk):
                 tk.Label(stats_frame, text="  ".join(parts),
                          font=('Arial', 8), fg='#444444', bg=self.bg_color).pack()
 
+        # Obsada liczona tą samą funkcją co podświetlenie listy i okno podsumowania
+        if filter_wydzial or filter_zmiana:
+            groups = self.emp_manager.compute_staffing_groups(filtered_data).values()
+            shortage = sum(g['shortage'] for g in groups)
+            overflow = sum(g['overflow'] for g in groups)
+            if shortage or overflow:
+                tk.Label(self.summary_content_frame,
+                         text=f"⚠️ Braki: {shortage}  •  Nadmiar: {overflow}",
+                         font=('Arial', 8, 'bold'), fg='#B85C00', bg=self.bg_color).pack()
+
     def hide_summary_tile(self):
         if self.summary_tile_frame.winfo_ismapped():
             self.summary_tile_frame.grid_remove()
@@ -781,11 +733,29 @@ class MainWindow(tk.Tk):
         self.dynamic_filter_vars["Stanowisko"].set('')
         self.dynamic_filter_vars["Maszyna"].set('')
         self.nazwisko_entry.delete(0, tk.END)
+        self._last_filter_query = None
         self.refresh_employee_list()
         self.hide_summary_tile()
 
     # ---------------- TREEVIEW HELPERS ----------------
     def sort_column(self, tree, col, reverse):
+        if tree is self.employee_tree:
+            # Lista pracowników sortowana w Pythonie – kolejność zostaje po odświeżeniu
+            col_index = list(tree["columns"]).index(col)
+            if col == "ID":
+                def key_fn(values):
+                    try:
+                        return (0, int(values[col_index]), '')
+                    except Exception:
+                        return (1, 0, str(values[col_index]))
+            else:
+                def key_fn(values):
+                    value = values[col_index]
+                    return '' if value is None else str(value).lower()
+            self.employee_list.sort_by(key_fn, reverse)
+            tree.heading(col, command=lambda: self.sort_column(tree, col, not reverse))
+            return
+
         l = [(tree.set(k, col), k) for k in tree.get_children('')]
         if col == "ID":
             def key_fn(t):
@@ -802,23 +772,18 @@ class MainWindow(tk.Tk):
         tree.heading(col, command=lambda: self.sort_column(tree, col, not reverse))
 
     def get_selected_employee_ids(self):
-        selected_items = self.employee_tree.selection()
         selected_ids = []
-        for item in selected_items:
-            values = self.employee_tree.item(item, 'values')
+        for item in self.employee_list.selection():
             try:
-                selected_ids.append(int(values[0]))
+                selected_ids.append(int(item))
             except Exception:
                 continue
         return selected_ids
 
     def get_selected_employee_data(self):
-        selected_item = self.employee_tree.selection()
+        selected_item = self.employee_list.selection()
         if selected_item:
-            values = self.employee_tree.item(selected_item[0], 'values')
-            emp_id = values[0]
-            full_data = self.emp_manager.db.fetch_one("SELECT * FROM employees WHERE id=?", (emp_id,))
-            return full_data
+            return self.emp_manager.get_employee(int(selected_item[0]))
         return None
 
     def on_double_click_employee(self, event):
@@ -826,8 +791,6 @@ class MainWindow(tk.Tk):
         if data:
             dialog = EmployeeDialog(self, self.emp_manager, employee_data=data)
             self.wait_window(dialog)
-            self.refresh_employee_list()
-            self.apply_filters()
 
     def on_selection_change(self, event):
         self.populate_side_history()
@@ -837,7 +800,7 @@ class MainWindow(tk.Tk):
         item_id = self.employee_tree.identify_row(event.y)
         if not item_id:
             return
-        self.employee_tree.selection_set(item_id)
+        self.employee_list.selection_set((item_id,))
         data = self.get_selected_employee_data()
         if not data:
             return
@@ -901,8 +864,6 @@ class MainWindow(tk.Tk):
     def open_edit_dialog(self, employee_data):
         dialog = EmployeeDialog(self, self.emp_manager, employee_data=employee_data)
         self.wait_window(dialog)
-        self.refresh_employee_list()
-        self.apply_filters()
 
     # ---------------- OPERACJE GRUPOWE + DOKŁADNE LOGI ----------------
     def bulk_change_status(self):
@@ -931,17 +892,10 @@ class MainWindow(tk.Tk):
             if not new_status:
                 messagebox.showwarning("Błąd", "Wybierz status.")
                 return
-            success_count = 0
-            for emp_id in selected_ids:
-                old_row = self._get_emp_row(emp_id)
-                old_status = old_row[6] if old_row else None
-                if self.emp_manager.update_employee_status(emp_id, new_status):
-                    success_count += 1
-                    self._log_field_change(emp_id, "Status", old_status, new_status)
+            outcomes = self.emp_manager.bulk_update_status(selected_ids, new_status)
+            success_count = sum(1 for o in outcomes.values() if o in (BULK_UPDATED, BULK_UNCHANGED))
             status_dialog.destroy()
             messagebox.showinfo("Sukces", f"Zmieniono status dla {success_count}/{len(selected_ids)} pracowników.")
-            self.refresh_employee_list()
-            self.apply_filters()
 
         ttk.Button(status_dialog, text="Zastosuj", command=apply_bulk_status).pack(pady=10)
         status_dialog.update_idletasks()
@@ -992,14 +946,8 @@ class MainWindow(tk.Tk):
             if not any([new_wydzial, new_zmiana, new_stanowisko]):
                 messagebox.showwarning("Błąd", "Wybierz przynajmniej jeden parametr do zmiany.")
                 return
-            success_count = 0
-            for emp_id in selected_ids:
-                if self.safe_move_employee(emp_id, new_wydzial, new_zmiana, new_stanowisko):
-                    success_count += 1
             move_dialog.destroy()
-            messagebox.showinfo("Sukces", f"Przeniesiono {success_count}/{len(selected_ids)} pracowników.")
-            self.refresh_employee_list()
-            self.apply_filters()
+            self.safe_bulk_move(selected_ids, new_wydzial, new_zmiana, new_stanowisko)
 
         ttk.Button(move_dialog, text="Zastosuj", command=apply_bulk_move).pack(pady=10)
         move_dialog.update_idletasks()
@@ -1032,17 +980,10 @@ class MainWindow(tk.Tk):
             if not new_machine:
                 messagebox.showwarning("Błąd", "Wybierz maszynę.")
                 return
-            success_count = 0
-            for emp_id in selected_ids:
-                old_row = self._get_emp_row(emp_id)
-                old_machine = old_row[7] if old_row else None
-                if self.emp_manager.update_employee_machine(emp_id, new_machine):
-                    success_count += 1
-                    self._log_field_change(emp_id, "Maszyna", old_machine, new_machine)
+            outcomes = self.emp_manager.bulk_update_machine(selected_ids, new_machine)
+            success_count = sum(1 for o in outcomes.values() if o in (BULK_UPDATED, BULK_UNCHANGED))
             machine_dialog.destroy()
             messagebox.showinfo("Sukces", f"Zmieniono maszynę dla {success_count}/{len(selected_ids)} pracowników.")
-            self.refresh_employee_list()
-            self.apply_filters()
 
         ttk.Button(machine_dialog, text="Zastosuj", command=apply_bulk_machine).pack(pady=10)
         machine_dialog.update_idletasks()
@@ -1057,22 +998,13 @@ class MainWindow(tk.Tk):
             return
         if messagebox.askyesno("Potwierdzenie",
                                f"Czy na pewno chcesz usunąć {len(selected_ids)} zaznaczonych pracowników?"):
-            success_count = 0
-            for emp_id in selected_ids:
-                if self.emp_manager.delete_employee(emp_id):
-                    success_count += 1
-                    self._log_history_emp("Usunięcie pracownika", "Usunięto pracownika z bazy", emp_id)
+            outcomes = self.emp_manager.bulk_delete(selected_ids)
+            success_count = sum(1 for o in outcomes.values() if o == BULK_UPDATED)
             messagebox.showinfo("Sukces", f"Usunięto {success_count}/{len(selected_ids)} pracowników.")
-            self.refresh_employee_list()
-            self.apply_filters()
 
     # ---------------- SZYBKIE WYSZUKIWANIA ----------------
     def find_without_position(self):
-        filtered = []
-        for emp in self.all_employees_data:
-            stanowisko = str(emp[3]).strip() if emp[3] else ""
-            if not stanowisko or stanowisko.lower() in ['', 'nieustawione', 'brak', 'none', 'null']:
-                filtered.append(emp)
+        filtered = self.employee_filter.find_missing('stanowisko')
         if filtered:
             self.refresh_employee_list(filtered)
             messagebox.showinfo("Znaleziono", f"Znaleziono {len(filtered)} pracowników bez stanowiska.")
@@ -1080,11 +1012,7 @@ class MainWindow(tk.Tk):
             messagebox.showinfo("Brak wyników", "Wszyscy pracownicy mają ustawione stanowisko.")
 
     def find_without_department(self):
-        filtered = []
-        for emp in self.all_employees_data:
-            wydzial = str(emp[4]).strip() if emp[4] else ""
-            if not wydzial or wydzial.lower() in ['', 'nieustawiony', 'brak', 'none', 'null']:
-                filtered.append(emp)
+        filtered = self.employee_filter.find_missing('wydzial')
         if filtered:
             self.refresh_employee_list(filtered)
             messagebox.showinfo("Znaleziono", f"Znaleziono {len(filtered)} pracowników bez wydziału.")
@@ -1092,11 +1020,7 @@ class MainWindow(tk.Tk):
             messagebox.showinfo("Brak wyników", "Wszyscy pracownicy mają ustawiony wydział.")
 
     def find_without_machine(self):
-        filtered = []
-        for emp in self.all_employees_data:
-            maszyna = str(emp[7]).strip() if emp[7] else ""
-            if not maszyna or maszyna.lower() in ['', 'brak', 'none', 'null', 'nieustawione']:
-                filtered.append(emp)
+        filtered = self.employee_filter.find_missing('maszyna')
         if filtered:
             self.refresh_employee_list(filtered)
             messagebox.showinfo("Znaleziono", f"Znaleziono {len(filtered)} pracowników bez maszyny.")
@@ -1104,15 +1028,7 @@ class MainWindow(tk.Tk):
             messagebox.showinfo("Brak wyników", "Wszyscy pracownicy mają ustawioną maszynę.")
 
     def find_all_missing_data(self):
-        filtered = []
-        for emp in self.all_employees_data:
-            stanowisko = str(emp[3]).strip() if emp[3] else ""
-            wydzial = str(emp[4]).strip() if emp[4] else ""
-            maszyna = str(emp[7]).strip() if emp[7] else ""
-            if (not stanowisko or stanowisko.lower() in ['', 'nieustawione', 'brak', 'none', 'null'] or
-                not wydzial or wydzial.lower() in ['', 'nieustawiony', 'brak', 'none', 'null'] or
-                not maszyna or maszyna.lower() in ['', 'brak', 'none', 'null', 'nieustawione']):
-                filtered.append(emp)
+        filtered = self.employee_filter.find_missing('stanowisko', 'wydzial', 'maszyna')
         if filtered:
             self.refresh_employee_list(filtered)
             messagebox.showinfo("Znaleziono", f"Znaleziono {len(filtered)} pracowników z brakującymi danymi.")
@@ -1122,38 +1038,24 @@ class MainWindow(tk.Tk):
             messagebox.showinfo("Brak wyników", "Wszyscy pracownicy mają kompletne dane.")
 
     def analyze_missing_data(self, employees):
-        mp = md = mm = 0
-        for emp in employees:
-            stanowisko = str(emp[3]).strip() if emp[3] else ""
-            wydzial = str(emp[4]).strip() if emp[4] else ""
-            maszyna = str(emp[7]).strip() if emp[7] else ""
-            if not stanowisko or stanowisko.lower() in ['', 'nieustawione', 'brak', 'none', 'null']:
-                mp += 1
-            if not wydzial or wydzial.lower() in ['', 'nieustawiony', 'brak', 'none', 'null']:
-                md += 1
-            if not maszyna or maszyna.lower() in ['', 'brak', 'none', 'null', 'nieustawione']:
-                mm += 1
+        ids = {emp[0] for emp in employees}
+        mp = len(ids & self.employee_filter.missing_ids('stanowisko'))
+        md = len(ids & self.employee_filter.missing_ids('wydzial'))
+        mm = len(ids & self.employee_filter.missing_ids('maszyna'))
         return (f"• Bez stanowiska: {mp}\n"
                 f"• Bez wydziału: {md}\n"
                 f"• Bez maszyny: {mm}")
 
     # ---------------- OBSADA + LOGI SZCZEGÓŁOWE ----------------
     def safe_move_employee(self, emp_id, new_wydzial=None, new_zmiana=None, new_stanowisko=None):
-        old_row = self._get_emp_row(emp_id)
-        old_w, old_z, old_s = (old_row[4] if old_row else None,
-                               old_row[5] if old_row else None,
-                               old_row[3] if old_row else None)
-
+        # Historię przeniesienia zapisuje move_employee (jeden wpis z id pracownika)
         if not new_zmiana or (new_zmiana and "Wolne" in new_zmiana):
             result = self.emp_manager.move_employee(emp_id, new_wydzial, new_zmiana, new_stanowisko)
         else:
             target_wydzial = new_wydzial if new_wydzial else \
-                self.emp_manager.db.fetch_one("SELECT wydzial FROM employees WHERE id=?", (emp_id,))[0]
+                self.emp_manager.get_employee(int(emp_id))[4]
 
-            current_count = len(self.emp_manager.db.fetch_all(
-                "SELECT id FROM employees WHERE wydzial=? AND zmiana=? AND status='W Pracy'",
-                (target_wydzial, new_zmiana)
-            ))
+            current_count = self.emp_manager.get_staffing_info(target_wydzial, new_zmiana)['current']
             predicted_count = current_count + 1
             check = self.emp_manager.check_staffing_overflow(target_wydzial, new_zmiana, predicted_count)
             policy = self.emp_manager.get_overflow_policy()
@@ -1187,24 +1089,60 @@ class MainWindow(tk.Tk):
                     return False
 
             result = self.emp_manager.move_employee(emp_id, new_wydzial, new_zmiana, new_stanowisko)
-
-        if result:
-            if new_wydzial is not None:
-                self._log_field_change(emp_id, "Wydział", old_w, new_wydzial)
-            if new_zmiana is not None:
-                self._log_field_change(emp_id, "Zmiana", old_z, new_zmiana)
-            if new_stanowisko is not None:
-                self._log_field_change(emp_id, "Stanowisko", old_s, new_stanowisko)
-
-            self.refresh_employee_list()
-            self.apply_filters()
         return result
 
     def safe_bulk_move(self, emp_ids, new_wydzial=None, new_zmiana=None, new_stanowisko=None):
-        success_count = 0
-        for emp_id in emp_ids:
-            if self.safe_move_employee(emp_id, new_wydzial, new_zmiana, new_stanowisko):
-                success_count += 1
+        """Przenosi paczkę pracowników: jedna ocena obsady, jedna decyzja, jedna transakcja i jedno odświeżenie"""
+        plan = self.emp_manager.plan_bulk_move(emp_ids, new_wydzial, new_zmiana, new_stanowisko)
+        policy = plan['policy']
+        to_move = plan['fits'] + plan['overflow']
+        adjust_cells = ()
+
+        if plan['overflow']:
+            cells_text = "\n".join(
+                f"• {w}, {z}: wymagane {c['required']}, obecnie {c['current']}, "
+                f"wchodzi {c['incoming']} (+{c['overflow']} ponad obsadę)"
+                for (w, z), c in plan['cells'].items() if c['overflow']
+            )
+            if policy == "warning":
+                response = messagebox.askyesnocancel(
+                    "⚠️ Przekroczenie obsady",
+                    f"Przeniesienie przekroczy wymaganą obsadę:\n{cells_text}\n\n"
+                    f"Tak – przenieś wszystkich ({len(to_move)})\n"
+                    f"Nie – przenieś tylko mieszczących się w obsadzie ({len(plan['fits'])})\n"
+                    f"Anuluj – nie przenoś nikogo"
+                )
+                if response is None:
+                    return 0
+                if not response:
+                    to_move = plan['fits']
+            elif policy == "block":
+                if not messagebox.askokcancel(
+                    "Blokada",
+                    f"Polityka przekroczeń obsady blokuje {len(plan['overflow'])} przeniesień:\n{cells_text}\n\n"
+                    f"Przenieść pozostałych ({len(plan['fits'])})?"
+                ):
+                    return 0
+                to_move = plan['fits']
+            elif policy == "auto_adjust":
+                adjust_cells = [cell for cell, c in plan['cells'].items() if c['overflow']]
+
+        # Kolejność zaznaczenia zachowana także po odfiltrowaniu zablokowanych
+        selected = set(to_move)
+        to_move = [emp_id for emp_id in dict.fromkeys(int(i) for i in emp_ids) if emp_id in selected]
+        if not to_move:
+            messagebox.showinfo("Brak zmian", "Żaden pracownik nie został przeniesiony.")
+            return 0
+
+        outcomes, adjusted = self.emp_manager.apply_bulk_move(
+            to_move, new_wydzial, new_zmiana, new_stanowisko, adjust_cells)
+        success_count = sum(1 for o in outcomes.values() if o in (BULK_UPDATED, BULK_UNCHANGED))
+
+        message = f"Przeniesiono {success_count}/{len(emp_ids)} pracowników."
+        if adjusted:
+            message += "\n\nDostosowano obsadę poprzez przeniesienie:\n" + \
+                       "\n".join(f"• {m['name']} → {m['to_shift']}" for m in adjusted)
+        messagebox.showinfo("Sukces", message)
         return success_count
 
     def move_employee_action(self, emp_id, new_wydzial=None, new_zmiana=None, new_stanowisko=None):
@@ -1214,23 +1152,15 @@ class MainWindow(tk.Tk):
             messagebox.showerror("Błąd", "Nie udało się przenieść pracownika.")
 
     def change_status_action(self, emp_id, new_status):
-        old_row = self._get_emp_row(emp_id)
-        old_status = old_row[6] if old_row else None
         if self.emp_manager.update_employee_status(emp_id, new_status):
-            self._log_field_change(emp_id, "Status", old_status, new_status)
             messagebox.showinfo("Sukces", f"Status zmieniony na '{new_status}' i historia zapisana.")
-            self.refresh_employee_list()
-            self.apply_filters()
         else:
             messagebox.showerror("Błąd", "Nie udało się zmienić statusu.")
 
     def delete_employee_action(self, emp_id):
         if messagebox.askyesno("Potwierdzenie", "Czy na pewno chcesz usunąć tego pracownika?"):
             if self.emp_manager.delete_employee(emp_id):
-                self._log_history_emp("Usunięcie pracownika", "Usunięto pracownika z bazy", emp_id)
                 messagebox.showinfo("Sukces", "Pracownik usunięty.")
-                self.refresh_employee_list()
-                self.apply_filters()
             else:
                 messagebox.showerror("Błąd", "Nie udało się usunąć pracownika.")
 
@@ -1238,8 +1168,6 @@ class MainWindow(tk.Tk):
     def open_add_employee_dialog(self):
         dialog = EmployeeDialog(self, self.emp_manager)
         self.wait_window(dialog)
-        self.refresh_employee_list()
-        self.apply_filters()
 
     def show_summary(self):
         SummaryWindow(self, self.emp_manager)
@@ -1258,18 +1186,55 @@ class MainWindow(tk.Tk):
 
     # ---------------- BACKUP / IMPORT / EKSPORT ----------------
     def create_backup(self):
-        backup_file = self.db_manager.backup_database()
-        if backup_file:
-            messagebox.showinfo("Backup", f"Utworzono backup bazy danych:\n{backup_file}")
-        else:
-            messagebox.showerror("Błąd", "Nie udało się utworzyć backupu.")
+        # Backup działa w osobnym wątku na własnych połączeniach – UI i główne połączenie pozostają dostępne
+        if getattr(self, '_backup_thread', None) and self._backup_thread.is_alive():
+            messagebox.showinfo("Backup", "Tworzenie backupu jest już w toku.")
+            return
+
+        config = self.db_manager.get_backup_config()
+        state = {'done': 0, 'total': 0, 'file': None, 'error': None}
+
+        def on_progress(done, total):
+            state['done'], state['total'] = done, total
+
+        def worker():
+            try:
+                state['file'] = self.db_manager.run_backup(progress=on_progress, **config)
+            except Exception as e:
+                state['error'] = e
+
+        progress_win = tk.Toplevel(self)
+        progress_win.title("Backup bazy danych")
+        progress_win.transient(self)
+        progress_win.resizable(False, False)
+        tk.Label(progress_win, text="Tworzenie kopii zapasowej bazy danych...").pack(padx=20, pady=(15, 5))
+        progress_bar = ttk.Progressbar(progress_win, length=280, mode='determinate', maximum=100)
+        progress_bar.pack(padx=20, pady=(0, 15))
+
+        self._backup_thread = threading.Thread(target=worker, name="hr-backup")
+        self._backup_thread.start()
+
+        def poll_backup():
+            if self._backup_thread.is_alive():
+                if state['total'] and progress_win.winfo_exists():
+                    progress_bar['value'] = 100 * state['done'] / state['total']
+                self.after(100, poll_backup)
+                return
+            if progress_win.winfo_exists():
+                progress_win.destroy()
+            if state['file']:
+                # Wpis do historii z wątku głównego (połączenie główne nie jest współdzielone z wątkiem)
+                self.db_manager.log_backup(state['file'])
+                messagebox.showinfo("Backup", f"Utworzono backup bazy danych:\n{state['file']}")
+            else:
+                print(f"Błąd podczas backupu: {state['error']}")
+                messagebox.showerror("Błąd", f"Nie udało się utworzyć backupu.\n{state['error']}")
+
+        self.after(100, poll_backup)
 
     def export_to_excel(self):
         try:
-            vacations = self.emp_manager.get_vacations() or []
-            l4_records = self.emp_manager.get_l4_records() or []
-            vacation_map = {v[1]: f"{v[2]} - {v[3]}" for v in vacations}
-            l4_map = {l[1]: f"{l[2]} - {l[3]}" for l in l4_records}
+            vacation_map, l4_map = self.emp_manager.get_absence_maps()
 
             export_data = []
             for emp in self.all_employees_data:
@@ -1317,53 +1282,118 @@ class MainWindow(tk.Tk):
             return
         try:
             df = pd.read_excel(file_path)
-            df.columns = [c.lower().replace(' ', '_') for c in df.columns]
-            if 'imie' not in df.columns or 'nazwisko' not in df.columns:
-                messagebox.showerror("Błąd Importu", "Plik musi zawierać kolumny: imie, nazwisko")
-                return
-
-            df['stanowisko'] = df.get('stanowisko', 'Nieustawione')
-            df['wydzial'] = df.get('wydzial', 'Nieustawiony')
-            df['zmiana'] = df.get('zmiana', 'D - Wolne')
-            df['status'] = df.get('status', 'Wolne')
-            df['maszyna'] = df.get('maszyna', 'Brak')
-
-            cols = ['imie', 'nazwisko', 'stanowisko', 'wydzial', 'zmiana', 'status', 'maszyna']
-            imported_count = 0
-            for _, row in df.iterrows():
-                if pd.isna(row['imie']) or pd.isna(row['nazwisko']):
-                    continue
-                data = tuple(row[c] for c in cols)
-                self.db_manager.execute_query("""
-                    INSERT INTO employees (imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, data)
-                imported_count += 1
-
-            self.emp_manager.log_history("Import Excel", f"Zaimportowano {imported_count} pracowników z pliku {file_path}")
-            messagebox.showinfo("Sukces Importu", f"Zaimportowano {imported_count} pracowników.")
-            self.refresh_employee_list()
-            self.apply_filters()
+            result = prepare_import(df, self.emp_manager)
+        except ValueError as e:
+            messagebox.showerror("Błąd Importu", str(e))
+            return
         except Exception as e:
             messagebox.showerror("Błąd Importu", f"Błąd podczas wczytywania pliku Excel: {e}")
+            return
+
+        # Jedna decyzja dla wszystkich wierszy ponad wymaganą obsadę (według polityki przekroczeń)
+        overflow_count = int(result['overflow'].sum())
+        if overflow_count:
+            if self.emp_manager.get_overflow_policy() == "block":
+                result = reject_overflow(result)
+            else:
+                response = messagebox.askyesnocancel(
+                    "⚠️ Przekroczenie obsady",
+                    f"{overflow_count} importowanych pracowników przekroczy wymaganą obsadę.\n\n"
+                    f"Tak – zaimportuj wszystkich\n"
+                    f"Nie – pomiń wiersze ponad obsadę\n"
+                    f"Anuluj – przerwij import"
+                )
+                if response is None:
+                    return
+                if not response:
+                    result = reject_overflow(result)
+
+        try:
+            imported_count = self.emp_manager.import_employees(to_records(result['rows']), file_path)
+        except Exception as e:
+            messagebox.showerror("Błąd Importu", f"Błąd podczas zapisu pracowników: {e}")
+            return
+
+        rejected = result['rejected']
+        message = f"Zaimportowano {imported_count} pracowników."
+        if len(rejected):
+            message += f"\nOdrzucono {len(rejected)} wierszy."
+        messagebox.showinfo("Sukces Importu", message)
+        if len(rejected) and messagebox.askyesno("Raport odrzuceń", "Czy zapisać raport odrzuconych wierszy?"):
+            self.save_import_report(rejected)
+
+    def save_import_report(self, rejected):
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")],
+            title="Zapisz raport odrzuceń"
+        )
+        if not file_path:
+            return
+        try:
+            report = rejected.rename(columns={'wiersz': 'Wiersz', 'imie': 'Imię', 'nazwisko': 'Nazwisko',
+                                              'powod': 'Powód odrzucenia'})
+            with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
+                report.to_excel(writer, sheet_name='Odrzucone', index=False)
+            messagebox.showinfo("Sukces", f"Raport zapisano do:\n{file_path}")
+        except Exception as e:
+            messagebox.showerror("Błąd", f"Błąd zapisu raportu: {e}")
 
     # ---------------- ALERTY / STATUS / DASHBOARD ----------------
     def check_alerts_periodically(self):
         try:
-            alerts = self.emp_manager.check_staffing_alerts() or []
-            if alerts:
-                alert_text = "🚨 ALERT - Braki kadrowe:\n\n"
-                for alert in alerts:
-                    alert_text += f"• {alert['wydzial']} - {alert['zmiana']}: brakuje {alert['brakuje']} osób\n"
-                if not hasattr(self, '_last_alert_time') or \
-                        (datetime.now() - getattr(self, '_last_alert_time', datetime.now())).total_seconds() > 3600:
-                    messagebox.showwarning("Alert Kadrowy", alert_text)
-                    self._last_alert_time = datetime.now()
+            self.emp_manager.verify_staffing_counters()
+            # Nieobecności dodane na innych stanowiskach pojawią się najpóźniej przy tym sprawdzeniu
+            self.emp_manager.absence_index.reload()
+            # Przeniesienie starych wpisów historii do archiwum (najwyżej raz dziennie, w tle)
+            self.start_history_archive()
+            self.refresh_staffing_alerts()
             self.after(300000, self.check_alerts_periodically)
         except Exception as e:
             print(f"Błąd sprawdzania alertów: {e}")
             self.after(300000, self.check_alerts_periodically)
 
+    def start_history_archive(self):
+        # Archiwizacja działa w osobnym wątku na własnym połączeniu – UI nie czeka na przenoszenie wpisów
+        if getattr(self, '_archive_thread', None) and self._archive_thread.is_alive():
+            return
+        if not self.emp_manager.history_archive_enabled():
+            return
+        state = {}
+
+        def worker():
+            state['moved'] = self.emp_manager.archive_history()
+
+        self._archive_thread = threading.Thread(target=worker, name="hr-history-archive", daemon=True)
+        self._archive_thread.start()
+
+        def poll_archive():
+            if self._archive_thread.is_alive():
+                self.after(500, poll_archive)
+                return
+            self.emp_manager.log_history_archive(state.get('moved'))
+
+        self.after(500, poll_archive)
+
+    def refresh_staffing_alerts(self):
+        """Przelicza braki kadrowe; ostrzeżenie pokazywane najwyżej raz na godzinę"""
+        alerts = self.emp_manager.check_staffing_alerts() or []
+        self.staffing_alerts = alerts
+        if alerts:
+            alert_text = "🚨 ALERT - Braki kadrowe:\n\n"
+            for alert in alerts:
+                alert_text += f"• {alert['wydzial']} - {alert['zmiana']}: brakuje {alert['brakuje']} osób\n"
+            if not hasattr(self, '_last_alert_time') or \
+                    (datetime.now() - getattr(self, '_last_alert_time', datetime.now())).total_seconds() > 3600:
+                messagebox.showwarning("Alert Kadrowy", alert_text)
+                self._last_alert_time = datetime.now()
+
+    def flush_history_periodically(self):
+        try:
+            self.emp_manager.flush_history()
+        except Exception as e:
+            print(f"Błąd zapisu historii: {e}")
+        self.after(self.emp_manager.history_queue.flush_ms, self.flush_history_periodically)
+
     def update_status_bar(self):
         pass
 
@@ -1373,6 +1403,8 @@ class MainWindow(tk.Tk):
     # ---------------- WYLOGOWANIE / ZAMKNIĘCIE ----------------
     def logout(self):
         if messagebox.askyesno("Wylogowanie", "Czy na pewno chcesz się wylogować?"):
+            self.emp_manager.flush_history()
+            self.emp_manager.employee_store.unsubscribe(self.on_employee_changes)
             self.current_user = None
             self.emp_manager.set_current_user(None)
             self._app_initialized = False  # pozwól ponownie zbudować UI po zalogowaniu
@@ -1386,7 +1418,8 @@ class MainWindow(tk.Tk):
     def on_closing(self):
         if messagebox.askokcancel("Wyjście", "Czy na pewno chcesz zamknąć aplikację?"):
             try:
-                self.db_manager.conn.close()
+                self.emp_manager.flush_history()
+                self.db_manager.close()
             except Exception:
                 pass
             self.destroy()
@@ -62,7 +62,6 @@ class MoveDialog(tk.Toplevel):
 
         if self.emp_manager.move_employee(self.emp_id, new_wydzial, new_zmiana, new_stanowisko):
             messagebox.showinfo("Sukces", f"Pracownik {self.emp_name} został przeniesiony.")
-            self.master.refresh_employee_list()
             self.destroy()
         else:
             messagebox.showerror("Błąd", "Nie udało się przenieść pracownika.")
\ No newline at end of file
@@ -0,0 +1,51 @@
+# Tabele danych słownikowych trzymanych w pamięci (rewizje w data_revisions)
+REFERENCE_TABLES = ('settings', 'shifts', 'statuses', 'required_staff', 'departments', 'positions', 'machines')
+
+
+class ReferenceCache:
+    """Dane słownikowe w pamięci: ustawienia, słowniki wydziałów/stanowisk/maszyn, zmiany, statusy i wymagana obsada.
+
+    Każdy wpis pamięta wersję swojej tabeli. Zapis przez EmployeeManagement podbija wersję
+    (invalidate), a zmiany z innych stanowisk wykrywa check_revisions() na podstawie data_revisions.
+    Dane odczytane w transakcji po unieważnieniu nie są zapamiętywane – wycofanie transakcji
+    nie zostawia w pamięci niezatwierdzonych wartości.
+    """
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self.versions = dict.fromkeys(REFERENCE_TABLES, 0)
+        self.entries = {}      # klucz -> (wersja tabeli, wartość)
+        self._pending = set()  # tabele unieważnione w otwartej transakcji
+        self.revisions = self.db.get_data_revisions(REFERENCE_TABLES)
+
+    def get(self, table, key, loader):
+        """Zwraca wartość z pamięci albo wczytuje ją funkcją loader() (wyjątki loadera nie są przechwytywane)"""
+        version = self.versions[table]
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        value = loader()
+        if table in self._pending:
+            if self.db.in_transaction():
+                return value
+            self._pending.discard(table)
+        self.entries[key] = (version, value)
+        return value
+
+    def invalidate(self, *tables):
+        """Unieważnia dane podanych tabel (bez argumentów – wszystkich)"""
+        tables = tables or REFERENCE_TABLES
+        for table in tables:
+            self.versions[table] += 1
+        if self.db.in_transaction():
+            self._pending.update(tables)
+
+    def check_revisions(self):
+        """Unieważnia dane tabel zmienionych od ostatniego sprawdzenia; zwraca listę tych tabel"""
+        revisions = self.db.get_data_revisions(REFERENCE_TABLES)
+        changed = [table for table in REFERENCE_TABLES if revisions.get(table) != self.revisions.get(table)]
+        self.revisions = revisions
+        if changed:
+            self.invalidate(*changed)
+        return changed
@@ -46,6 +46,7 @@ class SettingsWindow(tk.Toplevel):
         self.notebook = ttk.Notebook(self)
         self.notebook.pack(expand=True, fill="both", padx=10, pady=8)
         self.notebook.enable_traversal()
+        self.required_grid_window = None
 
         # Zakładki
         self.create_general_settings_tab()
@@ -828,34 +829,32 @@ class SettingsWindow(tk.Toplevel):
                    command=self.save_required_staff, style='Accent.TButton').pack(side='left', padx=6)
         ttk.Button(btn, text="Wyczyść wszystkie",
                    command=self.clear_all_required_staff).pack(side='left', padx=6)
+        ttk.Button(btn, text="Edytuj w siatce",
+                   command=self.open_required_staff_grid).pack(side='left', padx=6)
 
         self.required_staff_tree.bind('<<TreeviewSelect>>', self.load_required_staff_to_entries)
 
+    def _load_required_staff_grid(self):
+        try:
+            return self.emp_manager.get_required_staff_grid()
+        except Exception as e:
+            print(f"Błąd pobierania wymaganej obsady: {e}")
+            return [], [], {}
+
     def apply_required_staff_filter(self, event=None):
         for i in self.required_staff_tree.get_children():
             self.required_staff_tree.delete(i)
-        try:
-            wydzialy = (self.emp_manager.get_setting('wydzialy') or [])
-        except Exception:
-            wydzialy = []
-        try:
-            shifts = [s[0] for s in (self.emp_manager.get_shifts_config() or [])]
-        except Exception:
-            shifts = []
+        wydzialy, shifts, counts = self._load_required_staff_grid()
 
         fw = self.filter_wydzial_var.get()
         fz = self.filter_zmiana_var.get()
         for w in wydzialy:
+            if fw and w != fw:
+                continue
             for z in shifts:
-                if fw and w != fw:
-                    continue
                 if fz and z != fz:
                     continue
-                try:
-                    count = self.emp_manager.get_required_staff_by_wydzial_shift(w, z)
-                except Exception:
-                    count = 0
-                self.required_staff_tree.insert("", tk.END, values=(w, z, count))
+                self.required_staff_tree.insert("", tk.END, values=(w, z, counts.get((w, z), 0)))
 
     def clear_required_staff_filters(self):
         self.filter_wydzial_var.set('')
@@ -863,23 +862,7 @@ class SettingsWindow(tk.Toplevel):
         self.refresh_required_staff_list()
 
     def refresh_required_staff_list(self):
-        for i in self.required_staff_tree.get_children():
-            self.required_staff_tree.delete(i)
-        try:
-            wydzialy = (self.emp_manager.get_setting('wydzialy') or [])
-        except Exception:
-            wydzialy = []
-        try:
-            shifts = [s[0] for s in (self.emp_manager.get_shifts_config() or [])]
-        except Exception:
-            shifts = []
-        for w in wydzialy:
-            for z in shifts:
-                try:
-                    count = self.emp_manager.get_required_staff_by_wydzial_shift(w, z)
-                except Exception:
-                    count = 0
-                self.required_staff_tree.insert("", tk.END, values=(w, z, count))
+        self.apply_required_staff_filter()
 
     def load_required_staff_to_entries(self, event):
         sel = self.required_staff_tree.selection()
@@ -918,22 +901,26 @@ class SettingsWindow(tk.Toplevel):
         if not messagebox.askyesno("Potwierdzenie", "Wyczyścić wszystkie ustawienia wymaganej obsady?"):
             return
         try:
-            wydzialy = (self.emp_manager.get_setting('wydzialy') or [])
-        except Exception:
-            wydzialy = []
-        try:
-            shifts = [s[0] for s in (self.emp_manager.get_shifts_config() or [])]
-        except Exception:
-            shifts = []
-        for w in wydzialy:
-            for z in shifts:
-                try:
-                    self.emp_manager.save_required_staff(w, z, 0)
-                except Exception:
-                    pass
+            self.emp_manager.clear_required_staff()
+        except Exception as e:
+            messagebox.showerror("Błąd", f"Nie udało się wyczyścić wymaganej obsady: {e}")
+            return
         self.refresh_required_staff_list()
+        if hasattr(self.master, 'update_dashboard'):
+            self.master.update_dashboard()
         messagebox.showinfo("Sukces", "Wyczyszczono wszystkie ustawienia wymaganej obsady.")
 
+    def open_required_staff_grid(self):
+        if self.required_grid_window is not None and self.required_grid_window.winfo_exists():
+            self.required_grid_window.lift()
+            return
+        self.required_grid_window = RequiredStaffGridWindow(self, self.emp_manager, on_saved=self._on_required_grid_saved)
+
+    def _on_required_grid_saved(self):
+        self.apply_required_staff_filter()
+        if hasattr(self.master, 'update_dashboard'):
+            self.master.update_dashboard()
+
     # ------------- General settings helpers -------------
     def refresh_general_list(self, key):
         try:
@@ -960,9 +947,8 @@ class SettingsWindow(tk.Toplevel):
         if name in data:
             messagebox.showerror("Błąd", f"Wpis '{name}' już istnieje.")
             return
-        data.append(name)
         try:
-            self.emp_manager.save_setting(key, data)
+            self.emp_manager.add_setting(key, {'name': name})
         except Exception:
             pass
         self.refresh_general_list(key)
@@ -1002,16 +988,15 @@ class SettingsWindow(tk.Toplevel):
         if new_name in data:
             messagebox.showerror("Błąd", f"Wpis '{new_name}' już istnieje.")
             return
-        try:
-            data.remove(old_name)
-        except ValueError:
-            pass
-        data.append(new_name)
-        try:
-            self.emp_manager.save_setting(key, data)
-        except Exception:
-            pass
+        # Nowa nazwa trafia też do pracowników (i wymaganej obsady wydziału)
+        if not self.emp_manager.rename_setting(key, old_name, new_name):
+            if new_name in (self.emp_manager.get_setting(key) or []):
+                messagebox.showerror("Błąd", f"Wpis '{new_name}' już istnieje.")
+            else:
+                messagebox.showerror("Błąd", f"Nie udało się zmienić nazwy '{old_name}' na '{new_name}'.")
         self.refresh_general_list(key)
+        if key == 'wydzialy':
+            self.refresh_required_staff_list()
         if hasattr(self.master, 'update_dynamic_filters'):
             self.master.update_dynamic_filters()
 
@@ -1020,10 +1005,11 @@ class SettingsWindow(tk.Toplevel):
             return
         try:
             self.emp_manager.db.execute_query("DELETE FROM employees")
+            self.emp_manager.verify_staffing_counters()
             self.emp_manager.log_history("Czyszczenie Bazy", "Usunięto wszystkich pracowników.")
+            # Magazyn pracowników wykryje zmianę po rewizji i powiadomi otwarte okna
+            self.emp_manager.employee_store.sync()
             messagebox.showinfo("Sukces", "Wszyscy pracownicy zostali usunięci.")
-            if hasattr(self.master, 'refresh_employee_list'):
-                self.master.refresh_employee_list()
         except Exception as e:
             messagebox.showerror("Błąd", f"Nie udało się usunąć pracowników: {e}")
 
@@ -1188,4 +1174,130 @@ class SettingsWindow(tk.Toplevel):
             else:
                 messagebox.showerror("Import", "Brak funkcji importu w oknie głównym.")
         except Exception as e:
-            messagebox.showerror("Import", f"Błąd importu: {e}")
\ No newline at end of file
+            messagebox.showerror("Import", f"Błąd importu: {e}")
+
+
+class RequiredStaffGridWindow(tk.Toplevel):
+    """Edycja wymaganej obsady w siatce Wydział × Zmiana; zapisuje tylko zmienione komórki"""
+
+    def __init__(self, master, emp_manager: EmployeeManagement, on_saved=None):
+        super().__init__(master)
+        self.master = master
+        self.emp_manager = emp_manager
+        self.on_saved = on_saved
+        self.title("Wymagana obsada – siatka")
+        self.minsize(500, 300)
+        self.transient(master)
+        self.grab_set()
+
+        self.wydzialy, self.shifts, self.original = [], [], {}
+        self.cell_vars = {}  # (wydzial, zmiana) -> StringVar
+
+        ttk.Label(self, text="Wymagana liczba pracowników (wiersze: wydziały, kolumny: zmiany)",
+                  font=('Arial', 11, 'bold')).pack(anchor='w', padx=10, pady=(10, 6))
+
+        # Przewijana siatka pól
+        outer = ttk.Frame(self)
+        outer.pack(fill='both', expand=True, padx=10)
+        self.canvas = tk.Canvas(outer, highlightthickness=0)
+        vsb = ttk.Scrollbar(outer, orient='vertical', command=self.canvas.yview)
+        hsb = ttk.Scrollbar(outer, orient='horizontal', command=self.canvas.xview)
+        self.canvas.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        vsb.pack(side='right', fill='y')
+        hsb.pack(side='bottom', fill='x')
+        self.canvas.pack(side='left', fill='both', expand=True)
+        self.grid_frame = ttk.Frame(self.canvas)
+        self.canvas.create_window((0, 0), window=self.grid_frame, anchor='nw')
+        self.grid_frame.bind('<Configure>',
+                             lambda e: self.canvas.configure(scrollregion=self.canvas.bbox('all')))
+
+        self.status_var = tk.StringVar()
+        ttk.Label(self, textvariable=self.status_var).pack(anchor='w', padx=10, pady=(6, 0))
+
+        btn = ttk.Frame(self)
+        btn.pack(fill='x', padx=10, pady=10)
+        ttk.Button(btn, text="Zapisz zmiany", command=self.save_changes,
+                   style='Accent.TButton').pack(side='left', padx=6)
+        ttk.Button(btn, text="Cofnij zmiany", command=self.reload).pack(side='left', padx=6)
+        ttk.Button(btn, text="Zamknij", command=self.close).pack(side='right', padx=6)
+
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.reload()
+
+    def reload(self):
+        """Buduje siatkę od nowa z aktualnych danych"""
+        for child in self.grid_frame.winfo_children():
+            child.destroy()
+        try:
+            self.wydzialy, self.shifts, self.original = self.emp_manager.get_required_staff_grid()
+        except Exception as e:
+            print(f"Błąd pobierania wymaganej obsady: {e}")
+            self.wydzialy, self.shifts, self.original = [], [], {}
+        self.cell_vars = {}
+
+        ttk.Label(self.grid_frame, text="Wydział / Zmiana",
+                  font=('Arial', 10, 'bold')).grid(row=0, column=0, padx=4, pady=4, sticky='w')
+        for col, z in enumerate(self.shifts, start=1):
+            ttk.Label(self.grid_frame, text=z, font=('Arial', 10, 'bold')).grid(row=0, column=col, padx=4, pady=4)
+        for row, w in enumerate(self.wydzialy, start=1):
+            ttk.Label(self.grid_frame, text=w).grid(row=row, column=0, padx=4, pady=2, sticky='w')
+            for col, z in enumerate(self.shifts, start=1):
+                var = tk.StringVar(value=str(self.original.get((w, z), 0)))
+                var.trace_add('write', lambda *args: self.update_status())
+                ttk.Entry(self.grid_frame, textvariable=var, width=8, justify='center').grid(
+                    row=row, column=col, padx=4, pady=2)
+                self.cell_vars[(w, z)] = var
+        self.update_status()
+
+    def changed_cells(self):
+        """Zwraca ({(wydzial, zmiana): liczba} zmienionych komórek, lista błędnych komórek)"""
+        changed, invalid = {}, []
+        for key, var in self.cell_vars.items():
+            text = var.get().strip() or '0'
+            try:
+                count = int(text)
+                if count < 0:
+                    raise ValueError
+            except ValueError:
+                invalid.append(key)
+                continue
+            if count != self.original.get(key, 0):
+                changed[key] = count
+        return changed, invalid
+
+    def update_status(self):
+        changed, invalid = self.changed_cells()
+        text = f"Zmienione komórki: {len(changed)}"
+        if invalid:
+            text += f", błędne: {len(invalid)}"
+        self.status_var.set(text)
+
+    def save_changes(self):
+        changed, invalid = self.changed_cells()
+        if invalid:
+            cells = ", ".join(f"{w} / {z}" for w, z in invalid[:5])
+            messagebox.showerror("Błąd", f"Wymagana liczba musi być nieujemną liczbą całkowitą ({cells}).", parent=self)
+            return
+        if not changed:
+            messagebox.showinfo("Informacja", "Brak zmian do zapisania.", parent=self)
+            return
+        try:
+            saved = self.emp_manager.save_required_staff_many(changed)
+        except Exception as e:
+            messagebox.showerror("Błąd", f"Nie udało się zapisać wymaganej obsady: {e}", parent=self)
+            return
+        self.reload()
+        if self.on_saved:
+            self.on_saved()
+        messagebox.showinfo("Sukces", f"Zapisano wymaganą obsadę ({saved} komórek).", parent=self)
+
+    def close(self):
+        if self.changed_cells()[0] and not messagebox.askyesno(
+                "Potwierdzenie", "Porzucić niezapisane zmiany?", parent=self):
+            return
+        self.grab_release()
+        self.destroy()
+        try:
+            self.master.grab_set()
+        except Exception:
+            pass
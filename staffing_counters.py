@@ -0,0 +1,82 @@
+import os
+
+# Liczba pracowników w każdej komórce (wydzial, zmiana, status)
+STAFFING_COUNTS_SQL = """
+    SELECT wydzial, zmiana, status, COUNT(*)
+    FROM employees
+    GROUP BY wydzial, zmiana, status
+"""
+
+
+class StaffingCounters:
+    """Indeks obsady w pamięci: (wydzial, zmiana, status) -> liczba pracowników"""
+
+    # Wspólne liczniki dla całego procesu (jeden indeks na plik bazy)
+    _instances = {}
+
+    @classmethod
+    def for_db(cls, db_manager):
+        """Zwraca wspólny indeks liczników dla danej bazy danych"""
+        key = os.path.abspath(db_manager.db_name)
+        instance = cls._instances.get(key)
+        if instance is None or instance.db is not db_manager:
+            instance = cls(db_manager)
+            cls._instances[key] = instance
+        return instance
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self.counts = {}
+        self.loaded = False
+
+    def _load_from_db(self):
+        rows = self.db.fetch_all(STAFFING_COUNTS_SQL)
+        return {(wydzial, zmiana, status): count for wydzial, zmiana, status, count in rows}
+
+    def rebuild(self):
+        """Przebudowuje liczniki na podstawie bazy danych"""
+        try:
+            self.counts = self._load_from_db()
+            self.loaded = True
+        except Exception as e:
+            print(f"Błąd przebudowy liczników obsady: {e}")
+            self.counts = {}
+            self.loaded = False
+
+    def verify(self, repair=True):
+        """Porównuje liczniki z bazą; zwraca listę rozbieżności (klucz, w pamięci, w bazie)"""
+        try:
+            actual = self._load_from_db()
+        except Exception as e:
+            print(f"Błąd weryfikacji liczników obsady: {e}")
+            return []
+
+        differences = []
+        for key in set(self.counts) | set(actual):
+            cached, real = self.counts.get(key, 0), actual.get(key, 0)
+            if cached != real:
+                differences.append((key, cached, real))
+
+        if repair and (differences or not self.loaded):
+            self.counts = actual
+            self.loaded = True
+        return differences
+
+    def get(self, wydzial, zmiana, status="W Pracy"):
+        """Zwraca liczbę pracowników w komórce (odczyt O(1))"""
+        if not self.loaded:
+            self.rebuild()
+        return self.counts.get((wydzial, zmiana, status), 0)
+
+    def apply(self, old_key=None, new_key=None):
+        """Przenosi pracownika między komórkami; old_key/new_key to (wydzial, zmiana, status) lub None"""
+        if not self.loaded or old_key == new_key:
+            return
+        if old_key is not None:
+            remaining = self.counts.get(old_key, 0) - 1
+            if remaining > 0:
+                self.counts[old_key] = remaining
+            else:
+                self.counts.pop(old_key, None)
+        if new_key is not None:
+            self.counts[new_key] = self.counts.get(new_key, 0) + 1
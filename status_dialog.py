@@ -46,7 +46,6 @@ class StatusDialog(tk.Toplevel):
         new_status = self.status_var.get()
         if new_status and self.emp_manager.update_employee_status(self.emp_id, new_status):
             messagebox.showinfo("Sukces", f"Status dla {self.emp_name} został zmieniony na {new_status}.")
-            self.master.refresh_employee_list()
             self.destroy()
         else:
             messagebox.showerror("Błąd", "Nie udało się zmienić statusu.")
\ No newline at end of file
@@ -4,6 +4,13 @@ from datetime import datetime
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
+from employee_filter import EmployeeFilter
+from employee_store import EMPLOYEE_CHANGED, STORE_RELOADED
+
+# Odstęp sprawdzania rewizji danych i tabele, od których zależy podsumowanie
+# (pracowników śledzi magazyn w pamięci – zmiany przychodzą jako zdarzenia)
+REFRESH_CHECK_MS = 2000
+WATCHED_TABLES = ('vacations', 'l4_records', 'required_staff', 'shifts', 'statuses', 'settings')
 
 class SummaryWindow(tk.Toplevel):
     def __init__(self, master, emp_manager):
@@ -31,28 +38,37 @@ class SummaryWindow(tk.Toplevel):
         
         self.filtered_data = []
         self.current_filters = {}
+        self.employee_filter = EmployeeFilter()
         
         self.create_widgets()
         
-        # Automatyczne odświeżanie co 5 sekund
+        # Automatyczne odświeżanie – tylko gdy zmieniły się rewizje danych
         self.auto_refresh_id = None
         self.auto_refresh_enabled = True
+        self.data_revisions = self.emp_manager.db.get_data_revisions(WATCHED_TABLES)
         self.start_auto_refresh()
+        self.emp_manager.employee_store.subscribe(self.on_employee_changes)
 
     def start_auto_refresh(self):
         """Uruchamia automatyczne odświeżanie"""
         if self.auto_refresh_enabled:
-            self.auto_refresh_id = self.after(5000, self.auto_refresh)
+            self.auto_refresh_id = self.after(REFRESH_CHECK_MS, self.auto_refresh)
 
     def auto_refresh(self):
-        """Automatyczne odświeżanie danych"""
+        """Automatyczne odświeżanie danych (jedno małe zapytanie, pełne odświeżenie tylko po zmianie)"""
         try:
             if self.auto_refresh_enabled:
-                self.apply_filters()
-                self.auto_refresh_id = self.after(5000, self.auto_refresh)
+                # Zmiany pracowników spoza tego procesu – magazyn przeładuje dane i powiadomi okna
+                self.emp_manager.employee_store.sync()
+                revisions = self.emp_manager.db.get_data_revisions(WATCHED_TABLES)
+                if revisions != self.data_revisions:
+                    self.data_revisions = revisions
+                    self.emp_manager.reference_cache.check_revisions()
+                    self.apply_filters()
+                self.auto_refresh_id = self.after(REFRESH_CHECK_MS, self.auto_refresh)
         except Exception as e:
             print(f"Błąd automatycznego odświeżania: {e}")
-            self.auto_refresh_id = self.after(5000, self.auto_refresh)
+            self.auto_refresh_id = self.after(REFRESH_CHECK_MS, self.auto_refresh)
 
     def stop_auto_refresh(self):
         """Zatrzymuje automatyczne odświeżanie"""
@@ -343,35 +359,27 @@ class SummaryWindow(tk.Toplevel):
             'overflow_total': 0, 'coverage_percent': 0, 'shortages': [], 'overflows': []
         }
         
-        # Grupuj według wydziału i zmiany
-        groups = {}
-        for emp in self.filtered_data:
-            if emp[6] == "W Pracy":  # Tylko pracujący
-                key = (emp[4], emp[5])  # (wydzial, zmiana)
-                if key not in groups:
-                    groups[key] = 0
-                groups[key] += 1
+        # Grupy (wydział, zmiana) liczone wspólną funkcją – te same liczby co na liście głównej
+        groups = self.emp_manager.compute_staffing_groups(self.filtered_data)
         
         # Analizuj każdę grupę
-        for (wydzial, zmiana), count in groups.items():
-            required = self.emp_manager.get_required_staff_by_wydzial_shift(wydzial, zmiana)
+        for (wydzial, zmiana), group in groups.items():
+            required, count = group['required'], group['current']
             if required > 0:
                 staffing_stats['required_total'] += required
                 staffing_stats['current_total'] += count
                 
-                if count < required:
-                    shortage = required - count
-                    staffing_stats['shortage_total'] += shortage
+                if group['shortage']:
+                    staffing_stats['shortage_total'] += group['shortage']
                     staffing_stats['shortages'].append({
                         'wydzial': wydzial, 'zmiana': zmiana,
-                        'required': required, 'current': count, 'shortage': shortage
+                        'required': required, 'current': count, 'shortage': group['shortage']
                     })
-                elif count > required:
-                    overflow = count - required
-                    staffing_stats['overflow_total'] += overflow
+                elif group['overflow']:
+                    staffing_stats['overflow_total'] += group['overflow']
                     staffing_stats['overflows'].append({
                         'wydzial': wydzial, 'zmiana': zmiana,
-                        'required': required, 'current': count, 'overflow': overflow
+                        'required': required, 'current': count, 'overflow': group['overflow']
                     })
         
         # Oblicz procent pokrycia
@@ -397,33 +405,11 @@ class SummaryWindow(tk.Toplevel):
         
         self.current_filters = {k: v for k, v in filters.items() if v}
         
-        # Filtruj dane
-        all_employees = self.emp_manager.get_all_employees()
-        self.filtered_data = []
-        
-        for emp in all_employees:
-            matches = True
-            
-            for field, value in filters.items():
-                if value:  # Jeśli filtr jest ustawiony
-                    if field == 'wydzial' and emp[4] != value:
-                        matches = False
-                        break
-                    elif field == 'zmiana' and emp[5] != value:
-                        matches = False
-                        break
-                    elif field == 'status' and emp[6] != value:
-                        matches = False
-                        break
-                    elif field == 'stanowisko' and emp[3] != value:
-                        matches = False
-                        break
-                    elif field == 'maszyna' and emp[7] != value:
-                        matches = False
-                        break
-            
-            if matches:
-                self.filtered_data.append(emp)
+        # Filtruj dane (indeksy przebudowywane tylko po zmianie danych)
+        all_employees = self.emp_manager.employee_store.all()
+        if not self.employee_filter.matches_data(all_employees):
+            self.employee_filter.rebuild(all_employees)
+        self.filtered_data = self.employee_filter.query(**filters)
         
         # Aktualizuj widok
         self.update_display()
@@ -469,14 +455,44 @@ class SummaryWindow(tk.Toplevel):
         status_colors = {name: color for name, color in self.emp_manager.get_statuses_config()}
         
         for emp in self.filtered_data:
-            emp_id, imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna = emp
-            values = (emp_id, imie, nazwisko, stanowisko, wydzial, zmiana, status, maszyna)
-            
-            # Kolorowanie wierszy według statusu
-            color_tag = status.replace(' ', '_')
-            self.employees_tree.tag_configure(color_tag, background=status_colors.get(status, 'white'))
-            
-            self.employees_tree.insert("", tk.END, values=values, tags=(color_tag,))
+            values, tags = self.employee_row(emp, status_colors)
+            self.employees_tree.insert("", tk.END, iid=str(emp[0]), values=values, tags=tags)
+
+    def employee_row(self, emp, status_colors):
+        """Wartości i tagi wiersza listy (kolorowanie wierszy według statusu)"""
+        status = emp[6]
+        color_tag = (status or '').replace(' ', '_')
+        self.employees_tree.tag_configure(color_tag, background=status_colors.get(status, 'white'))
+        return tuple(emp), (color_tag,)
+
+    def on_employee_changes(self, changes):
+        """Subskrybent magazynu pracowników – zmienione wiersze są aktualizowane w miejscu"""
+        try:
+            all_employees = self.emp_manager.employee_store.all()
+            if any(change.kind == STORE_RELOADED for change in changes):
+                self.employee_filter.rebuild(all_employees)
+            else:
+                self.employee_filter.apply_changes(changes, all_employees)
+            previous_ids = {emp[0] for emp in self.filtered_data}
+            self.filtered_data = self.employee_filter.query(**self.current_filters)
+            current_ids = {emp[0] for emp in self.filtered_data}
+
+            # Wiersz zostaje na liście i na tym samym miejscu (bez zmiany nazwiska) – wystarczy go podmienić
+            in_place = all(change.kind == EMPLOYEE_CHANGED and change.emp_id in previous_ids
+                           and change.emp_id in current_ids and change.old[1:3] == change.new[1:3]
+                           for change in changes)
+            if not in_place:
+                self.update_display()
+                return
+
+            status_colors = {name: color for name, color in self.emp_manager.get_statuses_config()}
+            for change in changes:
+                values, tags = self.employee_row(change.new, status_colors)
+                self.employees_tree.item(str(change.emp_id), values=values, tags=tags)
+            if self.current_filters:
+                self.create_tiles_section()
+        except Exception as e:
+            print(f"Błąd odświeżania podsumowania po zmianie pracowników: {e}")
 
     def on_selection_change(self, event):
         """Aktualizuje informacje o zaznaczeniu"""
@@ -488,13 +504,11 @@ class SummaryWindow(tk.Toplevel):
         if selected_item:
             values = self.employees_tree.item(selected_item[0], 'values')
             emp_id = values[0]
-            full_data = self.emp_manager.db.fetch_one("SELECT * FROM employees WHERE id=?", (emp_id,))
+            full_data = self.emp_manager.get_employee(int(emp_id))
             if full_data:
                 from employee_dialog import EmployeeDialog
-                dialog = EmployeeDialog(self, self.emp_manager, employee_data=full_data)
-                # Po zamknięciu dialogu odśwież dane
-                self.wait_window(dialog)
-                self.apply_filters()
+                # Zapis w dialogu odświeży listę przez magazyn pracowników
+                EmployeeDialog(self, self.emp_manager, employee_data=full_data)
 
     def show_context_menu(self, event):
         """Pokazuje menu kontekstowe dla pracownika"""
@@ -504,8 +518,8 @@ class SummaryWindow(tk.Toplevel):
             
         self.employees_tree.selection_set(item_id)
         values = self.employees_tree.item(item_id, 'values')
-        emp_id = values[0]
-        full_data = self.emp_manager.db.fetch_one("SELECT * FROM employees WHERE id=?", (emp_id,))
+        emp_id = int(values[0])
+        full_data = self.emp_manager.get_employee(emp_id)
         
         if not full_data:
             return
@@ -567,9 +581,7 @@ class SummaryWindow(tk.Toplevel):
     # Metody pomocnicze dla menu kontekstowego
     def open_employee_dialog(self, employee_data):
         from employee_dialog import EmployeeDialog
-        dialog = EmployeeDialog(self, self.emp_manager, employee_data=employee_data)
-        self.wait_window(dialog)
-        self.apply_filters()
+        EmployeeDialog(self, self.emp_manager, employee_data=employee_data)
 
     def open_vacation_dialog(self, employee_data):
         from vacation_dialog import VacationDialog
@@ -591,14 +603,12 @@ class SummaryWindow(tk.Toplevel):
         
         if success:
             messagebox.showinfo("Sukces", "Pracownik przeniesiony.")
-            self.apply_filters()
         else:
             messagebox.showerror("Błąd", "Nie udało się przenieść pracownika.")
 
     def change_status(self, emp_id, new_status):
         if self.emp_manager.update_employee_status(emp_id, new_status):
             messagebox.showinfo("Sukces", f"Status zmieniony na '{new_status}'.")
-            self.apply_filters()
         else:
             messagebox.showerror("Błąd", "Nie udało się zmienić statusu.")
 
@@ -606,7 +616,6 @@ class SummaryWindow(tk.Toplevel):
         if messagebox.askyesno("Potwierdzenie", "Czy na pewno chcesz usunąć tego pracownika?"):
             if self.emp_manager.delete_employee(emp_id):
                 messagebox.showinfo("Sukces", "Pracownik usunięty.")
-                self.apply_filters()
             else:
                 messagebox.showerror("Błąd", "Nie udało się usunąć pracownika.")
 
@@ -668,4 +677,5 @@ class SummaryWindow(tk.Toplevel):
     def destroy(self):
         """Zamyka okno i zatrzymuje automatyczne odświeżanie"""
         self.stop_auto_refresh()
+        self.emp_manager.employee_store.unsubscribe(self.on_employee_changes)
         super().destroy()
\ No newline at end of file
@@ -0,0 +1,34 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from db_manager import DBManager  # noqa: E402
+from employee_management import EmployeeManagement  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Nowa baza w katalogu tymczasowym (schemat i wszystkie migracje)"""
+    manager = DBManager(str(tmp_path / "hr_test.db"))
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def shipped_db(tmp_path):
+    """Kopia bazy z repozytorium po migracjach (dane jak na stanowisku)"""
+    path = tmp_path / "hr_system.db"
+    shutil.copy(os.path.join(ROOT, "hr_system.db"), path)
+    manager = DBManager(str(path))
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def emp_manager(db):
+    return EmployeeManagement(db)
@@ -0,0 +1,33 @@
+def _add(emp_manager, imie, wydzial="Magazyn", zmiana="D - Wolne", stanowisko="Operator"):
+    result = emp_manager.add_employee(imie, "Testowy", stanowisko, wydzial, zmiana, "Wolne", "")
+    assert result['success']
+    return emp_manager.db.fetch_one("SELECT id FROM employees WHERE imie=?", (imie,))[0]
+
+
+def _move_rows(emp_manager, emp_id):
+    emp_manager.flush_history()
+    return emp_manager.db.fetch_all(
+        "SELECT field, old_value, new_value FROM history "
+        "WHERE action='Przeniesienie Pracownika' AND employee_id=? ORDER BY id", (emp_id,))
+
+
+def test_move_employee_logs_one_row_per_field(emp_manager):
+    emp_id = _add(emp_manager, "Jan")
+
+    assert emp_manager.move_employee(emp_id, new_wydzial="Produkcja", new_zmiana="A - Rano (6-14)")
+
+    assert _move_rows(emp_manager, emp_id) == [
+        ('wydzial', "Magazyn", "Produkcja"),
+        ('zmiana', "D - Wolne", "A - Rano (6-14)"),
+        ('status', "Wolne", "W Pracy"),
+    ]
+
+
+def test_bulk_move_logs_one_row_per_field(emp_manager):
+    first = _add(emp_manager, "Anna")
+    second = _add(emp_manager, "Ewa", stanowisko="Brygadzista")
+
+    emp_manager.bulk_move([first, second], new_stanowisko="Brygadzista")
+
+    assert _move_rows(emp_manager, first) == [('stanowisko', "Operator", "Brygadzista")]
+    assert _move_rows(emp_manager, second) == []
@@ -0,0 +1,46 @@
+import sqlite3
+
+from employee_store import STORE_RELOADED
+
+
+def _add(emp_manager, imie):
+    assert emp_manager.add_employee(imie, "Testowy", "Operator", "Magazyn", "D - Wolne", "Wolne", "")['success']
+    return emp_manager.db.fetch_one("SELECT id FROM employees WHERE imie=?", (imie,))[0]
+
+
+def _reloads(store):
+    events = []
+    store.subscribe(lambda changes: events.extend(c.kind for c in changes))
+    return events
+
+
+def test_local_write_refreshes_only_changed_rows(emp_manager):
+    emp_id = _add(emp_manager, "Jan")
+    store = emp_manager.employee_store
+    store.all()
+    events = _reloads(store)
+
+    assert emp_manager.update_employee_status(emp_id, "Urlop")
+
+    assert store.get(emp_id)[6] == "Urlop"
+    assert STORE_RELOADED not in events
+    assert not store.sync()
+
+
+def test_external_write_is_not_hidden_by_local_refresh(emp_manager):
+    external_id = _add(emp_manager, "Anna")
+    local_id = _add(emp_manager, "Ewa")
+    store = emp_manager.employee_store
+    store.all()
+    events = _reloads(store)
+
+    other = sqlite3.connect(emp_manager.db.db_name)
+    other.execute("UPDATE employees SET nazwisko='Zmieniona' WHERE id=?", (external_id,))
+    other.commit()
+    other.close()
+    assert emp_manager.update_employee_status(local_id, "Urlop")
+
+    assert store.get(external_id)[2] == "Zmieniona"
+    assert store.get(local_id)[6] == "Urlop"
+    assert STORE_RELOADED in events
+    assert not store.sync()
@@ -0,0 +1,16 @@
+import pytest
+
+from db_manager import check_query_plans
+from employee_management import EmployeeManagement
+
+
+@pytest.mark.parametrize("database", ["db", "shipped_db"])
+def test_hot_queries_use_indexes(database, request):
+    db = request.getfixturevalue(database)
+    assert check_query_plans(db, EmployeeManagement(db).hot_queries()) == []
+
+
+def test_dropped_index_is_reported(db):
+    db.execute_query("DROP INDEX idx_history_timestamp")
+    regressions = check_query_plans(db, EmployeeManagement(db).hot_queries())
+    assert "Historia – pierwsza strona" in [name for name, _ in regressions]
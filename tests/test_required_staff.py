@@ -0,0 +1,28 @@
+import sqlite3
+
+
+def _external_write(emp_manager, query, params=()):
+    other = sqlite3.connect(emp_manager.db.db_name)
+    other.execute(query, params)
+    other.commit()
+    other.close()
+
+
+def test_save_many_compares_with_database_not_cache(emp_manager):
+    emp_manager.get_required_staff_map()
+    _external_write(emp_manager, "INSERT OR REPLACE INTO required_staff (wydzial, zmiana, required_count) "
+                                 "VALUES ('Magazyn', 'A - Rano (6-14)', 5)")
+
+    # Mapa w pamięci ma jeszcze 0 dla tej komórki – zapis 0 musi jednak nadpisać 5 z bazy
+    assert emp_manager.save_required_staff_many({('Magazyn', 'A - Rano (6-14)'): 0}) == 1
+    assert emp_manager.get_required_staff_map().get(('Magazyn', 'A - Rano (6-14)'), 0) == 0
+
+
+def test_clear_counts_only_nonzero_cells(emp_manager):
+    emp_manager.save_required_staff_many({('Magazyn', 'A - Rano (6-14)'): 3, ('Magazyn', 'B - Południe (14-22)'): 2})
+    _external_write(emp_manager, "INSERT INTO required_staff (wydzial, zmiana, required_count) "
+                                 "VALUES ('Magazyn', 'C - Noc (22-6)', 0)")
+
+    assert emp_manager.clear_required_staff() == 2
+    assert emp_manager.db.fetch_one("SELECT COUNT(*) FROM required_staff")[0] == 0
+    assert emp_manager.clear_required_staff() == 0
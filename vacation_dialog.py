@@ -195,14 +195,8 @@ class VacationDialog(tk.Toplevel):
             total_days = self.calculate_working_days(start, end)
             vacation_type = self.vacation_type.get()
             
-            # Zapisz do bazy danych
-            self.emp_manager.db.execute_query("""
-                INSERT INTO vacations (employee_id, start_date, end_date, total_days, vacation_type)
-                VALUES (?, ?, ?, ?, ?)
-            """, (self.emp_id, start.date(), end.date(), total_days, vacation_type))
-            
-            # Zmień status pracownika na "Urlop"
-            self.emp_manager.update_employee_status(self.emp_id, "Urlop")
+            # Zapisz urlop i zmień status pracownika na "Urlop"
+            self.emp_manager.add_vacation(self.emp_id, start.date(), end.date(), total_days, vacation_type)
             
             messagebox.showinfo("Sukces", 
                               f"Urlop zaplanowany pomyślnie!\n\n"
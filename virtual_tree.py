@@ -0,0 +1,302 @@
+import tkinter as tk
+from tkinter import ttk
+from tkinter import font as tkfont
+
+
+class VirtualTreeview(ttk.Frame):
+    """Lista na bazie ttk.Treeview z renderowaniem różnicowym i trybem wirtualnym.
+
+    Pełne dane są trzymane w Pythonie jako lista (iid, wartości, tagi). Do `threshold`
+    wierszy wszystkie są elementami Treeview; powyżej tej liczby w drzewie istnieją tylko
+    wiersze widoczne w oknie (plus mały bufor), a przewijaniem steruje własny pasek.
+    Zaznaczenie jest pamiętane jako zbiór iid, więc obejmuje także wiersze poza oknem.
+
+    Duża liczba nowych wierszy jest wstawiana porcjami (chunk_size) z oddaniem sterowania
+    pętli zdarzeń Tk; kolejne odświeżenie przerywa niedokończone wstawianie.
+
+    Uwaga: własne wiązania <<TreeviewSelect>> i <Configure> należy dodawać z add='+'.
+    """
+
+    def __init__(self, master, columns, threshold=2000, buffer_rows=5, chunk_size=300, **tree_kw):
+        super().__init__(master)
+        self.threshold = threshold
+        self.buffer_rows = buffer_rows
+        self.chunk_size = chunk_size
+
+        self.tree = ttk.Treeview(self, columns=columns, **tree_kw)
+        self.v_scroll = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.h_scroll = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(yscrollcommand=self._on_tree_yscroll, xscrollcommand=self.h_scroll.set)
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.v_scroll.grid(row=0, column=1, sticky="ns")
+        self.h_scroll.grid(row=1, column=0, sticky="ew")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.rows = []          # [(iid, wartości, tagi)] w kolejności wyświetlania
+        self.index = {}         # iid -> pozycja w self.rows
+        self.selected = set()   # zaznaczone iid (również poza oknem)
+        self._anchor = None     # początek zakresu zaznaczanego Shift+klawiszami w trybie wirtualnym
+        self.virtual = False
+        self.first = 0          # pierwszy wiersz okna w trybie wirtualnym
+        self._rendered = {}     # iid -> (wartości, tagi) obecnie w drzewie
+        self._tag_colors = {}
+        self._sort = None       # (funkcja klucza na wartościach, malejąco)
+        self._render_token = 0  # numer bieżącego renderowania (starsze porcje są porzucane)
+        self._render_job = None
+
+        self.tree.bind('<<TreeviewSelect>>', self._on_tree_select, add='+')
+        self.tree.bind('<Configure>', lambda e: self._render(), add='+')
+        self.tree.bind('<Control-a>', self._on_select_all)
+        self.tree.bind('<Control-A>', self._on_select_all)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', self._on_mousewheel)
+        self.tree.bind('<Button-5>', self._on_mousewheel)
+        self.tree.bind('<Button-1>', self._on_click, add='+')
+        # Osobne wiązania z Shift – samo <Up> przechwytywałoby też Shift+Up i zwijało zaznaczenie
+        for key, step in (('Up', -1), ('Down', 1), ('Prior', 'page_up'), ('Next', 'page_down'),
+                          ('Home', 'home'), ('End', 'end')):
+            self.tree.bind(f'<{key}>', lambda e, s=step: self._on_key_nav(s))
+            self.tree.bind(f'<Shift-{key}>', lambda e, s=step: self._on_key_nav(s, extend=True))
+
+    # ---------------- DANE ----------------
+    def set_rows(self, rows):
+        """Ustawia pełną listę wierszy (iid, wartości, tagi) i odświeża widok"""
+        rows = list(rows)
+        if self._sort:
+            key, reverse = self._sort
+            rows.sort(key=lambda r: key(r[1]), reverse=reverse)
+        self.rows = rows
+        self.index = {iid: i for i, (iid, _, _) in enumerate(rows)}
+        self.selected = {iid for iid in self.selected if iid in self.index}
+        self.virtual = len(rows) > self.threshold
+        self._render()
+
+    def sort_by(self, key, reverse=False):
+        """Sortuje dane w Pythonie; kolejność jest zachowywana przy kolejnych set_rows"""
+        self._sort = (key, reverse)
+        self.set_rows(self.rows)
+
+    def configure_tags(self, tag_colors):
+        """Konfiguruje kolory tagów – tylko nowe lub zmienione"""
+        for tag, color in tag_colors.items():
+            if self._tag_colors.get(tag) != color:
+                self.tree.tag_configure(tag, background=color)
+                self._tag_colors[tag] = color
+
+    def iids(self):
+        return [iid for iid, _, _ in self.rows]
+
+    def exists(self, iid):
+        return iid in self.index
+
+    def values(self, iid):
+        pos = self.index.get(iid)
+        return self.rows[pos][1] if pos is not None else None
+
+    def column_values(self, column_index, limit=None):
+        rows = self.rows if limit is None else self.rows[:limit]
+        return [values[column_index] for _, values, _ in rows]
+
+    # ---------------- ZAZNACZENIE ----------------
+    def selection(self):
+        """Zaznaczone iid w kolejności wyświetlania"""
+        return tuple(sorted(self.selected, key=self.index.__getitem__))
+
+    def selection_set(self, iids):
+        self.selected = {iid for iid in iids if iid in self.index}
+        self._sync_tree_selection()
+
+    def select_all(self):
+        self.selection_set(self.index)
+        self.tree.event_generate('<<TreeviewSelect>>')
+
+    def see(self, iid):
+        pos = self.index.get(iid)
+        if pos is None:
+            return
+        if self.virtual:
+            visible = self._visible_rows()
+            if pos < self.first or pos >= self.first + visible:
+                self.first = max(0, pos - visible // 2)
+                self._render()
+        if self.tree.exists(iid):
+            self.tree.see(iid)
+
+    def _sync_tree_selection(self):
+        wanted = [iid for iid in self._rendered if iid in self.selected]
+        if set(self.tree.selection()) != set(wanted):
+            self.tree.selection_set(wanted)
+
+    def _on_tree_select(self, event):
+        # Zaznaczenie w drzewie dotyczy tylko wierszy okna – reszta zbioru zostaje bez zmian
+        self.selected = (self.selected - set(self._rendered)) | set(self.tree.selection())
+
+    def _on_click(self, event):
+        # Kliknięcie bez Shift ustawia początek zakresu dla Shift+strzałek
+        if not event.state & 0x0001:
+            iid = self.tree.identify_row(event.y)
+            if iid:
+                self._anchor = iid
+
+    def _on_select_all(self, event):
+        self.select_all()
+        return "break"
+
+    # ---------------- RENDEROWANIE ----------------
+    def _visible_rows(self):
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return 40
+        try:
+            row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 0)
+        except (tk.TclError, ValueError):
+            row_height = 0
+        if not row_height:
+            row_height = tkfont.nametofont("TkDefaultFont").metrics('linespace') + 4
+        header = tkfont.nametofont("TkHeadingFont").metrics('linespace') + 8
+        return max(1, (height - header) // row_height)
+
+    def _window(self):
+        if not self.virtual:
+            self.first = 0
+            return self.rows
+        visible = self._visible_rows()
+        self.first = max(0, min(self.first, len(self.rows) - visible))
+        return self.rows[self.first:self.first + visible + self.buffer_rows]
+
+    def _render(self):
+        """Różnicowo aktualizuje elementy drzewa do bieżącego okna danych"""
+        # Nowe renderowanie unieważnia porcje poprzedniego, które jeszcze czekają w kolejce
+        self._render_token += 1
+        if self._render_job:
+            self.after_cancel(self._render_job)
+            self._render_job = None
+
+        tree = self.tree
+        window = self._window()
+        old_rows = self._rendered
+        new_rows = {iid: (values, tags) for iid, values, tags in window}
+
+        removed = [iid for iid in old_rows if iid not in new_rows]
+        if removed:
+            tree.delete(*removed)
+
+        rendered = {}
+        pending = []
+        for iid, values, tags in window:
+            previous = old_rows.get(iid)
+            if previous is None:
+                pending.append((iid, values, tags))
+                continue
+            if previous != (values, tags):
+                tree.item(iid, values=values, tags=tags)
+            rendered[iid] = (values, tags)
+        self._rendered = rendered
+
+        order = [iid for iid, _, _ in window]
+        self._insert_chunk(pending, order, self._render_token)
+
+    def _insert_chunk(self, pending, order, token):
+        if token != self._render_token:
+            return
+        self._render_job = None
+        for iid, values, tags in pending[:self.chunk_size]:
+            self.tree.insert("", tk.END, iid=iid, values=values, tags=tags)
+            self._rendered[iid] = (values, tags)
+
+        rest = pending[self.chunk_size:]
+        if rest:
+            # Oddaj sterowanie pętli zdarzeń, resztę wstaw w kolejnym kroku
+            self._render_job = self.after(1, lambda: self._insert_chunk(rest, order, token))
+            return
+        self._finish_render(order)
+
+    def _finish_render(self, order):
+        tree = self.tree
+        if list(tree.get_children('')) != order:
+            tree.set_children('', *order)
+
+        self._sync_tree_selection()
+        if self.virtual:
+            tree.yview_moveto(0)
+            self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = len(self.rows)
+        if not total:
+            self.v_scroll.set(0, 1)
+            return
+        visible = self._visible_rows()
+        self.v_scroll.set(self.first / total, min(1.0, (self.first + visible) / total))
+
+    # ---------------- PRZEWIJANIE ----------------
+    def scroll_to(self, first):
+        self.first = max(0, int(first))
+        self._render()
+
+    def _on_scrollbar(self, *args):
+        if not self.virtual:
+            self.tree.yview(*args)
+            return
+        visible = self._visible_rows()
+        if args[0] == 'moveto':
+            self.scroll_to(float(args[1]) * len(self.rows))
+        elif args[0] == 'scroll':
+            step = int(args[1]) * (visible if args[2] == 'pages' else 1)
+            self.scroll_to(self.first + step)
+
+    def _on_tree_yscroll(self, lo, hi):
+        if not self.virtual:
+            self.v_scroll.set(lo, hi)
+            return
+        # Drzewo przewinęło się samo (np. kliknięcie w częściowo widoczny wiersz) – przesuń okno
+        offset = int(round(float(lo) * len(self._rendered)))
+        if offset > 0:
+            self.scroll_to(self.first + offset)
+
+    def _on_mousewheel(self, event):
+        if not self.virtual:
+            return None
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.first - 3)
+        else:
+            self.scroll_to(self.first + 3)
+        return "break"
+
+    def _on_key_nav(self, step, extend=False):
+        """Nawigacja klawiaturą w trybie wirtualnym; extend (Shift) zaznacza zakres od punktu zaczepienia"""
+        if not self.virtual or not self.rows:
+            return None
+        focus = self.tree.focus()
+        pos = self.index.get(focus, self.first)
+        visible = self._visible_rows()
+        if step == 'home':
+            target = 0
+        elif step == 'end':
+            target = len(self.rows) - 1
+        elif step == 'page_up':
+            target = pos - visible
+        elif step == 'page_down':
+            target = pos + visible
+        else:
+            target = pos + step
+        target = max(0, min(len(self.rows) - 1, target))
+
+        if target < self.first:
+            self.scroll_to(target)
+        elif target >= self.first + visible:
+            self.scroll_to(target - visible + 1)
+
+        iid = self.rows[target][0]
+        if extend:
+            anchor = self.index.get(self._anchor, pos)
+            low, high = sorted((anchor, target))
+            self.selection_set(row[0] for row in self.rows[low:high + 1])
+        else:
+            self._anchor = iid
+            self.selection_set((iid,))
+        self.tree.focus(iid)
+        self.tree.event_generate('<<TreeviewSelect>>')
+        return "break"